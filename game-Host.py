@@ -0,0 +1,198 @@
+import argparse
+import math
+import time
+
+import pygame
+
+from game import BALL_SIZE, PADDLE_HEIGHT, PADDLE_WIDTH, WHITE, WINDOW_HEIGHT, WINDOW_WIDTH, Ball, Paddle
+from utils.capture import CameraCapture
+from utils.display import CameraBackground
+from utils.filters import FingertipFilter
+from utils.hand_tracker import HandTracker
+from utils.opponent import OpponentAI
+from utils.physics import FixedTimestep
+from utils.pipeline import CaptureThread
+from utils.recording import ReplaySource
+from utils.remote_tracker import RemoteHandTracker
+from utils.session_host import InferencePool
+from utils.utils import map_range
+
+# Host mode: several independent Pong tables (one camera each) in one process, drawn side by
+# side in one window, sharing a fixed pool of hand inference workers.
+
+
+class Table:
+    """One game session: its own camera, paddles, ball, score and fingertip filter."""
+
+    def __init__(self, name, cap, pool, budget_fps=None):
+        self.name = name
+        self.cap = cap
+        self.session = pool.register(name, budget_fps)
+        self.capture = CaptureThread(cap, self.session.frames)
+        self.capture.name = f"capture-{name}"
+
+        self.surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.background = CameraBackground((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.player = Paddle(20, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
+        self.opponent = Paddle(WINDOW_WIDTH - 30 - PADDLE_WIDTH, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
+        self.ball = Ball()
+        self.opponent_ai = OpponentAI("medium", (WINDOW_WIDTH, WINDOW_HEIGHT), BALL_SIZE)
+        self.timestep = FixedTimestep()
+        self.finger_filter = FingertipFilter()
+        self.pointer_x = WINDOW_WIDTH // 2
+        self.player_score = 0
+        self.opponent_score = 0
+
+    def update_opponent_paddle(self):
+        self.opponent.move(self.opponent_ai.update(self.ball, self.opponent.rect))
+
+    def update_score(self):
+        if self.ball.rect.left <= 0:
+            self.opponent_score += 1
+            self.ball.reset()
+        elif self.ball.rect.right >= WINDOW_WIDTH:
+            self.player_score += 1
+            self.ball.reset()
+
+    def update(self, now, display_time):
+        """Advance the table to now and draw it into self.surface. Returns False before the first frame."""
+        frame_item = self.session.latest_frame()
+        if frame_item is None:
+            return False
+        frame = frame_item[1]
+        height, width = frame.shape[:2]
+
+        result_item = self.session.latest_result()
+        if result_item is not None:
+            capture_time, hand_result = result_item
+            if hand_result.position is not None:
+                finger_x, finger_y = hand_result.position
+                self.pointer_x = int(map_range(finger_x, 0, width, 0, WINDOW_WIDTH))
+                self.finger_filter.update(map_range(finger_y, 0, height, 0, WINDOW_HEIGHT), capture_time)
+
+        self.surface.blit(self.background.update(frame), (0, 0))
+        predicted_y = self.finger_filter.predict(display_time)
+        if predicted_y is not None:
+            self.player.move(int(predicted_y) - PADDLE_HEIGHT // 2)
+            pygame.draw.circle(self.surface, (0, 255, 0), (self.pointer_x, int(predicted_y)), 10)
+
+        for _ in range(self.timestep.advance(now)):
+            self.update_opponent_paddle()
+            self.ball.step(self.player, self.opponent)
+            self.update_score()
+
+        self.player.draw(self.surface)
+        self.opponent.draw(self.surface)
+        self.ball.draw(self.surface, self.timestep.alpha)
+        self.session.stats.renders.append(now)
+        return True
+
+
+class Host:
+    def __init__(self, sources, pool_size=2, budget_fps=30, window_size=(1280, 720), remote_inference=True):
+        pygame.init()
+        self.screen = pygame.display.set_mode(window_size)
+        pygame.display.set_caption(f"CV Pong - {len(sources)} tables")
+        self.clock = pygame.time.Clock()
+        self.running = True
+        self.font = pygame.font.SysFont(None, 36)
+        self.small_font = pygame.font.SysFont("monospace", 14)
+
+        tracker_factory = RemoteHandTracker if remote_inference else HandTracker
+        self.pool = InferencePool(tracker_factory, size=pool_size, budget_fps=budget_fps)
+        self.tables = [Table(name, cap, self.pool) for name, cap in sources]
+
+        # Tables are laid out in a grid, each scaled to fit its cell at 4:3
+        columns = math.ceil(math.sqrt(len(self.tables)))
+        rows = math.ceil(len(self.tables) / columns)
+        cell_width, cell_height = window_size[0] // columns, window_size[1] // rows
+        tile_width = min(cell_width, cell_height * WINDOW_WIDTH // WINDOW_HEIGHT)
+        tile_height = tile_width * WINDOW_HEIGHT // WINDOW_WIDTH
+        self.tiles = []
+        for i in range(len(self.tables)):
+            x = (i % columns) * cell_width + (cell_width - tile_width) // 2
+            y = (i // columns) * cell_height + (cell_height - tile_height) // 2
+            self.tiles.append(pygame.Rect(x, y, tile_width, tile_height))
+
+    def draw_table(self, table, tile):
+        score_text = self.font.render(f"{table.player_score} : {table.opponent_score}", True, WHITE)
+        table.surface.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, 20))
+        pygame.transform.scale(table.surface, tile.size, self.screen.subsurface(tile))
+
+        stats = table.session.stats.summary()
+        line = (f"{table.name}: cam {stats['capture_fps']:4.1f}  inf {stats['inference_fps']:4.1f}/s  "
+                f"lat {stats['latency_p50_ms']:3.0f}/{stats['latency_p95_ms']:3.0f} ms  "
+                f"drop {table.session.frames.dropped}")
+        self.screen.blit(self.small_font.render(line, True, (255, 255, 0), (0, 0, 0)), (tile.x + 4, tile.y + 4))
+
+    def run(self):
+        self.pool.start()
+        for table in self.tables:
+            table.capture.start()
+        frame_time = 1 / 60
+
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+            if any(table.capture.failed for table in self.tables):
+                print("Failed to grab frame")
+                break
+
+            now = time.perf_counter()
+            self.screen.fill((0, 0, 0))
+            for table, tile in zip(self.tables, self.tiles):
+                if table.update(now, now + frame_time):
+                    self.draw_table(table, tile)
+            pygame.display.flip()
+            self.clock.tick(60)
+            frame_time = self.clock.get_time() / 1000
+
+        for table in self.tables:
+            table.capture.stop()
+        for table in self.tables:
+            table.capture.join(timeout=1.0)
+            table.cap.release()
+        self.pool.stop()
+        pygame.quit()
+        self.print_stats()
+
+    def print_stats(self):
+        print(f"{'table':<10}{'cam fps':>9}{'inf fps':>9}{'p50 ms':>8}{'p95 ms':>8}{'inf ms':>8}{'dropped':>9}")
+        for table in self.tables:
+            stats = table.session.stats.summary()
+            print(f"{table.name:<10}{stats['capture_fps']:9.1f}{stats['inference_fps']:9.1f}"
+                  f"{stats['latency_p50_ms']:8.1f}{stats['latency_p95_ms']:8.1f}{stats['inference_ms']:8.1f}"
+                  f"{table.session.frames.dropped:9d}")
+
+
+def open_sources(args):
+    sources = []
+    for index in args.camera or []:
+        cap = CameraCapture(index)
+        if not cap.isOpened():
+            raise RuntimeError(f"Could not open camera {index}")
+        sources.append((f"cam{index}", cap))
+    for path in args.replay or []:
+        sources.append((f"rec{len(sources)}", ReplaySource(path, loop=True)))
+    if not sources:
+        raise SystemExit("Give at least one --camera or --replay source")
+    return sources
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CV Pong host: several tables sharing hand inference")
+    parser.add_argument("--camera", type=int, action="append", help="camera index (repeat for more tables)")
+    parser.add_argument("--replay", metavar="PATH", action="append",
+                        help="recording made with game.py --record to use as a table's camera (repeatable)")
+    parser.add_argument("--pool", type=int, default=2, help="number of inference workers (MediaPipe models)")
+    parser.add_argument("--budget", type=float, default=30, help="most hand inferences per second per table")
+    parser.add_argument("--window", default="1280x720", help="window size, e.g. 1920x1080")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run the inference workers as threads instead of worker processes")
+    args = parser.parse_args()
+
+    window_size = tuple(int(v) for v in args.window.split("x"))
+    host = Host(open_sources(args), pool_size=args.pool, budget_fps=args.budget,
+                window_size=window_size, remote_inference=not args.in_process)
+    host.run()
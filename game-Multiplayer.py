@@ -1,8 +1,22 @@
+import time
+
+STARTUP_ORIGIN = time.perf_counter()  # Startup breakdown times are measured from here
+
+import argparse
 import pygame
 import random
 import cv2
-from utils.multi_hand_tracker import HandTracker
-from utils.utils import clamp, map_range, smooth_value
+from utils.multi_hand_tracker import HandTracker, PlayerSlots
+from utils.physics import FixedTimestep, lerp, push_out, sweep_box, wall_boxes
+from utils.capture import CameraCapture, frame_capture_time
+from utils.display import SCALE_HELP, SCALE_MODES, CameraBackground, ScaledDisplay, parse_size
+from utils.filters import LatencyMeter
+from utils.opponent import OpponentAI
+from utils.pipeline import FramePipeline
+from utils.remote_tracker import RemoteHandTracker
+from utils.startup import StartupProfile, load_in_parallel
+from utils.tracing import TimingHud, Tracer
+from utils.utils import clamp
 
 # Game Settings
 WINDOW_WIDTH = 800
@@ -14,6 +28,7 @@ PADDLE_SPEED = 10
 BALL_SPEED_X = 6
 BALL_SPEED_Y = 6
 SPEED_INCREMENT = 0.5
+WALLS = wall_boxes(WINDOW_WIDTH, WINDOW_HEIGHT)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -33,67 +48,147 @@ class Paddle:
 class Ball:
     def __init__(self):
         self.rect = pygame.Rect(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2, BALL_SIZE, BALL_SIZE)
-        self.dx = BALL_SPEED_X
+        # Sub-pixel position; rect is its rounded copy used for scoring
+        self.x = float(self.rect.x)
+        self.y = float(self.rect.y)
+        self.prev_x = self.x  # Position at the previous tick, for render interpolation
+        self.prev_y = self.y
+        self.dx = BALL_SPEED_X  # Pixels per physics tick
         self.dy = BALL_SPEED_Y
         self.speed_x = BALL_SPEED_X
         self.speed_y = BALL_SPEED_Y
-
-    def move(self):
-        self.rect.x += self.dx
-        self.rect.y += self.dy
-
-        if self.rect.top <= 0 or self.rect.bottom >= WINDOW_HEIGHT:
-            self.dy *= -1
-            self.rect.y = clamp(self.rect.y, 0, WINDOW_HEIGHT - BALL_SIZE)
-
-    def check_collision(self, paddle1, paddle2):
-        if self.rect.colliderect(paddle1.rect) or self.rect.colliderect(paddle2.rect):
-            self.dx *= -1
+        self.hit_ticks = 0  # Ticks left to draw the ball red after a paddle hit
+
+    def step(self, paddle1, paddle2):
+        """Advance one physics tick with swept collision against the walls and both paddles."""
+        self.prev_x, self.prev_y = self.x, self.y
+        paddles = [paddle1.rect, paddle2.rect]
+
+        hits = 0
+        for rect in paddles:
+            self.x, self.dx, hit = push_out(self.x, self.y, BALL_SIZE, self.dx, rect)
+            hits += hit
+        self.x, self.y, self.dx, self.dy, contacts = sweep_box(
+            self.x, self.y, BALL_SIZE, self.dx, self.dy, paddles + WALLS)
+        hits += sum(1 for i in contacts if i < len(paddles))
+
+        for _ in range(hits):
             # Increase difficulty
             self.dx += SPEED_INCREMENT if self.dx > 0 else -SPEED_INCREMENT
             self.dy += SPEED_INCREMENT if self.dy > 0 else -SPEED_INCREMENT
+        self.hit_ticks = 6 if hits else max(self.hit_ticks - 1, 0)
+
+        self.rect.x = round(self.x)
+        self.rect.y = round(self.y)
 
-    def draw(self, surface, paddle1, paddle2):
-        color = RED if self.rect.colliderect(paddle1.rect) or self.rect.colliderect(paddle2.rect) else WHITE
-        center_x = self.rect.centerx
-        center_y = self.rect.centery
+    def draw(self, surface, alpha=1.0):
+        """Draw the ball interpolated alpha of the way between the last two physics ticks."""
+        color = RED if self.hit_ticks else WHITE
+        # Draw the ball as a circle at the center of its hitbox
+        center_x = round(lerp(self.prev_x, self.x, alpha)) + BALL_SIZE // 2
+        center_y = round(lerp(self.prev_y, self.y, alpha)) + BALL_SIZE // 2
         radius = BALL_SIZE // 2  # Radius is half the ball size
         pygame.draw.circle(surface, color, (center_x, center_y), radius)
 
     def reset(self):
         self.rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+        self.x = self.prev_x = float(self.rect.x)
+        self.y = self.prev_y = float(self.rect.y)
         self.dx = random.choice([self.speed_x, -self.speed_x])
         self.dy = random.choice([self.speed_y, -self.speed_y])
 
 class Game:
-    def __init__(self):
+    def __init__(self, pipelined=False, trace_path=None, predict=True, remote_inference=False,
+                 startup_report=None, quit_after_startup=False, window_size=None, fullscreen=False, scale="fast"):
+        self.startup = StartupProfile(STARTUP_ORIGIN)
+        self.startup.mark("imports")
+        self.startup_report = startup_report          # "-" prints the breakdown, a path also saves it as JSON
+        self.quit_after_startup = quit_after_startup  # Exit after the first frame
+        self.started = False
         pygame.init()
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        # Drawn at the logical size and scaled to the window or screen (see game.py)
+        self.display = ScaledDisplay((WINDOW_WIDTH, WINDOW_HEIGHT), window_size, fullscreen, scale)
+        self.screen = self.display.surface
         pygame.display.set_caption("CV Pong")
+        self.startup.mark("window")
         self.clock = pygame.time.Clock()
         self.running = True
 
         self.player = Paddle(20, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
         self.opponent = Paddle(WINDOW_WIDTH - 30 - PADDLE_WIDTH, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
         self.ball = Ball()
+        self.opponent_ai = OpponentAI("medium", (WINDOW_WIDTH, WINDOW_HEIGHT), BALL_SIZE)  # Until a second hand shows up
+        self.opponent_controlled_by_hand = False  # Slot 1 has a bound or predicted hand this frame
+        self.timestep = FixedTimestep()  # Physics runs at a fixed tick rate, apart from rendering
+        self.background = CameraBackground((WINDOW_WIDTH, WINDOW_HEIGHT))
 
         self.font = pygame.font.SysFont(None, 36)
+        self.small_font = pygame.font.SysFont(None, 24)
+
+        # Per-stage timing: F3 toggles the on-screen HUD, --trace records a Chrome trace
+        self.trace_path = trace_path
+        self.tracer = Tracer(record=trace_path is not None)
+        self.hud = TimingHud(self.tracer, pygame.font.SysFont("monospace", 18))
+        self.display.tracer = self.tracer
         self.player_score = 0
         self.opponent_score = 0
 
-        self.hand_tracker = HandTracker(max_num_hands=2)  # Track up to two hands
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
+        # Open the camera while the hand model loads and warms up (see game.py)
+        loaded = load_in_parallel(self.screen, [("camera", self.open_camera),
+                                                ("hand model", lambda: self.load_hand_tracker(remote_inference))],
+                                  self.startup, self.display.present)
+        self.cap = loaded["camera"]
+        self.hand_tracker = loaded["hand model"]
+        self.hand_tracker.tracer = self.tracer
+
+        # Pipelined mode: capture and inference run on their own threads
+        self.pipeline = None
+        if pipelined:
+            self.pipeline = FramePipeline(self.cap, self.hand_tracker.process,
+                                          flip=True, tracer=self.tracer)
+        self.hand_position_age = None  # Seconds between capture and use of the hand positions this frame
+
+        # Each paddle is bound to one tracked hand (player 0 = left paddle), with its own
+        # fingertip filter predicted to the time the frame is shown (see game.py)
+        self.players = PlayerSlots(2, (WINDOW_WIDTH, WINDOW_HEIGHT), predict=predict)
+        self.present_latency = LatencyMeter(initial=1 / 60)
+
+    def open_camera(self):
+        cap = CameraCapture(0)
+        if not cap.isOpened():
             raise RuntimeError("Could not open webcam")
+        with self.startup.phase("first grab"):
+            cap.read()
+        return cap
+
+    def load_hand_tracker(self, remote_inference):
+        with self.startup.phase("model load"):
+            if remote_inference:
+                tracker = RemoteHandTracker(max_num_hands=2, multi=True)  # MediaPipe in a worker process
+            else:
+                tracker = HandTracker(max_num_hands=2)  # Track up to two hands
+        with self.startup.phase("model warm-up"):
+            tracker.warm_up()
+        return tracker
+
+    def finish_startup(self):
+        """Called once the first frame is on screen."""
+        self.started = True
+        self.startup.mark("first frame")
+        if self.startup_report is not None:
+            print(self.startup.report())
+            if self.startup_report != "-":
+                self.startup.save(self.startup_report)
+        if self.quit_after_startup:
+            self.running = False
 
     def update_paddle(self, new_y, paddle):
         paddle.move(new_y)
 
-    def update_opponent_paddle(self, ball_y):
-        target_y = ball_y - PADDLE_HEIGHT // 2 
-        current_y = self.opponent.rect.y
-        new_y = current_y + 0.2 * (target_y - current_y)  # Lower smoothing factor
-        self.opponent.move(new_y)
+    def update_opponent_paddle(self):
+        if self.opponent_controlled_by_hand:
+            return  # The second hand has the paddle; the AI would fight it
+        self.opponent.move(self.opponent_ai.update(self.ball, self.opponent.rect))
 
     def update_score(self):
         if self.ball.rect.left <= 0:
@@ -107,111 +202,118 @@ class Game:
         score_text = self.font.render(f"{self.player_score} : {self.opponent_score}", True, WHITE)
         self.screen.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, 20))
 
+    def draw_hand_age(self):
+        if self.hand_position_age is None:
+            return
+        age_text = self.small_font.render(f"hand age: {self.hand_position_age * 1000:.0f} ms", True, WHITE)
+        self.screen.blit(age_text, (10, WINDOW_HEIGHT - 30))
+
+    def poll_pipeline(self):
+        """
+        Latest camera frame and latest hand tracking result from the pipeline threads.
+        Returns (frame, hand_result, capture_time); never blocks.
+        """
+        frame_item = self.pipeline.latest_frame()
+        result_item = self.pipeline.latest_result()
+        frame = frame_item[1] if frame_item is not None else None
+        if result_item is None:
+            return frame, None, None
+        capture_time, hand_result = result_item
+        return frame, hand_result, capture_time
+
     def run(self):
+        if self.pipeline is not None:
+            self.pipeline.start()
+
         while self.running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.hud.toggle()
 
-            ret, frame = self.cap.read()
-            frame = cv2.flip(frame, 1)  # Flip horizontally
-            if not ret:
-                print("Failed to grab frame")
-                self.running = False
-                break
+            if self.pipeline is not None:
+                if self.pipeline.failed:
+                    print("Failed to grab frame")
+                    self.running = False
+                    break
+                frame, hand_result, capture_time = self.poll_pipeline()
+                if frame is None:
+                    # Camera has not delivered its first frame yet
+                    self.clock.tick(60)
+                    continue
+            else:
+                with self.tracer.span("capture"):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    print("Failed to grab frame")
+                    self.running = False
+                    break
+                frame = cv2.flip(frame, 1)  # Flip horizontally
+                capture_time = frame_capture_time(self.cap, time.perf_counter())
+
+                hand_result = self.hand_tracker.process(frame)
 
             original_height, original_width = frame.shape[:2]
-            
-            hand_positions, frame = self.hand_tracker.get_hand_positions(frame)
+            if capture_time is not None:
+                self.hand_position_age = time.perf_counter() - capture_time
 
-            # AFTER tracking, resize for display
-            frame = cv2.resize(frame, (WINDOW_WIDTH, WINDOW_HEIGHT))
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame_surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
+            # AFTER tracking, load the frame into the persistent background surface,
+            # reusing the tracker's RGB conversion when it covers this frame
+            with self.tracer.span("background"):
+                frame_rgb = self.hand_tracker.rgb_frame(frame) if self.pipeline is None else None
+                frame_surface = self.background.update(frame, frame_rgb)
+            self.screen.blit(frame_surface, (0, 0))  # Webcam feed as background, under the pointer
 
             self.opponent_controlled_by_hand = False  # Reset before scanning hands
 
-            if hand_positions:
-                # Ensure that the hands detected are mapped to paddles
-                # if len(hand_positions) >= 1:
-                #     finger_x, finger_y = hand_positions[0]
-                #     try:
-                #         finger_x = float(finger_x)
-                #         finger_y = float(finger_y)
-                #     except ValueError:
-                #         continue
-                #     scaled_x = int(map_range(finger_x, 0, original_width, 0, WINDOW_WIDTH))
-                #     scaled_y = int(map_range(finger_y, 0, original_height, 0, WINDOW_HEIGHT))
-                #     previous_y = getattr(self, 'previous_y', scaled_y)
-                #     smoothed_y = smooth_value(scaled_y, previous_y, smoothing_factor=0.6)
-                #     self.previous_y = smoothed_y
-
-                #     self.update_paddle(smoothed_y - PADDLE_HEIGHT // 2, self.player)
-
-                #     pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, int(smoothed_y)), 10)
-
-                # if len(hand_positions) > 1:
-                #     finger_x, finger_y = hand_positions[1]
-                #     try:
-                #         finger_x = float(finger_x)
-                #         finger_y = float(finger_y)
-                #     except ValueError:
-                #         continue
-                #     scaled_x = int(map_range(finger_x, 0, original_width, 0, WINDOW_WIDTH))
-
-                #     scaled_y = int(map_range(finger_y, 0, original_height, 0, WINDOW_HEIGHT))
-                #     previous_y2 = getattr(self, 'previous_y2', scaled_y)
-                #     smoothed_y2 = smooth_value(scaled_y, previous_y2, smoothing_factor=0.6)
-                #     self.previous_y2 = smoothed_y2
-
-                #     self.update_paddle(smoothed_y2 - PADDLE_HEIGHT // 2, self.opponent)
-
-                #     pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, int(smoothed_y)), 10)
-                 for hand_x, hand_y in hand_positions:
-                    try:
-                        hand_x = float(hand_x)
-                        hand_y = float(hand_y)
-                    except ValueError:
-                        continue
-
-                    scaled_x = int(map_range(hand_x, 0, original_width, 0, WINDOW_WIDTH))
-                    scaled_y = int(map_range(hand_y, 0, original_height, 0, WINDOW_HEIGHT))
-
-                    # Determine if the hand is on the left or right half of the frame
-                    if hand_x < original_width / 2:
-                        # LEFT half → control player paddle
-                        previous_y = getattr(self, 'previous_y', scaled_y)
-                        smoothed_y = smooth_value(scaled_y, previous_y, smoothing_factor=0.6)
-                        self.previous_y = smoothed_y
-
-                        self.update_paddle(smoothed_y - PADDLE_HEIGHT // 2, self.player)
-
-                        pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, int(smoothed_y)), 10)
-                    else:
-                        # RIGHT half → control opponent paddle
-                        self.opponent_controlled_by_hand = True  # User takes over
-                        previous_y2 = getattr(self, 'previous_y2', scaled_y)
-                        smoothed_y2 = smooth_value(scaled_y, previous_y2, smoothing_factor=0.6)
-                        self.previous_y2 = smoothed_y2
-
-                        self.update_paddle(smoothed_y2 - PADDLE_HEIGHT // 2, self.opponent)
-
-                        pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, int(smoothed_y2)), 10)
-            self.update_opponent_paddle(self.ball.rect.centery)
-            self.ball.move()
-            self.ball.check_collision(self.player, self.opponent)
-            self.update_score()
-
-            self.screen.blit(frame_surface, (0, 0))  # Webcam feed as background
-
-            self.player.draw(self.screen)
-            self.opponent.draw(self.screen)
-            self.ball.draw(self.screen, self.player, self.opponent)
-            self.draw_score()
-
-            pygame.display.flip()
-            self.clock.tick(60)
-
+            now = time.perf_counter()
+            if hand_result is not None:
+                # Hands keep their paddle by track ID, even across the middle of the frame
+                self.players.update(hand_result, capture_time if capture_time is not None else now,
+                                    (original_width, original_height))
+
+            # Each paddle goes where its fingertip is expected to be when this frame reaches the screen
+            display_time = now + self.present_latency.value
+            for slot, paddle in enumerate((self.player, self.opponent)):
+                position = self.players.predict(slot, display_time)
+                if position is None:
+                    continue
+                pointer_x, pointer_y = int(position[0]), int(position[1])
+                if paddle is self.opponent:
+                    self.opponent_controlled_by_hand = True  # User takes over
+                self.update_paddle(pointer_y - PADDLE_HEIGHT // 2, paddle)
+                pygame.draw.circle(self.screen, (0, 255, 0), (pointer_x, pointer_y), 10)
+
+            # Fixed-timestep physics: the same number of ticks per second at any frame rate
+            with self.tracer.span("physics"):
+                for _ in range(self.timestep.advance()):
+                    self.update_opponent_paddle()
+                    self.ball.step(self.player, self.opponent)
+                    self.update_score()
+
+            with self.tracer.span("draw"):
+                self.player.draw(self.screen)
+                self.opponent.draw(self.screen)
+                self.ball.draw(self.screen, self.timestep.alpha)
+                self.draw_score()
+                if self.pipeline is not None:
+                    self.draw_hand_age()
+
+            self.hud.draw(self.screen)
+            with self.tracer.span("flip"):
+                self.display.present()
+            if not self.started:
+                self.finish_startup()
+            self.present_latency.add(time.perf_counter() - now)
+            with self.tracer.span("tick"):
+                self.clock.tick(60)
+            self.tracer.frame()
+
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self.trace_path is not None:
+            self.tracer.export_chrome_trace(self.trace_path)
         self.cap.release()
         cv2.destroyAllWindows()
         pygame.quit()
@@ -220,5 +322,28 @@ class Game:
         self.hand_tracker.release()
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="CV Pong - two player")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="capture and hand inference on background threads")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="record per-stage timings and write them as Chrome trace JSON on exit")
+    parser.add_argument("--no-predict", action="store_true",
+                        help="smooth the fingertips but do not extrapolate them to display time")
+    parser.add_argument("--remote-inference", action="store_true",
+                        help="run MediaPipe in a separate process so it does not hold up rendering")
+    parser.add_argument("--startup-report", metavar="PATH", nargs="?", const="-",
+                        help="print how long each startup step took; with PATH, also save it as JSON")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="exit as soon as the first frame is shown (for measuring startup time)")
+    parser.add_argument("--window-size", type=parse_size, metavar="WxH",
+                        help="window size; the game is drawn at 800x600 and scaled to fit")
+    parser.add_argument("--fullscreen", action="store_true", help="full screen at the desktop resolution")
+    parser.add_argument("--scale", choices=SCALE_MODES, default="fast",
+                        help=SCALE_HELP)
+    args = parser.parse_args()
+
+    game = Game(pipelined=args.pipelined, trace_path=args.trace, predict=not args.no_predict,
+                remote_inference=args.remote_inference, startup_report=args.startup_report,
+                quit_after_startup=args.quit_after_startup, window_size=args.window_size,
+                fullscreen=args.fullscreen, scale=args.scale)
     game.run()
\ No newline at end of file
@@ -0,0 +1,296 @@
+import argparse
+import time
+
+import pygame
+
+from game import (BALL_SIZE, PADDLE_HEIGHT, PADDLE_WIDTH, RED, WHITE, WINDOW_HEIGHT, WINDOW_WIDTH,
+                  Ball, Paddle)
+from utils.capture import CameraCapture, frame_capture_time
+from utils.display import SCALE_HELP, SCALE_MODES, CameraBackground, ScaledDisplay, parse_size
+from utils.filters import FingertipFilter
+from utils.hand_tracker import HandTracker
+from utils.netplay import DEFAULT_PORT, MatchState, NetClient, NetHost, NetworkConditions
+from utils.physics import TICK_RATE, FixedTimestep, lerp
+from utils.utils import clamp, map_range
+
+# Two-player Pong between two machines (or two processes on one machine) over UDP.
+# The host plays the left paddle and runs the authoritative match; the client plays the
+# right paddle and predicts the match locally from the host's state updates.
+
+MAX_LEAD = 30          # Most ticks the client predicts ahead of the newest state
+SNAP_DISTANCE = 80     # Prediction errors larger than this (px) are snapped, not smoothed
+CORRECTION_DECAY = 0.8  # Fraction of the remaining prediction error still shown after a frame
+
+
+class NetMatch:
+    """Ball, host paddle (left), client paddle (right) and score, saved and restored as a MatchState."""
+
+    def __init__(self):
+        self.host_paddle = Paddle(20, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
+        self.client_paddle = Paddle(WINDOW_WIDTH - 30 - PADDLE_WIDTH, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
+        self.ball = Ball()
+        self.host_score = 0
+        self.client_score = 0
+
+    def in_play(self):
+        return self.ball.rect.left > 0 and self.ball.rect.right < WINDOW_WIDTH
+
+    def tick(self, host_y, client_y, score=True):
+        """
+        One physics tick. With score=False (client prediction) a ball that leaves the court
+        waits there: where it is served next is the host's random choice.
+        """
+        self.host_paddle.move(host_y)
+        self.client_paddle.move(client_y)
+        if not score and not self.in_play():
+            return
+        self.ball.step(self.host_paddle, self.client_paddle)
+        if score:
+            if self.ball.rect.left <= 0:
+                self.client_score += 1
+                self.ball.reset()
+            elif self.ball.rect.right >= WINDOW_WIDTH:
+                self.host_score += 1
+                self.ball.reset()
+
+    def save(self):
+        ball = self.ball
+        return MatchState(ball.x, ball.y, ball.dx, ball.dy, self.host_paddle.rect.y, self.client_paddle.rect.y,
+                          self.host_score, self.client_score, ball.hit_ticks)
+
+    def load(self, state):
+        ball = self.ball
+        ball.x = ball.prev_x = state.ball_x
+        ball.y = ball.prev_y = state.ball_y
+        ball.rect.x = round(ball.x)
+        ball.rect.y = round(ball.y)
+        ball.dx, ball.dy = state.ball_dx, state.ball_dy
+        ball.hit_ticks = state.hit_ticks
+        self.host_paddle.move(state.host_y)
+        self.client_paddle.move(state.client_y)
+        self.host_score, self.client_score = state.host_score, state.client_score
+
+
+class HostSide:
+    """Runs the match at the fixed tick rate and sends the state every send_every ticks."""
+
+    def __init__(self, net, send_every=2):
+        self.net = net
+        self.send_every = send_every
+        self.match = NetMatch()
+        self.timestep = FixedTimestep()
+        self.tick = 0
+
+    def update(self, now, local_y):
+        self.net.poll()
+        ticks = self.timestep.advance(now)
+        if not self.net.connected:
+            return  # Paused until the other player is there
+        remote_y = self.net.remote_y if self.net.remote_y is not None else self.match.client_paddle.rect.y
+        for _ in range(ticks):
+            self.match.tick(local_y, remote_y)
+            self.tick += 1
+            if self.tick % self.send_every == 0:
+                self.net.send_state(self.tick, self.match.save())
+
+    def ball_position(self):
+        ball = self.match.ball
+        alpha = self.timestep.alpha
+        return lerp(ball.prev_x, ball.x, alpha), lerp(ball.prev_y, ball.y, alpha)
+
+
+class ClientSide:
+    """
+    Client prediction: the local paddle moves at once, and the match is simulated ahead from
+    the newest host state to the host's estimated current tick (half the round trip plus the
+    time since the state arrived). Each new state replaces the prediction (reconciliation);
+    the jump between the old and new prediction is shown fading out over a few frames.
+
+    The paddle position sent to the host is extrapolated by the one-way delay, so the host's
+    copy of the paddle lags the player less.
+    """
+
+    def __init__(self, net):
+        self.net = net
+        self.match = NetMatch()
+        self.timestep = FixedTimestep()
+        self.correction = (0.0, 0.0)  # Prediction error still to fade out, px
+        self.last_input = None        # (time, local paddle y) at the previous update
+
+    def update(self, now, local_y):
+        self.match.client_paddle.move(local_y)  # The local paddle never waits for the host
+        sent_y = local_y
+        if self.last_input is not None and self.net.rtt is not None and now > self.last_input[0]:
+            velocity = (local_y - self.last_input[1]) / (now - self.last_input[0])
+            sent_y = clamp(local_y + velocity * self.net.rtt / 2, 0, WINDOW_HEIGHT - PADDLE_HEIGHT)
+        self.last_input = (now, local_y)
+        for _ in range(self.timestep.advance(now)):
+            self.net.send_input(sent_y)
+            if self.net.state is not None:
+                self.match.tick(self.net.state.host_y, local_y, score=False)
+        if self.net.poll():
+            self.reconcile(local_y)
+        self.correction = (self.correction[0] * CORRECTION_DECAY, self.correction[1] * CORRECTION_DECAY)
+
+    def reconcile(self, local_y):
+        state = self.net.state
+        old_x, old_y = self.ball_position()
+        self.match.load(state)
+        self.match.client_paddle.move(local_y)
+        for _ in range(min(int(self.net.ticks_behind(TICK_RATE)), MAX_LEAD)):
+            self.match.tick(state.host_y, local_y, score=False)
+        new_x, new_y = self.ball_position(corrected=False)
+        error_x, error_y = old_x - new_x, old_y - new_y
+        if abs(error_x) + abs(error_y) > SNAP_DISTANCE:
+            error_x = error_y = 0.0
+        self.correction = (error_x, error_y)
+
+    def ball_position(self, corrected=True):
+        ball = self.match.ball
+        alpha = self.timestep.alpha
+        x, y = lerp(ball.prev_x, ball.x, alpha), lerp(ball.prev_y, ball.y, alpha)
+        if corrected:
+            x, y = x + self.correction[0], y + self.correction[1]
+        return x, y
+
+
+class HandInput:
+    """Paddle from the index fingertip on the webcam, as in game.py."""
+
+    def __init__(self):
+        self.cap = CameraCapture(0)
+        if not self.cap.isOpened():
+            raise RuntimeError("Could not open webcam")
+        self.tracker = HandTracker()
+        self.filter = FingertipFilter()
+        self.background = CameraBackground((WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.frame = None
+
+    def read(self, now):
+        ret, frame = self.cap.read()
+        if ret:
+            capture_time = frame_capture_time(self.cap, time.perf_counter())
+            self.frame = frame
+            result = self.tracker.process(frame)
+            if result.position is not None:
+                self.filter.update(map_range(result.position[1], 0, frame.shape[0], 0, WINDOW_HEIGHT), capture_time)
+        y = self.filter.predict(now)
+        return None if y is None else int(y) - PADDLE_HEIGHT // 2
+
+    def draw_background(self, screen):
+        if self.frame is not None:
+            screen.blit(self.background.update(self.frame, self.tracker.rgb_frame(self.frame)), (0, 0))
+
+    def release(self):
+        self.cap.release()
+        self.tracker.release()
+
+
+class MouseInput:
+    """Paddle follows the mouse; lets two players share one machine and one camera-less setup."""
+
+    def __init__(self, display):
+        self.display = display
+
+    def read(self, now):
+        return self.display.to_logical(pygame.mouse.get_pos())[1] - PADDLE_HEIGHT // 2
+
+    def draw_background(self, screen):
+        pass
+
+    def release(self):
+        pass
+
+
+class NetGame:
+    def __init__(self, connect=None, port=DEFAULT_PORT, conditions=None, input_mode="hand", send_every=2,
+                 window_size=None, fullscreen=False, scale="fast"):
+        pygame.init()
+        self.display = ScaledDisplay((WINDOW_WIDTH, WINDOW_HEIGHT), window_size, fullscreen, scale)
+        self.screen = self.display.surface
+        self.hosting = connect is None
+        pygame.display.set_caption("CV Pong - " + ("host" if self.hosting else "client"))
+        self.clock = pygame.time.Clock()
+        self.running = True
+        self.font = pygame.font.SysFont(None, 36)
+        self.small_font = pygame.font.SysFont("monospace", 16)
+
+        if self.hosting:
+            self.net = NetHost(port, conditions)
+            self.side = HostSide(self.net, send_every)
+        else:
+            host, _, host_port = connect.partition(":")
+            self.net = NetClient((host, int(host_port or DEFAULT_PORT)), conditions)
+            self.side = ClientSide(self.net)
+        self.input = HandInput() if input_mode == "hand" else MouseInput(self.display)
+        self.local_y = WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2
+
+    def status(self, now):
+        up, down = self.net.meter.rates(now)
+        if self.hosting:
+            role = f"host :{self.net.port}" + ("" if self.net.connected else " - waiting for a player")
+        else:
+            role = "client" + ("" if self.net.connected else " - waiting for the host")
+            if self.net.rtt is not None:
+                role += f", rtt {self.net.rtt * 1000:.0f} ms"
+        return f"{role} | up {up / 1000:.2f} KB/s | down {down / 1000:.2f} KB/s"
+
+    def draw(self, now):
+        match = self.side.match
+        match.host_paddle.draw(self.screen)
+        match.client_paddle.draw(self.screen)
+        x, y = self.side.ball_position()
+        color = RED if match.ball.hit_ticks else WHITE
+        pygame.draw.circle(self.screen, color, (round(x) + BALL_SIZE // 2, round(y) + BALL_SIZE // 2), BALL_SIZE // 2)
+        score_text = self.font.render(f"{match.host_score} : {match.client_score}", True, WHITE)
+        self.screen.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, 20))
+        self.screen.blit(self.small_font.render(self.status(now), True, (255, 255, 0), (0, 0, 0)), (5, 5))
+
+    def run(self):
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
+
+            now = time.perf_counter()
+            local_y = self.input.read(now)
+            if local_y is not None:
+                self.local_y = local_y
+            self.side.update(now, self.local_y)
+
+            self.screen.fill((0, 0, 0))
+            self.input.draw_background(self.screen)
+            self.draw(now)
+            self.display.present()
+            self.clock.tick(60)
+
+        meter = self.net.meter
+        print(f"sent {meter.packets_sent} packets, {meter.total_sent / 1000:.1f} KB; "
+              f"received {meter.packets_received} packets, {meter.total_received / 1000:.1f} KB")
+        self.input.release()
+        self.net.close()
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CV Pong - two players over the network")
+    parser.add_argument("--connect", metavar="HOST[:PORT]", help="join a host (without this, host a match)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="UDP port to host on")
+    parser.add_argument("--input", choices=["hand", "mouse"], default="hand",
+                        help="control the paddle with the index fingertip on the webcam, or with the mouse")
+    parser.add_argument("--send-every", type=int, default=2,
+                        help="host: send the match state every this many physics ticks (60 per second)")
+    parser.add_argument("--latency", type=float, default=0.0, help="add this much delay (ms) to packets sent")
+    parser.add_argument("--jitter", type=float, default=0.0, help="vary the added delay by up to +/- this (ms)")
+    parser.add_argument("--loss", type=float, default=0.0, help="drop this percentage of packets sent")
+    parser.add_argument("--window-size", type=parse_size, metavar="WxH",
+                        help="window size; the game is drawn at 800x600 and scaled to fit")
+    parser.add_argument("--fullscreen", action="store_true", help="full screen at the desktop resolution")
+    parser.add_argument("--scale", choices=SCALE_MODES, default="fast",
+                        help=SCALE_HELP)
+    args = parser.parse_args()
+
+    conditions = NetworkConditions(args.latency / 1000, args.jitter / 1000, args.loss / 100)
+    game = NetGame(args.connect, args.port, conditions, args.input, args.send_every,
+                   args.window_size, args.fullscreen, args.scale)
+    game.run()
@@ -1,19 +1,30 @@
+import time
+
+STARTUP_ORIGIN = time.perf_counter()  # Startup breakdown times are measured from here
+
+import argparse
+import sys
 import pygame
 import random
-import cv2
-from utils.hand_tracker import HandTracker
-from utils.utils import clamp, map_range, smooth_value
-
-# Game Settings
-WINDOW_WIDTH = 800
-WINDOW_HEIGHT = 600
-PADDLE_WIDTH = 15
-PADDLE_HEIGHT = 120
-BALL_SIZE = 20
+# Only what is needed to parse the arguments and open the window is imported here. cv2, the
+# hand tracker, the camera and the optional features (--record, --replay, --remote-inference,
+# --soak, --gestures, --balls, --pipelined) are imported where they are used, mostly on the
+# loading threads, so the loading screen is up before any of them load.
+from utils.physics import (BALL_SIZE, BALL_SPEED_X, BALL_SPEED_Y, OPPONENT_X, PADDLE_HEIGHT, PADDLE_START_Y,
+                           PADDLE_WIDTH, PLAYER_X, SPEED_INCREMENT, WALLS, WINDOW_HEIGHT, WINDOW_WIDTH,
+                           FixedTimestep, lerp, push_out, sweep_box)
+from utils.display import SCALE_HELP, SCALE_MODES, CameraBackground, ScaledDisplay, parse_size
+from utils.filters import FingertipFilter, LatencyMeter
+from utils.governor import QUALITY_LEVELS, QualityGovernor
+from utils.opponent import DIFFICULTIES, OpponentAI
+from utils.startup import StartupProfile, load_in_parallel
+from utils.tracing import TimingHud, Tracer
+from utils.utils import clamp, map_range
+
+# Game Settings (the court sizes and ball speeds are in utils/physics.py)
+CHAOS_BALL_SIZE = 8  # Ball size in multi-ball chaos mode (--balls)
+RECORD_RATE_WARNING_MB = 20  # --record data rate (MB/s) above which a warning is printed
 PADDLE_SPEED = 10
-BALL_SPEED_X = 6
-BALL_SPEED_Y = 6
-SPEED_INCREMENT = 0.5
 
 # Colors
 WHITE = (255, 255, 255)
@@ -33,167 +44,613 @@ class Paddle:
 class Ball:
     def __init__(self):
         self.rect = pygame.Rect(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2, BALL_SIZE, BALL_SIZE)
-        self.dx = BALL_SPEED_X
+        # Sub-pixel position; rect is its rounded copy used for scoring
+        self.x = float(self.rect.x)
+        self.y = float(self.rect.y)
+        self.prev_x = self.x  # Position at the previous tick, for render interpolation
+        self.prev_y = self.y
+        self.dx = BALL_SPEED_X  # Pixels per physics tick
         self.dy = BALL_SPEED_Y
         self.speed_x = BALL_SPEED_X
         self.speed_y = BALL_SPEED_Y
-
-    def move(self):
-        self.rect.x += self.dx
-        self.rect.y += self.dy
-
-        if self.rect.top <= 0 or self.rect.bottom >= WINDOW_HEIGHT:
-            self.dy *= -1
-            self.rect.y = clamp(self.rect.y, 0, WINDOW_HEIGHT - BALL_SIZE)
-
-    def check_collision(self, paddle1, paddle2):
-        if self.rect.colliderect(paddle1.rect) or self.rect.colliderect(paddle2.rect):
-            self.dx *= -1
+        self.hit_ticks = 0  # Ticks left to draw the ball red after a paddle hit
+
+    def step(self, paddle1, paddle2):
+        """Advance one physics tick with swept collision against the walls and both paddles."""
+        self.prev_x, self.prev_y = self.x, self.y
+        paddles = [paddle1.rect, paddle2.rect]
+
+        hits = 0
+        for rect in paddles:
+            self.x, self.dx, hit = push_out(self.x, self.y, BALL_SIZE, self.dx, rect)
+            hits += hit
+        self.x, self.y, self.dx, self.dy, contacts = sweep_box(
+            self.x, self.y, BALL_SIZE, self.dx, self.dy, paddles + WALLS)
+        hits += sum(1 for i in contacts if i < len(paddles))
+
+        for _ in range(hits):
             # Increase difficulty
             self.dx += SPEED_INCREMENT if self.dx > 0 else -SPEED_INCREMENT
             self.dy += SPEED_INCREMENT if self.dy > 0 else -SPEED_INCREMENT
+        self.hit_ticks = 6 if hits else max(self.hit_ticks - 1, 0)
+
+        self.rect.x = round(self.x)
+        self.rect.y = round(self.y)
 
-    def draw(self, surface, paddle1, paddle2):
-        color = RED if self.rect.colliderect(paddle1.rect) or self.rect.colliderect(paddle2.rect) else WHITE
-        # pygame.draw.rect(surface, color, self.rect)
+    def draw(self, surface, alpha=1.0):
+        """Draw the ball interpolated alpha of the way between the last two physics ticks."""
+        color = RED if self.hit_ticks else WHITE
         # Draw the ball as a circle at the center of its hitbox
-        center_x = self.rect.centerx
-        center_y = self.rect.centery
+        center_x = round(lerp(self.prev_x, self.x, alpha)) + BALL_SIZE // 2
+        center_y = round(lerp(self.prev_y, self.y, alpha)) + BALL_SIZE // 2
         radius = BALL_SIZE // 2  # Radius is half the ball size
         pygame.draw.circle(surface, color, (center_x, center_y), radius)
 
     def reset(self):
         self.rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+        self.x = self.prev_x = float(self.rect.x)
+        self.y = self.prev_y = float(self.rect.y)
         self.dx = random.choice([self.speed_x, -self.speed_x])
         self.dy = random.choice([self.speed_y, -self.speed_y])
 
 class Game:
-    def __init__(self):
+    def __init__(self, pipelined=False, roi_mode=False, roi_size=192,
+                 record_path=None, replay_path=None, replay_landmarks=False, trace_path=None,
+                 predict=True, remote_inference=False, target_fps=60, quality=None,
+                 motion_gate=False, flow_mode=False, keyframe_interval=6,
+                 startup_report=None, quit_after_startup=False, difficulty="medium",
+                 gesture_controls=False, soak=None, soak_report=None, camera_settings=None,
+                 window_size=None, fullscreen=False, scale="fast", balls=1, record_scale=1.0, record_stride=1,
+                 record_codec="jpeg"):
+        self.startup = StartupProfile(STARTUP_ORIGIN)
+        self.startup.mark("imports")
+        self.startup_report = startup_report          # "-" prints the breakdown, a path also saves it as JSON
+        self.quit_after_startup = quit_after_startup  # Exit after the first frame (startup benchmark)
+        self.started = False
+        self.soak = soak  # SoakMonitor for unattended drift runs (--soak)
+        self.soak_report = soak_report
+        self.soak_passed = None
         pygame.init()
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        # Everything is drawn on a WINDOW_WIDTH x WINDOW_HEIGHT logical surface, scaled to the
+        # window or screen once per frame; physics stays in logical units
+        self.display = ScaledDisplay((WINDOW_WIDTH, WINDOW_HEIGHT), window_size, fullscreen, scale)
+        self.screen = self.display.surface
         pygame.display.set_caption("CV Pong")
+        self.startup.mark("window")
         self.clock = pygame.time.Clock()
         self.running = True
 
-        self.player = Paddle(20, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
-        self.opponent = Paddle(WINDOW_WIDTH - 30 - PADDLE_WIDTH, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
+        self.player = Paddle(PLAYER_X, PADDLE_START_Y)
+        self.opponent = Paddle(OPPONENT_X, PADDLE_START_Y)
         self.ball = Ball()
+        # Chaos mode (--balls N): N small balls in packed arrays instead of the single ball
+        self.balls = None
+        if balls > 1:
+            from utils.multiball import MultiBall
+            self.balls = MultiBall(balls, (WINDOW_WIDTH, WINDOW_HEIGHT), CHAOS_BALL_SIZE, BALL_SPEED_X,
+                                   SPEED_INCREMENT)
+        self.opponent_ai = OpponentAI(difficulty, (WINDOW_WIDTH, WINDOW_HEIGHT),
+                                      BALL_SIZE if self.balls is None else CHAOS_BALL_SIZE)
+        self.timestep = FixedTimestep()  # Physics runs at a fixed tick rate, apart from rendering
+        self.background = CameraBackground((WINDOW_WIDTH, WINDOW_HEIGHT))
 
         self.font = pygame.font.SysFont(None, 36)
+        self.small_font = pygame.font.SysFont(None, 24)
+
+        # Per-stage timing: F3 toggles the on-screen HUD, --trace records a Chrome trace
+        self.trace_path = trace_path
+        self.tracer = Tracer(record=trace_path is not None)
+        self.hud = TimingHud(self.tracer, pygame.font.SysFont("monospace", 18))
+        self.display.tracer = self.tracer
         self.player_score = 0
         self.opponent_score = 0
 
-        self.hand_tracker = HandTracker()
-        self.cap = cv2.VideoCapture(0)
-        if not self.cap.isOpened():
+        # Gesture controls from the tracker's landmarks: pinch pauses, open palm serves,
+        # fist resets the score. SPACE serves too.
+        self.gesture_controls = gesture_controls
+        self.gesture_trigger = None
+        if gesture_controls:
+            from utils.gestures import GestureTrigger
+            self.gesture_trigger = GestureTrigger()
+        self.gesture = 0  # utils.gestures.NONE
+        self.gesture_result = None  # Hand result the gesture was classified from
+        self.paused = False
+        self.waiting_serve = gesture_controls  # Ball holds still until served
+
+        # The camera and the hand model are the slow parts of startup: open the one while the
+        # other loads and warms up, behind a loading screen
+        # Camera size asked for with --camera-size; quality levels scale it rather than replace it
+        self.camera_size = ((camera_settings["width"], camera_settings["height"])
+                            if camera_settings else QUALITY_LEVELS[0].capture_size)
+        tasks = [("camera", lambda: self.open_camera(replay_path, camera_settings))]
+        if replay_path is None or not replay_landmarks:
+            tracker_args = dict(roi_mode=roi_mode, roi_size=roi_size, motion_gate=motion_gate,
+                                flow_mode=flow_mode, keyframe_interval=keyframe_interval)
+            tasks.append(("hand model", lambda: self.load_hand_tracker(remote_inference, tracker_args)))
+        loaded = load_in_parallel(self.screen, tasks, self.startup, self.display.present)
+        self.cap = loaded["camera"]
+        self.replaying = replay_path is not None
+        if "hand model" in loaded:
+            self.hand_tracker = loaded["hand model"]
+        else:
+            from utils.recording import ReplayTracker
+            self.hand_tracker = ReplayTracker(self.cap)  # Reuse recorded landmarks, skip MediaPipe
+        self.record_path = record_path
+        self.record_scale = record_scale    # Frame downscale factor for --record
+        self.record_stride = record_stride  # Record one frame in this many
+        self.record_codec = record_codec    # "jpeg", "png" or "raw" frames in the recording
+        self.recorder = None  # Created on the first frame, once the frame size is known
+        self.hand_tracker.tracer = self.tracer
+
+        # Pipelined mode: capture and inference run on their own threads
+        self.pipeline = None
+        if pipelined:
+            from utils.pipeline import FramePipeline
+            self.pipeline = FramePipeline(self.cap, self.track, tracer=self.tracer)
+        self.hand_position_age = None  # Seconds between capture and use of the hand position this frame
+
+        # Fingertip smoothing and latency compensation: the paddle is drawn where the finger
+        # should be when the frame is shown (capture time + measured draw-to-present delay)
+        self.finger_filter = FingertipFilter(predict=predict)
+        self.present_latency = LatencyMeter(initial=1 / 60)
+        self.pointer_x = WINDOW_WIDTH // 2
+
+        # Quality governor: trades capture size, inference size, model and inference rate
+        # for frame time. quality=None adapts automatically; a level number fixes it.
+        self.governor = QualityGovernor(target_fps=target_fps, level=quality or 0, auto=quality is None)
+        self.infer_every = 1
+        self.frame_count = 0
+        self.hand_result = None   # Last tracker result, reused on frames that skip inference
+        self.result_time = None   # Capture time of the frame it came from
+        if quality is not None:
+            self.apply_quality()
+
+    def open_camera(self, replay_path=None, camera_settings=None):
+        """
+        Input comes from the webcam, or from a recording made with --record. Soak runs loop
+        the recording, or use generated frames when there is none.
+        """
+        if replay_path is not None:
+            from utils.recording import ReplaySource
+            cap = ReplaySource(replay_path, loop=self.soak is not None)
+            if not cap.isOpened():
+                raise RuntimeError(f"Recording {replay_path} has no frames")
+            return cap
+        if self.soak is not None:
+            from utils.soak import SyntheticSource
+            return SyntheticSource()
+        from utils.capture import CameraCapture
+        # Negotiated format, size and rate, shortest driver queue, newest frame on every read
+        cap = CameraCapture(0, **(camera_settings or {}))
+        if not cap.isOpened():
             raise RuntimeError("Could not open webcam")
+        with self.startup.phase("first grab"):
+            cap.read()  # Many cameras take a while to deliver their first frame
+        print(f"Camera: {cap.describe()}")
+        return cap
+
+    def load_hand_tracker(self, remote_inference, tracker_args):
+        with self.startup.phase("model load"):
+            if remote_inference:
+                from utils.remote_tracker import RemoteHandTracker
+                tracker = RemoteHandTracker(**tracker_args)  # MediaPipe in a worker process
+            else:
+                from utils.hand_tracker import HandTracker
+                tracker = HandTracker(**tracker_args)
+        with self.startup.phase("model warm-up"):
+            tracker.warm_up()
+        return tracker
+
+    def finish_startup(self):
+        """Called once the first frame is on screen."""
+        self.started = True
+        self.startup.mark("first frame")
+        if self.startup_report is not None:
+            print(self.startup.report())
+            if self.startup_report != "-":
+                self.startup.save(self.startup_report)
+        if self.quit_after_startup:
+            self.running = False
 
     def update_paddle(self, new_y):
         self.player.move(new_y)
 
-    def update_opponent_paddle(self, ball_y):
-        target_y = ball_y - PADDLE_HEIGHT // 2 
-        current_y = self.opponent.rect.y
-        new_y = current_y + 0.2 * (target_y - current_y)  # Lower smoothing factor
-        self.opponent.move(new_y)
+    def update_opponent_paddle(self):
+        ball = self.ball if self.balls is None else self.balls.threat(self.opponent.rect.left)
+        self.opponent.move(self.opponent_ai.update(ball, self.opponent.rect))
+
+    def step_balls(self):
+        left_out, right_out = self.balls.step([self.player.rect, self.opponent.rect])
+        self.opponent_score += left_out
+        self.player_score += right_out
 
     def update_score(self):
         if self.ball.rect.left <= 0:
             self.opponent_score += 1
             self.ball.reset()
+            self.waiting_serve = self.gesture_controls
         elif self.ball.rect.right >= WINDOW_WIDTH:
             self.player_score += 1
             self.ball.reset()
+            self.waiting_serve = self.gesture_controls
+
+    def update_gestures(self, hand_result, frame_shape, now):
+        """Classify the hand once per new tracker result and act on held gestures."""
+        from utils.gestures import FIST, NONE, OPEN_PALM, PINCH, classify
+        if hand_result is not self.gesture_result:
+            self.gesture_result = hand_result
+            self.gesture = NONE
+            if hand_result is not None:
+                # (hands, 21, 3) from either tracker; the first hand controls the game
+                landmarks = hand_result.arrays[0]
+                if len(landmarks):
+                    self.gesture = int(classify(landmarks, frame_shape[1] / frame_shape[0])[0])
+        event = self.gesture_trigger.update(self.gesture, now)
+        if event == PINCH:
+            self.paused = not self.paused
+        elif event == OPEN_PALM:
+            self.serve()
+        elif event == FIST:
+            self.player_score = self.opponent_score = 0
+            self.ball.reset()
+            if self.balls is not None:
+                self.balls.reset()
+            self.waiting_serve = True
+
+    def serve(self):
+        if not self.paused:
+            self.waiting_serve = False
+
+    def draw_gesture_status(self):
+        from utils.gestures import GESTURE_NAMES
+        if self.paused:
+            message = "Paused - pinch to resume"
+        elif self.waiting_serve:
+            message = "Open palm or SPACE to serve"
+        else:
+            message = None
+        if message is not None:
+            text = self.font.render(message, True, WHITE)
+            self.screen.blit(text, (WINDOW_WIDTH // 2 - text.get_width() // 2, WINDOW_HEIGHT // 2 - 60))
+        gesture_text = self.small_font.render(f"gesture: {GESTURE_NAMES[self.gesture]}", True, WHITE)
+        self.screen.blit(gesture_text, (WINDOW_WIDTH - gesture_text.get_width() - 10, WINDOW_HEIGHT - 30))
 
     def draw_score(self):
         score_text = self.font.render(f"{self.player_score} : {self.opponent_score}", True, WHITE)
         self.screen.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, 20))
 
+    def draw_hand_age(self):
+        if self.hand_position_age is None:
+            return
+        age_text = self.small_font.render(f"hand age: {self.hand_position_age * 1000:.0f} ms", True, WHITE)
+        self.screen.blit(age_text, (10, WINDOW_HEIGHT - 30))
+
+    def track(self, frame, capture_time=None):
+        """Run the hand tracker on a frame, recording both if --record is on."""
+        with self.tracer.span("track"):
+            hand_result = self.hand_tracker.process(frame)
+        self.record(frame, hand_result, capture_time)
+        return hand_result
+
+    def record(self, frame, hand_result, capture_time=None):
+        if self.record_path is not None:
+            first = self.recorder is None
+            if first:
+                from utils.recording import Recorder
+                self.recorder = Recorder(self.record_path, frame.shape, max_hands=1, scale=self.record_scale,
+                                         stride=self.record_stride, codec=self.record_codec)
+            self.recorder.write(frame, hand_result, capture_time)
+            if first:
+                self.report_record_rate()
+
+    def report_record_rate(self):
+        """Print the recording's data rate (estimated from the first frame when compressed)."""
+        import cv2
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        rate = self.recorder.data_rate(fps) / 2 ** 20
+        height, width = self.recorder.stored_shape[:2]
+        print(f"Recording {width}x{height} {self.record_codec} frames to {self.record_path}: about {rate:.1f} MB/s"
+              f" at {fps:.0f} FPS ({rate * 3600 / 1024:.1f} GB per hour)")
+        if rate > RECORD_RATE_WARNING_MB:
+            print("Warning: that fills a disk fast; --record-codec jpeg, --record-scale and --record-stride "
+                  "make it smaller")
+
+    def apply_quality(self):
+        """Apply the governor's current quality level to the camera, the tracker and the inference rate."""
+        level = self.governor.current
+        # Recordings have a fixed frame size, and replays have the size they were recorded at
+        if self.record_path is None and not self.replaying:
+            # Level sizes are for the 640x480 default: keep the same fraction of the requested size
+            base_width, base_height = QUALITY_LEVELS[0].capture_size
+            width = round(self.camera_size[0] * level.capture_size[0] / base_width)
+            height = round(self.camera_size[1] * level.capture_size[1] / base_height)
+            if self.pipeline is not None:
+                self.pipeline.capture.request_resolution(width, height)
+            else:
+                import cv2
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if hasattr(self.hand_tracker, "configure"):
+            self.hand_tracker.configure(scan_size=level.scan_size or 0, model_complexity=level.model_complexity)
+        self.infer_every = level.infer_every
+        if self.pipeline is not None:
+            self.pipeline.worker.min_interval = (
+                level.infer_every / self.governor.target_fps if level.infer_every > 1 else 0.0)
+
+    def handle_key(self, key):
+        if key == pygame.K_F3:
+            self.hud.toggle()
+        elif key == pygame.K_F4:
+            self.governor.auto = not self.governor.auto
+        elif key in (pygame.K_F5, pygame.K_F6):
+            # Manual quality: F5 lower, F6 higher
+            self.governor.auto = False
+            self.governor.level += 1 if key == pygame.K_F5 else -1
+            self.apply_quality()
+        elif key == pygame.K_SPACE and self.gesture_controls:
+            self.serve()
+        elif key in (pygame.K_F7, pygame.K_F8):
+            step = -10 if key == pygame.K_F7 else 10
+            self.governor.target_fps = max(10, self.governor.target_fps + step)
+
+    def poll_pipeline(self):
+        """
+        Latest camera frame and latest hand tracking result from the pipeline threads.
+        Returns (frame, hand_result, capture_time); never blocks.
+        """
+        frame_item = self.pipeline.latest_frame()
+        result_item = self.pipeline.latest_result()
+        frame = frame_item[1] if frame_item is not None else None
+        if result_item is None:
+            return frame, None, None
+        capture_time, hand_result = result_item
+        return frame, hand_result, capture_time
+
     def run(self):
+        if self.pipeline is not None:
+            self.pipeline.start()
+
         while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
+            self.run_frame()
+
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self.trace_path is not None:
+            self.tracer.export_chrome_trace(self.trace_path)
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.soak is not None:
+            self.finish_soak()
+        self.cap.release()
+        pygame.quit()
+
+    def run_frame(self):
+        """One pass of the game loop: events, capture and tracking, paddles, physics, drawing, present."""
+        frame_start = time.perf_counter()
+        capture_wait = 0.0  # Time blocked on the camera, not counted as frame cost
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                self.handle_key(event.key)
 
-            ret, frame = self.cap.read()
+        if self.pipeline is not None:
+            if self.pipeline.failed:
+                print("Failed to grab frame")
+                self.running = False
+                return
+            frame, hand_result, capture_time = self.poll_pipeline()
+            if frame is None:
+                # Camera has not delivered its first frame yet
+                self.clock.tick(self.governor.target_fps)
+                return
+        else:
+            with self.tracer.span("capture"):
+                ret, frame = self.cap.read()
             if not ret:
                 print("Failed to grab frame")
                 self.running = False
-                break
-
-            original_height, original_width = frame.shape[:2]
-            
-            hand_position, frame = self.hand_tracker.get_hand_position(frame)
-
-            # Keep frame as is for hand tracking
-            hand_position, _ = self.hand_tracker.get_hand_position(frame)
-
-            # AFTER tracking, resize for display
-            frame = cv2.resize(frame, (WINDOW_WIDTH, WINDOW_HEIGHT))
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            frame_surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
-
-            if hand_position:
-                # self.update_paddle(hand_position[1] - PADDLE_HEIGHT // 2)
-                # frame_height, frame_width = frame.shape[:2]
-                finger_x, finger_y = hand_position
-
-
-                # scaled_x = int(map_range(hand_position[0], 0, frame_width, 0, WINDOW_WIDTH))
-                # scaled_y = int(map_range(hand_position[1], 0, frame_height, 0, WINDOW_HEIGHT))
-                
-                # Map original camera coordinates to game window
-                scaled_x = int(map_range(finger_x, 0, original_width, 0, WINDOW_WIDTH))
-                scaled_y = int(map_range(finger_y, 0, original_height, 0, WINDOW_HEIGHT))
-
-                self.update_paddle(scaled_y - PADDLE_HEIGHT // 2)
-                pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, scaled_y), 10)
-
-                #adding smoothing to hand tracking to reduce jitter
-                # previous_y = getattr(self, 'previous_y', hand_position[1])
-                # smoothed_y = smooth_value(hand_position[1], previous_y, smoothing_factor=0.2)
-                # scaled_y = int(smoothed_y / frame_height * WINDOW_HEIGHT)
-                # self.update_paddle(scaled_y - PADDLE_HEIGHT // 2)
-                # scaled_x = int(hand_position[0] / frame_width * WINDOW_WIDTH)
-                # pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, scaled_y), 10)
-                # self.previous_y = smoothed_y
-
-                previous_y = getattr(self, 'previous_y', scaled_y)
-                smoothed_y = smooth_value(scaled_y, previous_y, smoothing_factor=0.6)
-                self.previous_y = smoothed_y
-
-                # Update paddle
-                self.update_paddle(smoothed_y - PADDLE_HEIGHT // 2)
-
-                # Draw fingertip pointer
-                pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, int(smoothed_y)), 10)
-
-            self.update_opponent_paddle(self.ball.rect.centery)
-            self.ball.move()
-            self.ball.check_collision(self.player, self.opponent)
-            self.update_score()
-            
-            self.screen.blit(frame_surface, (0, 0))  # Webcam feed as background
-
+                return
+            read_done = time.perf_counter()
+            capture_wait = read_done - frame_start
+            from utils.capture import frame_capture_time
+            capture_time = frame_capture_time(self.cap, read_done)
+
+            # Inference runs on one frame in infer_every (1 unless the governor lowers it);
+            # frames in between reuse the last result. The pointer is drawn on screen below
+            if self.hand_result is None or self.frame_count % self.infer_every == 0:
+                self.hand_result = self.track(frame, capture_time)
+                self.result_time = capture_time
+            else:
+                self.record(frame, self.hand_result, capture_time)
+            self.frame_count += 1
+            hand_result = self.hand_result
+            capture_time = self.result_time
+        hand_position = hand_result.position if hand_result is not None else None
+
+        original_height, original_width = frame.shape[:2]
+        if capture_time is not None:
+            self.hand_position_age = time.perf_counter() - capture_time
+
+        # AFTER tracking, load the frame into the persistent background surface,
+        # reusing the tracker's RGB conversion when it covers this frame
+        with self.tracer.span("background"):
+            frame_rgb = self.hand_tracker.rgb_frame(frame) if self.pipeline is None else None
+            frame_surface = self.background.update(frame, frame_rgb)
+        self.screen.blit(frame_surface, (0, 0))  # Webcam feed as background, under the pointer
+
+        now = time.perf_counter()
+        if self.gesture_controls:
+            self.update_gestures(hand_result, frame.shape, now)
+        if hand_position:
+            finger_x, finger_y = hand_position
+
+            # Map original camera coordinates to game window
+            self.pointer_x = int(map_range(finger_x, 0, original_width, 0, WINDOW_WIDTH))
+            scaled_y = map_range(finger_y, 0, original_height, 0, WINDOW_HEIGHT)
+            self.finger_filter.update(scaled_y, capture_time if capture_time is not None else now)
+
+        # Place the paddle where the fingertip is expected to be when this frame reaches the screen
+        predicted_y = self.finger_filter.predict(now + self.present_latency.value)
+        if predicted_y is not None:
+            self.update_paddle(int(predicted_y) - PADDLE_HEIGHT // 2)
+
+            # Draw fingertip pointer
+            pygame.draw.circle(self.screen, (0, 255, 0), (self.pointer_x, int(predicted_y)), 10)
+
+        # Fixed-timestep physics: the same number of ticks per second at any frame rate
+        with self.tracer.span("physics"):
+            ticks = self.timestep.advance()
+            for _ in range(0 if self.paused else ticks):
+                self.update_opponent_paddle()
+                if self.waiting_serve:
+                    continue
+                if self.balls is not None:
+                    self.step_balls()
+                else:
+                    self.ball.step(self.player, self.opponent)
+                    self.update_score()
+
+        with self.tracer.span("draw"):
             self.player.draw(self.screen)
             self.opponent.draw(self.screen)
-            self.ball.draw(self.screen, self.player, self.opponent)
+            if self.balls is not None:
+                self.balls.draw(self.screen, self.timestep.alpha)
+            else:
+                self.ball.draw(self.screen, self.timestep.alpha)
             self.draw_score()
-
-            # Drawing the green pointer in the game window if hand detected
-            # if hand_position:
-            #     pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, scaled_y), 10)
-
-            pygame.display.flip()
-            self.clock.tick(60)
-
-        self.cap.release()
-        cv2.destroyAllWindows()
-        pygame.quit()
+            if self.pipeline is not None:
+                self.draw_hand_age()
+            if self.gesture_controls:
+                self.draw_gesture_status()
+
+        # Drawing the green pointer in the game window if hand detected
+        # if hand_position:
+        #     pygame.draw.circle(self.screen, (0, 255, 0), (scaled_x, scaled_y), 10)
+
+        self.hud.status = self.governor.status()
+        self.hud.draw(self.screen)
+        with self.tracer.span("flip"):
+            self.display.present()
+        presented = time.perf_counter()
+        if not self.started:
+            self.finish_startup()
+        if self.soak is not None:
+            self.soak.frame()
+            if self.soak.done:
+                self.running = False
+        self.present_latency.add(presented - now)
+        if self.governor.add_frame(presented - frame_start - capture_wait):
+            self.apply_quality()
+        with self.tracer.span("tick"):
+            self.clock.tick(self.governor.target_fps)
+        self.tracer.frame()
+
+    def finish_soak(self):
+        summary = self.soak.summary()
+        print(self.soak.report(summary))
+        if self.soak_report is not None:
+            self.soak.save(self.soak_report, summary)
+        self.soak.stop()
+        self.soak_passed = summary["passed"]
 
     def close(self):
         self.hand_tracker.release()
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="CV Pong")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="capture and hand inference on background threads")
+    parser.add_argument("--roi", action="store_true",
+                        help="run hand inference on a crop around the last known hand position")
+    parser.add_argument("--roi-size", type=int, default=192,
+                        help="side in pixels the ROI crop is resized to (smaller is faster, less accurate)")
+    parser.add_argument("--record", metavar="PATH",
+                        help="save camera frames and hand tracking results to a recording file")
+    parser.add_argument("--record-scale", type=float, default=1.0, metavar="F",
+                        help="with --record, store frames downscaled by this factor (e.g. 0.5)")
+    parser.add_argument("--record-codec", choices=("jpeg", "png", "raw"), default="jpeg",
+                        help="with --record, how frames are stored: jpeg (small), png (lossless) or raw "
+                             "(largest, but replays map frames from the file without decoding)")
+    parser.add_argument("--record-stride", type=int, default=1, metavar="N",
+                        help="with --record, store one frame in N")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="play a recording instead of using the webcam")
+    parser.add_argument("--replay-landmarks", action="store_true",
+                        help="with --replay, use the recorded hand positions instead of re-running inference")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="record per-stage timings and write them as Chrome trace JSON on exit")
+    parser.add_argument("--no-predict", action="store_true",
+                        help="smooth the fingertip but do not extrapolate it to display time")
+    parser.add_argument("--remote-inference", action="store_true",
+                        help="run MediaPipe in a separate process so it does not hold up rendering")
+    parser.add_argument("--target-fps", type=float, default=60,
+                        help="frame rate the quality governor tries to hold")
+    parser.add_argument("--quality", type=int, choices=range(len(QUALITY_LEVELS)),
+                        help="fix the quality level (0 = full) instead of adapting it to the load")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="skip hand inference on frames where nothing moved around the hand")
+    parser.add_argument("--flow", action="store_true",
+                        help="run MediaPipe on keyframes only and follow the fingertip with optical flow in between")
+    parser.add_argument("--keyframe-interval", type=int, default=6,
+                        help="with --flow, run MediaPipe at least once every this many frames")
+    parser.add_argument("--startup-report", metavar="PATH", nargs="?", const="-",
+                        help="print how long each startup step took; with PATH, also save it as JSON")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="exit as soon as the first frame is shown (for measuring startup time)")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES), default="medium",
+                        help="computer opponent strength")
+    parser.add_argument("--gestures", action="store_true",
+                        help="hand gesture controls: pinch to pause, open palm (or SPACE) to serve, fist to reset the score")
+    parser.add_argument("--soak", metavar="DURATION",
+                        help="unattended soak run for DURATION (e.g. 600, 45m, 8h) on --replay (looped) or "
+                             "generated frames; reports FPS drift and memory growth and exits 1 if any is flagged")
+    parser.add_argument("--soak-interval", type=float, default=30,
+                        help="seconds between soak samples")
+    parser.add_argument("--soak-report", metavar="PATH", help="save the soak summary and samples as JSON")
+    parser.add_argument("--soak-fps-drop", type=float, default=0.1,
+                        help="flag a fall of the median FPS beyond this fraction")
+    parser.add_argument("--soak-rss-growth", type=float, default=50,
+                        help="flag RSS growth beyond this many MB")
+    parser.add_argument("--camera-size", default="640x480", metavar="WxH", help="camera resolution to request")
+    parser.add_argument("--camera-fps", type=float, default=60, help="camera frame rate to request")
+    parser.add_argument("--camera-format", type=str.upper, default="MJPG", metavar="FOURCC",
+                        help="camera pixel format to request, e.g. MJPG or YUYV; the other formats are tried "
+                             "if the camera refuses it (auto: leave the camera's choice)")
+    parser.add_argument("--no-drain", action="store_true",
+                        help="never skip queued frames to reach the newest (by default they are skipped "
+                             "when the camera driver keeps more than one frame queued)")
+    parser.add_argument("--window-size", type=parse_size, metavar="WxH",
+                        help="window size; the game is drawn at 800x600 and scaled to fit")
+    parser.add_argument("--fullscreen", action="store_true", help="full screen at the desktop resolution")
+    parser.add_argument("--scale", choices=SCALE_MODES, default="fast",
+                        help=SCALE_HELP)
+    parser.add_argument("--balls", type=int, default=1,
+                        help="chaos mode: this many small balls at once, bouncing off each other too")
+    args = parser.parse_args()
+    if args.camera_format != "AUTO" and len(args.camera_format) != 4:
+        parser.error(f"--camera-format: a FOURCC has 4 characters, not {args.camera_format!r}")
+
+    camera_width, camera_height = parse_size(args.camera_size)
+    camera_settings = dict(width=camera_width, height=camera_height, fps=args.camera_fps,
+                           fourcc=None if args.camera_format == "AUTO" else args.camera_format,
+                           drain=False if args.no_drain else None)
+    soak = None
+    if args.soak is not None:
+        from utils.soak import DriftThresholds, SoakMonitor, parse_duration
+        soak = SoakMonitor(parse_duration(args.soak), interval=args.soak_interval,
+                           thresholds=DriftThresholds(fps_drop=args.soak_fps_drop, rss_growth_mb=args.soak_rss_growth))
+    game = Game(pipelined=args.pipelined, roi_mode=args.roi, roi_size=args.roi_size,
+                record_path=args.record, replay_path=args.replay, replay_landmarks=args.replay_landmarks,
+                trace_path=args.trace, predict=not args.no_predict,
+                remote_inference=args.remote_inference, target_fps=args.target_fps, quality=args.quality,
+                motion_gate=args.motion_gate, flow_mode=args.flow, keyframe_interval=args.keyframe_interval,
+                startup_report=args.startup_report, quit_after_startup=args.quit_after_startup,
+                difficulty=args.difficulty, gesture_controls=args.gestures,
+                soak=soak, soak_report=args.soak_report, camera_settings=camera_settings,
+                window_size=args.window_size, fullscreen=args.fullscreen, scale=args.scale,
+                balls=args.balls, record_scale=args.record_scale, record_stride=args.record_stride,
+                record_codec=args.record_codec)
     game.run()
+    if game.soak_passed is False:
+        sys.exit(1)
@@ -0,0 +1,69 @@
+"""
+Capture latency probe: how old camera frames are when read() returns them, and how many
+new frames per second the camera really delivers, with the default cv2.VideoCapture
+settings and with utils/capture.CameraCapture (negotiated format, size, rate and buffer,
+plus draining of queued frames).
+
+Each capture is read at full speed and at a slower consumer rate, like a game whose frame
+takes longer than the camera period; that is where a driver queue makes frames stale.
+Frame age needs driver timestamps on the same clock as time.perf_counter() (V4L2 on Linux);
+elsewhere only the delivered rate and read times are shown.
+
+    python tests/capture_probe.py
+    python tests/capture_probe.py --camera 1 --size 1280x720 --fps 30 --format YUYV
+    python tests/capture_probe.py --consumer-fps 15 --seconds 5
+"""
+import argparse
+import os
+import sys
+
+import cv2
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.capture import FORMATS, CameraCapture, decode_fourcc, probe
+
+
+def describe_default(cap):
+    return (f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}"
+            f" {decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC)) or '?'} @ {cap.get(cv2.CAP_PROP_FPS):.0f} FPS,"
+            f" buffer {int(cap.get(cv2.CAP_PROP_BUFFERSIZE))}")
+
+
+def format_ms(value):
+    return f"{value:8.1f}" if value is not None else f"{'n/a':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera frame age and delivered FPS, default vs low-latency capture")
+    parser.add_argument("--camera", type=int, default=0)
+    parser.add_argument("--size", default="640x480", help="WIDTHxHEIGHT to request")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--format", choices=FORMATS, default="MJPG")
+    parser.add_argument("--buffer-size", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=3.0, help="probe time per row")
+    parser.add_argument("--consumer-fps", type=float, default=20, help="rate of the slow reader rows")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    print(f"{'capture':<14}{'reader':>10}{'FPS':>8}{'age p50':>8}{'age p95':>8}{'read p50':>9}{'drained':>8}")
+    for name in ("default", "low-latency"):
+        cap = cv2.VideoCapture(args.camera)
+        if not cap.isOpened():
+            raise SystemExit(f"Could not open camera {args.camera}")
+        if name == "default":
+            settings = describe_default(cap)
+        else:
+            cap = CameraCapture(cap, width, height, args.fps, args.format, args.buffer_size)
+            settings = cap.describe()
+        cap.read()  # First frames are often slow
+        for consumer_fps in (None, args.consumer_fps):
+            stats = probe(cap, args.seconds, consumer_fps)
+            reader = "max" if consumer_fps is None else f"{consumer_fps:.0f} FPS"
+            print(f"{name:<14}{reader:>10}{stats['delivered_fps']:8.1f}{format_ms(stats['age_ms_p50'])}"
+                  f"{format_ms(stats['age_ms_p95'])} {format_ms(stats['read_ms_p50'])}{stats['drained']:8.2f}")
+        print(f"{'':<14}{settings}")
+        cap.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Frame time of multi-ball chaos mode (utils/multiball.py) against ball count: one physics
+tick plus drawing every ball, as game.py --balls does each frame at 60 FPS. The ball-ball
+broad phase is a uniform grid, so the cost should grow about linearly with the ball count;
+for comparison, the "all pairs" column times only the exact test of every pair of balls,
+which grows with the square.
+
+Runs with pygame on the dummy video driver, so no window or camera is needed. Exits with
+status 1 if a frame with --budget-balls balls takes longer than the 60 FPS budget at p95.
+
+    python tests/multiball_benchmark.py
+    python tests/multiball_benchmark.py --counts 500 1000 4000 --frames 300
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from game import (BALL_SPEED_X, CHAOS_BALL_SIZE, PADDLE_HEIGHT, PADDLE_WIDTH, SPEED_INCREMENT,
+                  WINDOW_HEIGHT, WINDOW_WIDTH)
+from utils.multiball import MultiBall
+
+COUNTS = [125, 250, 500, 1000, 2000, 4000]
+FRAME_BUDGET_MS = 1000 / 60
+ALL_PAIRS_LIMIT = 2000  # Larger counts need too much memory for the all-pairs comparison
+
+
+def all_pairs_ms(balls, repeats=5):
+    """Time of the exact overlap test over every pair of balls, with no broad phase."""
+    pos = balls.pos[:balls.count]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        delta = pos[:, None, :] - pos[None, :, :]
+        np.nonzero(np.triu((delta ** 2).sum(axis=2) < balls.ball_size ** 2, 1))
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def run(count, frames, warmup, screen, paddles):
+    balls = MultiBall(count, (WINDOW_WIDTH, WINDOW_HEIGHT), CHAOS_BALL_SIZE, BALL_SPEED_X, SPEED_INCREMENT, seed=0)
+    for _ in range(warmup):  # Let the balls spread out from the serve
+        balls.step(paddles)
+    step_times, frame_times, candidates = [], [], []
+    for _ in range(frames):
+        start = time.perf_counter()
+        balls.step(paddles)
+        stepped = time.perf_counter()
+        screen.fill((0, 0, 0))
+        balls.draw(screen, 0.5)
+        end = time.perf_counter()
+        step_times.append(stepped - start)
+        frame_times.append(end - start)
+        candidates.append(balls.candidates)
+    step_times.sort()
+    frame_times.sort()
+    return {
+        "step_ms": step_times[len(step_times) // 2] * 1000,
+        "frame_ms_p50": frame_times[len(frame_times) // 2] * 1000,
+        "frame_ms_p95": frame_times[int(len(frame_times) * 0.95)] * 1000,
+        "candidates": sum(candidates) / len(candidates),
+        "all_pairs_ms": all_pairs_ms(balls) if count <= ALL_PAIRS_LIMIT else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-ball frame time against ball count")
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=120, help="ticks before timing")
+    parser.add_argument("--budget-balls", type=int, default=1000,
+                        help="ball count whose p95 frame time must fit the 60 FPS budget")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    paddles = [pygame.Rect(20, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2, PADDLE_WIDTH, PADDLE_HEIGHT),
+               pygame.Rect(WINDOW_WIDTH - 30 - PADDLE_WIDTH, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2,
+                           PADDLE_WIDTH, PADDLE_HEIGHT)]
+    counts = sorted(set(args.counts) | {args.budget_balls})
+    print(f"{'balls':>6}{'step':>8}{'frame p50':>11}{'p95':>8}{'us/ball':>9}{'pairs':>8}{'all pairs':>11}   (ms)")
+    results = {}
+    for count in counts:
+        stats = results[count] = run(count, args.frames, args.warmup, screen, paddles)
+        all_pairs = f"{stats['all_pairs_ms']:11.2f}" if stats["all_pairs_ms"] is not None else f"{'-':>11}"
+        print(f"{count:6d}{stats['step_ms']:8.2f}{stats['frame_ms_p50']:11.2f}{stats['frame_ms_p95']:8.2f}"
+              f"{stats['frame_ms_p50'] * 1000 / count:9.2f}{stats['candidates']:8.0f}{all_pairs}")
+    pygame.quit()
+
+    # Linear growth: the slope between the two largest counts against the slope between the
+    # two smallest, so the fixed per-frame overhead does not count
+    if len(counts) >= 4:
+        low = (results[counts[1]]["frame_ms_p50"] - results[counts[0]]["frame_ms_p50"]) / (counts[1] - counts[0])
+        high = (results[counts[-1]]["frame_ms_p50"] - results[counts[-2]]["frame_ms_p50"]) / (counts[-1] - counts[-2])
+        print(f"\nms per extra 1000 balls: {low * 1000:.2f} at {counts[0]}-{counts[1]}, "
+              f"{high * 1000:.2f} at {counts[-2]}-{counts[-1]}")
+    budget = results[args.budget_balls]["frame_ms_p95"]
+    within = budget <= FRAME_BUDGET_MS
+    print(f"{args.budget_balls} balls: p95 frame {budget:.2f} ms, budget {FRAME_BUDGET_MS:.2f} ms: "
+          f"{'ok' if within else 'OVER BUDGET'}")
+    if not within:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
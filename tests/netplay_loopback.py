@@ -0,0 +1,127 @@
+"""
+Loopback test of game-Network.py: a host and a client in one process, talking over real
+UDP sockets on localhost through simulated bad networks (latency, jitter, packet loss).
+Time is simulated too, so a minute of play takes a couple of seconds and runs are
+repeatable. Both paddles are driven by a simple AI; the client's AI only sees the client's
+predicted ball, as a player would.
+
+For each network it reports bandwidth each way, how far the client's predicted ball is from
+the host's real one (outside the half second after each serve, which the client cannot
+predict), how far the host's copy of the client paddle lags, and the points each side lost.
+
+    python tests/netplay_loopback.py
+    python tests/netplay_loopback.py --seconds 120 --max-error 40    # exit 1 if worse
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+from game import BALL_SIZE, PADDLE_HEIGHT
+from utils.netplay import NetClient, NetHost, NetworkConditions
+
+spec = importlib.util.spec_from_file_location("game_network", os.path.join(ROOT, "game-Network.py"))
+game_network = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(game_network)
+
+# (name, latency s, jitter s, loss) applied to each direction
+NETWORKS = [
+    ("lan", 0.0, 0.0, 0.0),
+    ("wifi", 0.02, 0.005, 0.01),
+    ("internet", 0.05, 0.01, 0.03),
+    ("bad", 0.1, 0.03, 0.1),
+]
+SERVE_GRACE = 0.5  # Seconds after a serve left out of the prediction error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def follow(paddle_y, ball_y):
+    """Paddle AI: ease a fifth of the way toward the ball each frame."""
+    target = ball_y + BALL_SIZE / 2 - PADDLE_HEIGHT / 2
+    return int(paddle_y + 0.2 * (target - paddle_y))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def run_network(latency, jitter, loss, seconds, send_every, seed):
+    random.seed(seed)
+    clock = Clock()
+    net_host = NetHost(0, NetworkConditions(latency, jitter, loss, seed), clock=clock)
+    net_client = NetClient(("127.0.0.1", net_host.port), NetworkConditions(latency, jitter, loss, seed + 1),
+                           clock=clock)
+    host = game_network.HostSide(net_host, send_every)
+    client = game_network.ClientSide(net_client)
+
+    host_y = client_y = 240
+    ball_errors = []
+    paddle_errors = []
+    last_serve = clock.now
+    score = (0, 0)
+    frame_time = 1 / 60
+    for _ in range(int(seconds / frame_time)):
+        clock.now += frame_time
+        host_y = follow(host_y, host.ball_position()[1])
+        host.update(clock.now, host_y)
+        client_y = follow(client_y, client.ball_position()[1])
+        client.update(clock.now, client_y)
+
+        match = host.match
+        if (match.host_score, match.client_score) != score:
+            score = (match.host_score, match.client_score)
+            last_serve = clock.now
+        if net_client.state is not None and clock.now - last_serve > SERVE_GRACE + latency and match.in_play():
+            (host_x, host_ball_y), (client_x, client_ball_y) = host.ball_position(), client.ball_position()
+            ball_errors.append(((host_x - client_x) ** 2 + (host_ball_y - client_ball_y) ** 2) ** 0.5)
+            paddle_errors.append(abs(match.client_paddle.rect.y - client.match.client_paddle.rect.y))
+
+    up, down = net_client.meter.total_sent / seconds, net_client.meter.total_received / seconds
+    net_host.close()
+    net_client.close()
+    return {
+        "up": up, "down": down,
+        "error_p50": percentile(ball_errors, 50), "error_p95": percentile(ball_errors, 95),
+        "paddle_lag": sum(paddle_errors) / max(len(paddle_errors), 1),
+        "host_missed": host.match.client_score, "client_missed": host.match.host_score,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="game-Network.py loopback test over simulated networks")
+    parser.add_argument("--seconds", type=float, default=60, help="simulated play time per network")
+    parser.add_argument("--send-every", type=int, default=2, help="host state interval in physics ticks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-error", type=float,
+                        help="exit 1 if the p95 ball prediction error (px) exceeds this on any network")
+    args = parser.parse_args()
+
+    print(f"{'network':<10}{'up B/s':>8}{'down B/s':>10}{'err p50':>9}{'err p95':>9}"
+          f"{'paddle lag':>12}{'host missed':>13}{'client missed':>15}")
+    failed = False
+    for name, latency, jitter, loss in NETWORKS:
+        stats = run_network(latency, jitter, loss, args.seconds, args.send_every, args.seed)
+        print(f"{name:<10}{stats['up']:8.0f}{stats['down']:10.0f}{stats['error_p50']:9.1f}{stats['error_p95']:9.1f}"
+              f"{stats['paddle_lag']:12.1f}{stats['host_missed']:13d}{stats['client_missed']:15d}")
+        if args.max_error is not None and stats["error_p95"] > args.max_error:
+            failed = True
+    if failed:
+        print(f"FAIL: ball prediction error above {args.max_error} px")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Headless benchmark of the game.py frame pipeline: the real Game, one Game.run_frame() per
+frame, with a frame source in place of the camera:
+capture -> HandTracker -> background conversion -> paddles, OpponentAI and ball physics
+-> draw -> scale/flip
+
+Runs with pygame on the dummy video driver, so no window or camera is needed.
+Frames come from a video file, a recording made with `game.py --record`, or are
+generated (utils.soak.SyntheticSource, unpaced). Reports p50/p95/p99 per stage (from the game's own tracer spans) and per frame
+at each camera resolution. The frame total leaves out the frame-rate limiter's wait.
+
+    python tests/pipeline_benchmark.py                                  # synthetic frames
+    python tests/pipeline_benchmark.py --video clip.mp4 --frames 500
+    python tests/pipeline_benchmark.py --save-baseline baseline.json    # record a baseline
+    python tests/pipeline_benchmark.py --baseline baseline.json         # exit 1 on regression
+
+Baselines are machine specific, so keep them next to the machine that runs the check.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import cv2
+import numpy as np
+import pygame
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import game
+from utils.hand_tracker import HandResult
+from utils.recording import ReplaySource
+from utils.soak import SyntheticSource
+
+STAGES = ["capture", "track", "background", "physics", "draw", "flip", "total"]
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+PERCENTILES = (50, 95, 99)
+
+
+class ResizedSource:
+    """Wraps a video file or recording and resizes its frames to the benchmark resolution."""
+
+    def __init__(self, cap, width, height):
+        self.cap = cap
+        self.size = (width, height)
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            # Loop the clip
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size)
+        return True, frame
+
+    def set(self, prop, value):
+        return False  # The benchmark sets the resolution, not the game's quality level
+
+    def release(self):
+        self.cap.release()
+
+
+class NullTracker:
+    """Stands in for the hand model with --no-tracker: never finds a hand."""
+
+    def __init__(self):
+        self.tracer = None
+        self.frame_id = 0
+
+    def warm_up(self, frame_shape=None):
+        pass
+
+    def process(self, frame, frame_id=None):
+        self.frame_id += 1
+        return HandResult(self.frame_id)
+
+    def rgb_frame(self, frame):
+        return None
+
+    def release(self):
+        pass
+
+
+class BenchmarkGame(game.Game):
+    """game.Game reading the benchmark's frame source instead of the webcam."""
+
+    def __init__(self, source, use_tracker=True, **kwargs):
+        self.source = source
+        self.use_tracker = use_tracker
+        super().__init__(**kwargs)
+
+    def open_camera(self, replay_path=None, camera_settings=None):
+        return self.source
+
+    def load_hand_tracker(self, remote_inference, tracker_args):
+        if not self.use_tracker:
+            return NullTracker()
+        return super().load_hand_tracker(remote_inference, tracker_args)
+
+
+def open_source(args, width, height):
+    if args.video:
+        return ResizedSource(cv2.VideoCapture(args.video), width, height)
+    if args.replay:
+        return ResizedSource(ReplaySource(args.replay, realtime=False, loop=True), width, height)
+    return SyntheticSource((width, height), fps=None)
+
+
+def run_resolution(args, width, height):
+    """Run the game for args.frames frames and return per-stage timings in ms."""
+    # Fixed quality level, and a frame-rate cap the frames never reach
+    bench = BenchmarkGame(open_source(args, width, height), use_tracker=not args.no_tracker,
+                          quality=0, target_fps=1000)
+    tracer = bench.tracer
+    tracer.enabled = True
+    timings = {stage: [] for stage in STAGES}
+
+    for i in range(args.warmup + args.frames):
+        start = time.perf_counter()
+        bench.run_frame()
+        elapsed = (time.perf_counter() - start) * 1000
+        if not bench.running:
+            raise RuntimeError("Frame source ran dry")
+        spans = {name: sum(durations) for name, durations in tracer.stats.items()}
+        for durations in tracer.stats.values():
+            durations.clear()
+        if i < args.warmup:
+            continue
+        for stage in STAGES[:-1]:
+            timings[stage].append(spans.get(stage, 0.0))
+        timings["total"].append(elapsed - spans.get("tick", 0.0))
+
+    bench.cap.release()
+    bench.close()
+    return timings
+
+
+def summarize(timings):
+    return {stage: {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+            for stage, values in timings.items()}
+
+
+def print_report(results):
+    header = f"{'resolution':<11}{'stage':<9}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    print(header)
+    print("-" * len(header))
+    for resolution, stages in results.items():
+        for stage in STAGES:
+            row = "".join(f"{stages[stage][f'p{p}']:>10.2f}" for p in PERCENTILES)
+            print(f"{resolution:<11}{stage:<9}{row}")
+
+
+def compare(results, baseline, tolerance, min_delta):
+    """List regressions: p95 above baseline by more than tolerance (relative) and min_delta ms."""
+    failures = []
+    for resolution, stages in results.items():
+        for stage, values in stages.items():
+            reference = baseline.get(resolution, {}).get(stage)
+            if reference is None:
+                continue
+            now, before = values["p95"], reference["p95"]
+            if now > before * (1 + tolerance) and now - before > min_delta:
+                failures.append(f"{resolution} {stage}: p95 {now:.2f} ms vs baseline {before:.2f} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless CV Pong frame pipeline benchmark")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--video", help="video file to use as the camera")
+    source.add_argument("--replay", help="recording made with game.py --record to use as the camera")
+    parser.add_argument("--frames", type=int, default=200, help="measured frames per resolution")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured frames per resolution")
+    parser.add_argument("--resolutions", nargs="+", default=[f"{w}x{h}" for w, h in RESOLUTIONS],
+                        help="camera resolutions to test, e.g. 640x480")
+    parser.add_argument("--no-tracker", action="store_true", help="skip MediaPipe (measures the rest)")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="fail if p95 times regress against this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 slowdown")
+    parser.add_argument("--min-delta", type=float, default=0.5, help="ignore slowdowns smaller than this (ms)")
+    args = parser.parse_args()
+
+    results = {}
+    for resolution in args.resolutions:
+        width, height = (int(v) for v in resolution.split("x"))
+        results[resolution] = summarize(run_resolution(args, width, height))
+    pygame.quit()
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance, args.min_delta)
+        if failures:
+            print("Regressions:")
+            for failure in failures:
+                print("  " + failure)
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
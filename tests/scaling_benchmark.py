@@ -0,0 +1,83 @@
+"""
+Per-frame render cost of game.py at several display resolutions: the game drawn on the
+800x600 logical surface and scaled once (fast or smooth), against drawing everything,
+webcam background included, at the display resolution.
+
+Runs with pygame on the dummy video driver, so no window or camera is needed; the flip
+itself is nearly free there, so the figures are the CPU work the game does per frame.
+
+    python tests/scaling_benchmark.py
+    python tests/scaling_benchmark.py --frames 300 --sizes 1280x720 3840x2160
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from game import BALL_SIZE, PADDLE_HEIGHT, PADDLE_WIDTH, WHITE, WINDOW_HEIGHT, WINDOW_WIDTH
+from utils.display import CameraBackground, ScaledDisplay, parse_size
+
+SIZES = ["800x600", "1280x720", "1920x1080", "3840x2160"]
+
+
+def draw_frame(surface, background, frame, font, i):
+    """The game's per-frame drawing, at whatever size surface is."""
+    width, height = surface.get_size()
+    scale_x, scale_y = width / WINDOW_WIDTH, height / WINDOW_HEIGHT
+    surface.blit(background.update(frame), (0, 0))
+    paddle = (round(PADDLE_WIDTH * scale_x), round(PADDLE_HEIGHT * scale_y))
+    pygame.draw.rect(surface, WHITE, pygame.Rect((round(20 * scale_x), height // 3), paddle))
+    pygame.draw.rect(surface, WHITE, pygame.Rect((width - round(30 * scale_x) - paddle[0], height // 2), paddle))
+    ball_x = (i * 7) % width
+    pygame.draw.circle(surface, WHITE, (ball_x, height // 2), round(BALL_SIZE / 2 * scale_y))
+    surface.blit(font.render("3 : 2", True, WHITE), (width // 2, round(20 * scale_y)))
+
+
+def run(mode, size, frames, camera_frame, font):
+    if mode == "native":
+        display = pygame.display.set_mode(size)
+        surface, present = display, pygame.display.flip
+    else:
+        scaled = ScaledDisplay((WINDOW_WIDTH, WINDOW_HEIGHT), size, scale=mode)
+        surface, present = scaled.surface, scaled.present
+    background = CameraBackground(surface.get_size())
+    times = []
+    for i in range(frames):
+        start = time.perf_counter()
+        draw_frame(surface, background, camera_frame, font, i)
+        present()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000, times[int(len(times) * 0.95)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render cost per frame against display resolution")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="display sizes as WxH")
+    args = parser.parse_args()
+
+    pygame.init()
+    font = pygame.font.SysFont(None, 36)
+    camera_frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    modes = ["fast", "smooth", "native"]
+    print(f"{'display':<12}" + "".join(f"{mode + ' p50':>13}{'p95':>8}" for mode in modes) + "   (ms per frame)")
+    for text in args.sizes:
+        size = parse_size(text)
+        row = f"{text:<12}"
+        for mode in modes:
+            p50, p95 = run(mode, size, args.frames, camera_frame, font)
+            row += f"{p50:13.2f}{p95:8.2f}"
+        print(row)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
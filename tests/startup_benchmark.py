@@ -0,0 +1,92 @@
+"""
+Startup time of game.py: from the start of the script to the first frame on screen, with
+the breakdown of each startup step (imports, window, camera, hand model load and warm-up).
+
+Each run starts game.py in a fresh interpreter (import time only counts once per process)
+with --quit-after-startup, on the dummy video driver. Input is a recording made with
+`game.py --record`, or a few generated frames when none is given, so no camera is needed.
+
+    python tests/startup_benchmark.py                           # 5 runs on generated frames
+    python tests/startup_benchmark.py --replay session.rec --runs 10
+    python tests/startup_benchmark.py --remote-inference
+    python tests/startup_benchmark.py --max-seconds 3           # exit 1 if slower (for CI)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+from utils.recording import Recorder
+
+
+def make_recording(path, frames=30, size=(640, 480)):
+    width, height = size
+    recorder = Recorder(path, (height, width, 3), max_hands=1)
+    for i in range(frames):
+        recorder.write(np.full((height, width, 3), 40 + i, dtype=np.uint8), None, i / 30)
+    recorder.close()
+
+
+def run_once(replay_path, report_path, extra_args):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    command = [sys.executable, os.path.join(ROOT, "game.py"), "--replay", replay_path,
+               "--quit-after-startup", "--startup-report", report_path] + extra_args
+    subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    with open(report_path) as f:
+        return {phase["name"]: phase for phase in json.load(f)["phases"]}
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="game.py startup time benchmark")
+    parser.add_argument("--replay", metavar="PATH", help="recording to start the game on (default: generated)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--remote-inference", action="store_true", help="pass --remote-inference to the game")
+    parser.add_argument("--max-seconds", type=float,
+                        help="exit 1 if the median time to the first frame is longer than this")
+    parser.add_argument("--json", metavar="PATH", help="save the median breakdown as JSON")
+    args = parser.parse_args()
+
+    extra_args = ["--remote-inference"] if args.remote_inference else []
+    with tempfile.TemporaryDirectory() as tmp:
+        replay_path = args.replay
+        if replay_path is None:
+            replay_path = os.path.join(tmp, "startup.rec")
+            make_recording(replay_path)
+        runs = [run_once(replay_path, os.path.join(tmp, f"startup-{i}.json"), extra_args) for i in range(args.runs)]
+
+    # Phases in the order they started in the first run; start/end/duration medians over all runs
+    names = sorted(runs[0], key=lambda name: runs[0][name]["start"])
+    summary = {}
+    print(f"{'startup phase':<20}{'start s':>9}{'end s':>9}{'took s':>9}  thread   (median of {len(runs)} runs)")
+    for name in names:
+        phases = [run[name] for run in runs if name in run]
+        start = median([phase["start"] for phase in phases])
+        end = median([phase["end"] for phase in phases])
+        took = median([phase["end"] - phase["start"] for phase in phases])
+        summary[name] = {"start": start, "end": end, "duration": took, "thread": phases[0]["thread"]}
+        print(f"{name:<20}{start:9.3f}{end:9.3f}{took:9.3f}  {phases[0]['thread']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    first_frame = summary["first frame"]["end"]
+    if args.max_seconds is not None and first_frame > args.max_seconds:
+        print(f"FAIL: first frame after {first_frame:.3f} s, limit {args.max_seconds:.3f} s")
+        sys.exit(1)
+    print(f"first frame after {first_frame:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
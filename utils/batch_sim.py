@@ -0,0 +1,310 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# The sizes, speeds and walls are game.py's (from physics.py), and a tick follows Ball.step
+# (push-out, then a swept move against both paddles and the walls, all four sides of each box,
+# with up to MAX_CONTACTS_PER_TICK bounces) and OpponentAI.update, so results carry over to
+# the real game. Needs only NumPy: python utils/batch_sim.py
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from opponent import DIFFICULTIES
+from physics import (BALL_SIZE, BALL_SPEED_X, BALL_SPEED_Y, MAX_CONTACTS_PER_TICK, OPPONENT_X, PADDLE_HEIGHT,
+                     PADDLE_START_Y, PADDLE_WIDTH, PLAYER_X, SPEED_INCREMENT, TICK_RATE, WALLS, WINDOW_HEIGHT,
+                     WINDOW_WIDTH)
+
+# Observation columns
+BALL_X, BALL_Y, BALL_DX, BALL_DY, PLAYER_Y, OPPONENT_Y = range(6)
+
+
+def fold(value, low, high):
+    """Vectorized opponent.fold: values reflected back into [low, high] like a ball between two walls."""
+    span = high - low
+    offset = (value - low) % (2 * span)
+    return low + np.where(offset <= span, offset, 2 * span - offset)
+
+
+def swept_aabb(x, y, size, dx, dy, bx, by, bw, bh):
+    """
+    Vectorized physics.swept_aabb for size x size boxes against one box per game.
+    Returns (t, x_face): time of impact (inf where they don't touch during the move) and
+    whether the box was hit on a vertical face.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx_entry = np.where(dx > 0, (bx - (x + size)) / dx, (bx + bw - x) / dx)
+        tx_exit = np.where(dx > 0, (bx + bw - x) / dx, (bx - (x + size)) / dx)
+        ty_entry = np.where(dy > 0, (by - (y + size)) / dy, (by + bh - y) / dy)
+        ty_exit = np.where(dy > 0, (by + bh - y) / dy, (by - (y + size)) / dy)
+    still_x, still_y = dx == 0, dy == 0
+    tx_entry = np.where(still_x, -np.inf, tx_entry)
+    tx_exit = np.where(still_x, np.inf, tx_exit)
+    ty_entry = np.where(still_y, -np.inf, ty_entry)
+    ty_exit = np.where(still_y, np.inf, ty_exit)
+    entry = np.maximum(tx_entry, ty_entry)
+    exit_ = np.minimum(tx_exit, ty_exit)
+    touch = (entry < exit_) & (entry >= 0.0) & (entry <= 1.0)
+    touch &= ~(still_x & ((x + size <= bx) | (x >= bx + bw)))
+    touch &= ~(still_y & ((y + size <= by) | (y >= by + bh)))
+    return np.where(touch, entry, np.inf), tx_entry > ty_entry
+
+
+class BatchPong:
+    """
+    Headless Pong that simulates N games at once as struct-of-arrays NumPy state.
+    One step() is one physics tick for every game. Gym-style batched API:
+
+        sim = BatchPong(4096, opponent_reaction=np.linspace(0.0, 0.4, 4096))
+        obs = sim.reset(seed=0)
+        obs, rewards, dones, info = sim.step()        # player paddle follows the ball, with lag
+        obs, rewards, dones, info = sim.step(targets) # player paddle tops set directly
+
+    The opponent is OpponentAI, vectorized, with per-game reaction (s), aiming error (px)
+    and max_speed (px per tick, inf for no limit); they default to the "medium" tier.
+    Without actions the player paddle covers player_smoothing of the distance to the ball
+    each tick, a stand-in for a hand on the camera.
+
+    Rewards are +1 when the player scores and -1 when the opponent scores. A game is
+    done when either side reaches max_score; finished games are reset automatically.
+    """
+
+    def __init__(self, num_games, opponent_reaction=None, opponent_error=None, opponent_max_speed=None,
+                 player_smoothing=0.7, max_score=11, ball_speed_x=BALL_SPEED_X, ball_speed_y=BALL_SPEED_Y,
+                 speed_increment=SPEED_INCREMENT):
+        self.num_games = num_games
+        self.max_score = max_score
+        self.ball_speed_x = float(ball_speed_x)
+        self.ball_speed_y = float(ball_speed_y)
+        self.speed_increment = float(speed_increment)
+
+        def per_game(value, default):
+            value = default if value is None else value
+            return np.broadcast_to(np.asarray(value, dtype=np.float64), (num_games,)).copy()
+
+        medium = DIFFICULTIES["medium"]
+        self.opponent_reaction = per_game(opponent_reaction, medium.reaction)
+        self.opponent_error = per_game(opponent_error, medium.error)
+        self.opponent_max_speed = per_game(opponent_max_speed, medium.max_speed)
+        self.player_smoothing = per_game(player_smoothing, None)
+
+        self.ball_x = np.zeros(num_games)
+        self.ball_y = np.zeros(num_games)
+        self.ball_dx = np.zeros(num_games)
+        self.ball_dy = np.zeros(num_games)
+        self.player_y = np.zeros(num_games)
+        self.opponent_y = np.zeros(num_games)
+        self.player_score = np.zeros(num_games, dtype=np.int32)
+        self.opponent_score = np.zeros(num_games, dtype=np.int32)
+        self.hits = np.zeros(num_games, dtype=np.int64)  # Paddle hits, i.e. rally length summed over the game
+
+        # OpponentAI state per game (see OpponentAI.update)
+        self._ai_dx = np.full(num_games, np.nan)       # Ball velocity the cached intercept is for
+        self._ai_dy = np.full(num_games, np.nan)
+        self._ai_last_x = np.full(num_games, np.nan)
+        self._ai_intercept = np.full(num_games, np.nan)
+        self._ai_target = np.full(num_games, np.nan)
+        self._ai_wait = np.full(num_games, -1)         # Ticks before the pending target is taken, -1 for none
+        self._ai_pending = np.zeros(num_games)
+
+        self.rng = np.random.default_rng()
+        self._obs = np.empty((num_games, 6), dtype=np.float32)
+
+    def reset(self, seed=None):
+        """Start every game from scratch and return the observations."""
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        everything = np.ones(self.num_games, dtype=bool)
+        self.player_y[:] = PADDLE_START_Y
+        self.opponent_y[:] = PADDLE_START_Y
+        self.player_score[:] = 0
+        self.opponent_score[:] = 0
+        self.hits[:] = 0
+        for state in (self._ai_dx, self._ai_dy, self._ai_last_x, self._ai_intercept, self._ai_target):
+            state[:] = np.nan
+        self._ai_wait[:] = -1
+        self._serve(everything)
+        return self._observe()
+
+    def _serve(self, mask):
+        """Put the ball back in the middle with a random diagonal direction, for the masked games."""
+        count = int(mask.sum())
+        if not count:
+            return
+        self.ball_x[mask] = WINDOW_WIDTH // 2 - BALL_SIZE // 2
+        self.ball_y[mask] = WINDOW_HEIGHT // 2 - BALL_SIZE // 2
+        self.ball_dx[mask] = self.rng.choice([self.ball_speed_x, -self.ball_speed_x], count)
+        self.ball_dy[mask] = self.rng.choice([self.ball_speed_y, -self.ball_speed_y], count)
+
+    def _observe(self):
+        obs = self._obs
+        obs[:, BALL_X] = self.ball_x
+        obs[:, BALL_Y] = self.ball_y
+        obs[:, BALL_DX] = self.ball_dx
+        obs[:, BALL_DY] = self.ball_dy
+        obs[:, PLAYER_Y] = self.player_y
+        obs[:, OPPONENT_Y] = self.opponent_y
+        return obs
+
+    def _follow_ball(self, paddle_y, smoothing):
+        target_y = self.ball_y + BALL_SIZE / 2 - PADDLE_HEIGHT // 2
+        paddle_y += smoothing * (target_y - paddle_y)
+        np.rint(paddle_y, out=paddle_y)  # Paddles are integer rects in the game
+        np.clip(paddle_y, 0, WINDOW_HEIGHT - PADDLE_HEIGHT, out=paddle_y)
+
+    def _move_opponent(self):
+        """One OpponentAI.update() per game, then Paddle.move()."""
+        x, y, dx, dy = self.ball_x, self.ball_y, self.ball_dx, self.ball_dy
+        served = ~np.isnan(self._ai_last_x) & ((x - self._ai_last_x) * dx < 0)
+        self._ai_last_x[:] = x
+        changed = (dx != self._ai_dx) | (dy != self._ai_dy) | served
+        if changed.any():
+            self._ai_dx[changed] = dx[changed]
+            self._ai_dy[changed] = dy[changed]
+            face_x = OPPONENT_X - BALL_SIZE
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ticks = (face_x - x) / dx
+            intercept = np.where(ticks >= 0, fold(y + dy * ticks, 0, WINDOW_HEIGHT - BALL_SIZE) + BALL_SIZE / 2,
+                                 WINDOW_HEIGHT / 2)
+            # A wall bounce changes the velocity but not where the ball ends up
+            moved = changed & ~(np.abs(intercept - self._ai_intercept) <= 1)
+            self._ai_intercept[moved] = intercept[moved]
+            error = self.opponent_error[moved]
+            self._ai_pending[moved] = intercept[moved] + self.rng.uniform(-error, error)
+            self._ai_wait[moved] = np.rint(self.opponent_reaction[moved] * TICK_RATE)
+
+        pending = self._ai_wait >= 0
+        react = pending & (self._ai_wait == 0)
+        self._ai_target[react] = self._ai_pending[react]
+        self._ai_wait[react] = -1
+        self._ai_wait[pending & ~react] -= 1
+
+        aiming = ~np.isnan(self._ai_target)
+        step = np.clip(self._ai_target - (self.opponent_y + PADDLE_HEIGHT // 2),
+                       -self.opponent_max_speed, self.opponent_max_speed)
+        new_y = np.where(aiming, np.rint(self.opponent_y + step), self.opponent_y)
+        np.clip(new_y, 0, WINDOW_HEIGHT - PADDLE_HEIGHT, out=self.opponent_y)
+
+    def _push_out(self, paddle_x, paddle_y):
+        """Vectorized physics.push_out for one paddle; returns the games where it reflected the ball."""
+        x, y, dx = self.ball_x, self.ball_y, self.ball_dx
+        overlap = ((x + BALL_SIZE > paddle_x) & (x < paddle_x + PADDLE_WIDTH)
+                   & (y + BALL_SIZE > paddle_y) & (y < paddle_y + PADDLE_HEIGHT))
+        left_half = x + BALL_SIZE / 2 < paddle_x + PADDLE_WIDTH / 2
+        to_left = overlap & left_half & (dx > 0)
+        to_right = overlap & ~left_half & (dx < 0)
+        x[to_left] = paddle_x - BALL_SIZE
+        x[to_right] = paddle_x + PADDLE_WIDTH
+        hit = to_left | to_right
+        dx[hit] = -dx[hit]
+        return hit
+
+    def _sweep(self):
+        """
+        Vectorized physics.sweep_box against both paddles and the walls: move each ball to its
+        first contact, reflect, and go on with the rest of the move. Returns paddle hits per game.
+        """
+        n = self.num_games
+        x, y, dx, dy = self.ball_x, self.ball_y, self.ball_dx, self.ball_dy
+        boxes = [(PLAYER_X, self.player_y, PADDLE_WIDTH, PADDLE_HEIGHT),
+                 (OPPONENT_X, self.opponent_y, PADDLE_WIDTH, PADDLE_HEIGHT)] + list(WALLS)
+        paddle_hits = np.zeros(n, dtype=np.int64)
+        remaining = np.ones(n)
+        moving = np.ones(n, dtype=bool)  # Games still resolving contacts this tick
+        for _ in range(MAX_CONTACTS_PER_TICK):
+            move_x, move_y = dx * remaining, dy * remaining
+            first_t = np.full(n, np.inf)
+            first = np.full(n, -1)
+            x_face = np.zeros(n, dtype=bool)
+            for i, (bx, by, bw, bh) in enumerate(boxes):
+                t, box_x_face = swept_aabb(x, y, BALL_SIZE, move_x, move_y, bx, by, bw, bh)
+                closer = moving & (t < first_t)
+                first_t[closer] = t[closer]
+                first[closer] = i
+                x_face[closer] = box_x_face[closer]
+            free = moving & (first < 0)
+            x[free] += move_x[free]
+            y[free] += move_y[free]
+            moving &= ~free
+            if not moving.any():
+                break
+            t = first_t[moving]
+            x[moving] += move_x[moving] * t
+            y[moving] += move_y[moving] * t
+            dx[moving & x_face] *= -1
+            dy[moving & ~x_face] *= -1
+            paddle_hits += moving & (first < 2)
+            remaining[moving] *= 1.0 - t
+        # Games still moving used up their contacts: they stop there, as in sweep_box
+        return paddle_hits
+
+    def step(self, actions=None):
+        """
+        Advance every game by one physics tick.
+        actions: optional (N,) array of player paddle top positions; None lets the player model play.
+        Returns (obs, rewards, dones, info).
+        """
+        if actions is None:
+            self._follow_ball(self.player_y, self.player_smoothing)
+        else:
+            np.clip(np.rint(actions), 0, WINDOW_HEIGHT - PADDLE_HEIGHT, out=self.player_y)
+        self._move_opponent()
+
+        # Ball.step: paddles that moved onto the ball push it out, then the swept move
+        hits = self._push_out(PLAYER_X, self.player_y).astype(np.int64)
+        hits += self._push_out(OPPONENT_X, self.opponent_y)
+        hits += self._sweep()
+        # Speed up once per paddle hit, like the real game
+        self.ball_dx += np.where(self.ball_dx > 0, self.speed_increment, -self.speed_increment) * hits
+        self.ball_dy += np.where(self.ball_dy > 0, self.speed_increment, -self.speed_increment) * hits
+        self.hits += hits > 0
+
+        # Scoring, as in Game.update_score (on the rounded rect)
+        ball_left = np.rint(self.ball_x)
+        opponent_point = ball_left <= 0
+        player_point = ~opponent_point & (ball_left + BALL_SIZE >= WINDOW_WIDTH)
+        self.opponent_score += opponent_point
+        self.player_score += player_point
+        rewards = player_point.astype(np.float32) - opponent_point.astype(np.float32)
+        self._serve(opponent_point | player_point)
+
+        dones = (self.player_score >= self.max_score) | (self.opponent_score >= self.max_score)
+        info = {
+            "player_score": self.player_score.copy(),
+            "opponent_score": self.opponent_score.copy(),
+            "hits": self.hits.copy(),
+        }
+        if dones.any():
+            self.player_score[dones] = 0
+            self.opponent_score[dones] = 0
+            self.hits[dones] = 0
+            self.player_y[dones] = PADDLE_START_Y
+            self.opponent_y[dones] = PADDLE_START_Y
+            self._serve(dones)
+
+        return self._observe(), rewards, dones, info
+
+
+if __name__ == "__main__":
+    # Sweep the opponent's reaction time across games, for each difficulty tier's error and
+    # speed, and report throughput
+    num_games = 4096
+    tiers = [DIFFICULTIES[name] for name in ("easy", "medium", "hard")]
+    per_tier = num_games // len(tiers)
+    reaction = np.tile(np.linspace(0.0, 0.4, per_tier), len(tiers))
+    error = np.repeat([tier.error for tier in tiers], per_tier)
+    max_speed = np.repeat([tier.max_speed for tier in tiers], per_tier)
+    num_games = len(reaction)
+    sim = BatchPong(num_games, opponent_reaction=reaction, opponent_error=error, opponent_max_speed=max_speed)
+    sim.reset(seed=0)
+    points = np.zeros(num_games)  # Opponent points minus player points
+    steps = 5000
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, rewards, dones, info = sim.step()
+        points -= rewards
+    elapsed = time.perf_counter() - start
+    print(f"{num_games * steps / elapsed:,.0f} game-steps/s ({steps / elapsed:,.0f} batched steps/s)")
+    for t, tier in enumerate(tiers):
+        for k in range(t * per_tier, (t + 1) * per_tier, per_tier // 4):
+            print(f"{tier.name:<7} error {tier.error:3.0f} px, speed {tier.max_speed:2.0f} px/tick, "
+                  f"reaction {sim.opponent_reaction[k]:.2f} s: point difference {int(points[k]):+d}")
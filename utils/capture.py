@@ -0,0 +1,210 @@
+import time
+
+import cv2
+
+# Low-latency webcam capture. By default a camera picks its own pixel format and frame
+# rate, and the driver keeps a queue of frames: when the game reads slower than the camera
+# delivers, read() returns the oldest queued frame, several frame periods stale. CameraCapture
+# asks for a format, size and rate, keeps the driver queue as short as the backend allows,
+# and drains whatever is still queued so every read returns the newest frame.
+
+FORMATS = ("MJPG", "YUYV")
+MAX_DRIVER_CLOCK_OFFSET = 1.0  # Driver timestamps further than this (s) from now are on another clock
+
+
+def decode_fourcc(value):
+    """"MJPG" from the number cv2.CAP_PROP_FOURCC returns ("" if unset)."""
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4)).strip("\0")
+
+
+def frame_capture_time(cap, default):
+    """
+    When the frame last read from cap was captured: the driver's timestamp for a CameraCapture
+    that has one, otherwise default (usually the time read() returned).
+    """
+    captured = getattr(cap, "captured_at", None)
+    return captured if captured is not None else default
+
+
+class CameraCapture:
+    """
+    cv2.VideoCapture stand-in (read/grab/retrieve/get/set/isOpened/release) for low latency.
+
+    source: camera index or device path, or an already opened capture to wrap.
+    fourcc: "MJPG" (compressed: higher rates and sizes over USB, costs a decode) or "YUYV"
+        (raw: no decode, but often capped at 30 FPS or less at 640x480), or None to leave the
+        camera's choice. If the camera refuses the format the other one is tried.
+    buffer_size: driver frame queue length; 1 where the backend supports it.
+    drain: on read(), skip frames the driver had already queued (see read()). None (the
+        default) drains only when the backend did not grant a one-frame queue: with one frame
+        queued, draining would wait up to a frame period to gain less than that in frame age.
+
+    negotiated holds what the camera actually granted, which can differ from what was asked.
+    captured_at is the capture time of the last frame read, on the time.perf_counter() clock,
+    from the driver's timestamp where that is on the same clock (V4L2 on Linux), else None.
+    """
+
+    def __init__(self, source=0, width=640, height=480, fps=60, fourcc="MJPG", buffer_size=1, drain=None,
+                 backend=cv2.CAP_ANY):
+        if isinstance(source, (int, str)):
+            source = cv2.VideoCapture(source, backend)
+        self.cap = source
+        self.drain = bool(drain)
+        self.auto_drain = drain is None
+        self.max_drain = 8     # Most queued frames skipped in one read
+        self.drained = 0       # Frames skipped so far
+        self.reads = 0
+        self.captured_at = None
+        self.negotiated = {}
+        if self.cap.isOpened():
+            self.configure(width, height, fps, fourcc, buffer_size)
+
+    def configure(self, width=None, height=None, fps=None, fourcc=None, buffer_size=None):
+        """
+        Request capture settings; None leaves one as it is. The format goes first: on V4L2 the
+        sizes and rates on offer depend on it. Returns the negotiated settings.
+        """
+        cap = self.cap
+        if fourcc is not None:
+            for name in [fourcc] + [other for other in FORMATS if other != fourcc]:
+                cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*name))
+                if decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC)) == name:
+                    break
+        if width is not None and height is not None:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if fps is not None:
+            cap.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size is not None:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+        self._read_back()
+        if self.auto_drain:
+            self.drain = self.negotiated["buffer_size"] != 1
+        return self.negotiated
+
+    def _read_back(self):
+        cap = self.cap
+        self.negotiated = {
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS),
+            "fourcc": decode_fourcc(cap.get(cv2.CAP_PROP_FOURCC)),
+            "buffer_size": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        }
+
+    def describe(self):
+        settings = self.negotiated
+        return (f"{settings.get('width')}x{settings.get('height')} {settings.get('fourcc') or '?'}"
+                f" @ {settings.get('fps', 0):.0f} FPS, buffer {settings.get('buffer_size')}"
+                f"{', draining' if self.drain else ''}")
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        """
+        Newest frame. A grab that returns in less than half a frame period took a frame the
+        driver had queued, which may be several periods old, so grab again until one has to
+        wait for the camera. A consumer faster than the camera never waits more than it would
+        anyway; a slower one waits at most one frame period for a fresh frame.
+        """
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def grab(self):
+        start = time.perf_counter()
+        if not self.cap.grab():
+            return False
+        if self.drain:
+            fps = self.negotiated.get("fps") or 30.0
+            drained = 0
+            now = time.perf_counter()
+            while now - start < 0.5 / fps and drained < self.max_drain:
+                start = now
+                if not self.cap.grab():
+                    return False
+                drained += 1
+                now = time.perf_counter()
+            self.drained += drained
+        self.reads += 1
+        self.captured_at = self._driver_time()
+        return True
+
+    def retrieve(self):
+        return self.cap.retrieve()
+
+    def _driver_time(self):
+        msec = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        if msec <= 0 or abs(time.perf_counter() - msec / 1000) > MAX_DRIVER_CLOCK_OFFSET:
+            return None
+        return msec / 1000
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        ok = self.cap.set(prop, value)
+        self._read_back()
+        return ok
+
+    def release(self):
+        self.cap.release()
+
+
+def probe(cap, seconds=3.0, consumer_fps=None):
+    """
+    Measure a capture for `seconds`, reading as fast as possible or, with consumer_fps, at the
+    rate a game would. Returns:
+        delivered_fps: new frames per second actually received (repeats not counted)
+        read_ms_p50 / read_ms_p95: time read() blocked
+        age_ms_p50 / age_ms_p95: time from capture (driver timestamp) to read() returning,
+            or None where the driver has no timestamps on the perf_counter clock
+        drained: frames a CameraCapture skipped per read
+    """
+    read_times, ages = [], []
+    frames = new_frames = 0
+    last_stamp = last_signature = None
+    drained_before = getattr(cap, "drained", 0)
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        read_start = time.perf_counter()
+        ok, frame = cap.read()
+        read_end = time.perf_counter()
+        if not ok:
+            break
+        frames += 1
+        read_times.append(read_end - read_start)
+        stamp = getattr(cap, "captured_at", None)
+        if stamp is None and not isinstance(cap, CameraCapture):
+            msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+            if msec > 0 and abs(read_end - msec / 1000) < MAX_DRIVER_CLOCK_OFFSET:
+                stamp = msec / 1000
+        if stamp is not None:
+            ages.append(read_end - stamp)
+            new_frames += stamp != last_stamp
+            last_stamp = stamp
+        else:
+            signature = frame[::32, ::32].tobytes()  # Coarse sample: a repeated frame matches exactly
+            new_frames += signature != last_signature
+            last_signature = signature
+        if consumer_fps:
+            delay = 1 / consumer_fps - (time.perf_counter() - read_start)
+            if delay > 0:
+                time.sleep(delay)
+    elapsed = time.perf_counter() - start
+
+    def percentile(values, p):
+        values = sorted(values)
+        return values[min(int(len(values) * p / 100), len(values) - 1)] * 1000 if values else None
+
+    return {
+        "frames": frames,
+        "delivered_fps": new_frames / elapsed if elapsed > 0 else 0.0,
+        "read_ms_p50": percentile(read_times, 50),
+        "read_ms_p95": percentile(read_times, 95),
+        "age_ms_p50": percentile(ages, 50),
+        "age_ms_p95": percentile(ages, 95),
+        "drained": (getattr(cap, "drained", 0) - drained_before) / max(frames, 1),
+    }
@@ -0,0 +1,112 @@
+import numpy as np
+import pygame
+
+from utils.tracing import NULL_TRACER
+
+
+class CameraBackground:
+    """
+    Webcam feed as a persistent pygame surface.
+    The surface is created once over a preallocated RGB buffer (pygame.image.frombuffer
+    shares the memory), and each frame is resized and colour-converted straight into
+    that buffer with OpenCV's dst= arguments, so updating the background allocates nothing.
+    """
+
+    def __init__(self, size):
+        width, height = size
+        self.size = (width, height)
+        self._rgb = np.zeros((height, width, 3), dtype=np.uint8)      # Backs self.surface
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)  # BGR scratch for the resize
+        self.surface = pygame.image.frombuffer(self._rgb, self.size, "RGB")
+
+    def update(self, frame, frame_rgb=None):
+        """
+        Load a camera frame into the background surface.
+        frame_rgb: the same frame already converted to RGB (e.g. by the hand tracker);
+        when given, the colour conversion is skipped.
+        """
+        import cv2  # Not at the top: games open their window before cv2 has loaded
+        if frame_rgb is not None:
+            cv2.resize(frame_rgb, self.size, dst=self._rgb)
+        else:
+            cv2.resize(frame, self.size, dst=self._resized)
+            cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self.surface
+
+
+SCALE_MODES = ("fast", "smooth", "gpu")
+SCALE_HELP = ("scaling to the window or screen: fast (nearest neighbour), smooth (filtered) or gpu "
+              "(SDL's renderer scales on the graphics card; falls back to fast without one)")
+
+
+class ScaledDisplay:
+    """
+    Window or full screen of any size showing a fixed-size logical game surface.
+    The game draws everything on surface, in logical units, and present() scales it once per
+    frame into the largest centred rectangle of the same aspect ratio (black bars fill the
+    rest) before flipping. Drawing and camera blits therefore cost the same at 4K as at the
+    logical size; only the one scale grows with the display.
+
+    scale: "fast" (nearest neighbour) or "smooth" (filtered: softer edges, costs about twice as
+    much). "gpu" leaves the scaling to SDL's renderer (pygame.SCALED), so the CPU cost does not
+    grow with the display at all; SDL then picks the window size itself. Where no renderer can
+    be created it falls back to "fast".
+    When the display is exactly the logical size, surface is the display itself and nothing is scaled.
+    """
+
+    def __init__(self, logical_size, window_size=None, fullscreen=False, scale="fast", tracer=NULL_TRACER):
+        self.logical_size = tuple(logical_size)
+        self.scale = scale
+        self.tracer = tracer
+        fullscreen_flag = pygame.FULLSCREEN if fullscreen else 0
+        if scale == "gpu":
+            try:
+                self.display = self.surface = pygame.display.set_mode(self.logical_size, pygame.SCALED | fullscreen_flag)
+                self.viewport = self.display.get_rect()  # Mouse positions arrive in logical units already
+                self._target = None
+                return
+            except pygame.error:
+                self.scale = "fast"
+        if fullscreen:
+            self.display = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)  # Desktop resolution
+        else:
+            self.display = pygame.display.set_mode(window_size or self.logical_size)
+        display_width, display_height = self.display.get_size()
+        logical_width, logical_height = self.logical_size
+
+        if (display_width, display_height) == self.logical_size:
+            self.surface = self.display
+            self.viewport = self.display.get_rect()
+            self._target = None
+            return
+        factor = min(display_width / logical_width, display_height / logical_height)
+        size = (max(int(logical_width * factor), 1), max(int(logical_height * factor), 1))
+        self.viewport = pygame.Rect(((display_width - size[0]) // 2, (display_height - size[1]) // 2), size)
+        self.display.fill((0, 0, 0))
+        # Scaled straight into the part of the display it covers; the bars are never redrawn
+        self._target = self.display.subsurface(self.viewport)
+        # Same pixel format as the display, so scaling needs no conversion
+        self.surface = pygame.Surface(self.logical_size).convert(self.display)
+
+    def present(self):
+        if self._target is not None:
+            with self.tracer.span("scale"):
+                if self.scale == "smooth":
+                    pygame.transform.smoothscale(self.surface, self.viewport.size, self._target)
+                else:
+                    pygame.transform.scale(self.surface, self.viewport.size, self._target)
+        pygame.display.flip()
+
+    def to_logical(self, position):
+        """Display coordinates (e.g. the mouse) to logical ones, clamped to the game surface."""
+        x, y = position
+        logical_width, logical_height = self.logical_size
+        x = (x - self.viewport.x) * logical_width / self.viewport.width
+        y = (y - self.viewport.y) * logical_height / self.viewport.height
+        return (int(min(max(x, 0), logical_width - 1)), int(min(max(y, 0), logical_height - 1)))
+
+
+def parse_size(text):
+    """(width, height) from "1920x1080"."""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
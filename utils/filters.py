@@ -0,0 +1,115 @@
+import collections
+import math
+
+# Fingertip filtering for paddle control. Pure Python, like utils/physics.py.
+# The camera and the hand tracker add tens of milliseconds between the hand moving and
+# the paddle being shown, and inference may run slower than the game renders. The filter
+# smooths the measured fingertip adaptively (One Euro), estimates its velocity, and lets the
+# game ask for the position at the time the frame will actually reach the screen.
+
+
+def _smoothing_alpha(cutoff, dt):
+    """Blend factor of a first-order low-pass filter with the given cutoff (Hz) over dt seconds."""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    """
+    One Euro filter (Casiez et al., 2012): a low-pass filter whose cutoff rises with speed.
+    Slow movements are smoothed heavily (no jitter), fast ones barely at all (little lag).
+    min_cutoff: cutoff in Hz when the hand is still; lower removes more jitter.
+    beta: how fast the cutoff grows with speed; higher reduces lag on fast moves.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.velocity = 0.0  # Filtered derivative, units per second
+        self.timestamp = None
+
+    def __call__(self, value, timestamp):
+        """Filter one sample taken at timestamp (seconds) and return the smoothed value."""
+        if self.value is None:
+            self.value = float(value)
+            self.timestamp = timestamp
+            return self.value
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return self.value
+        self.timestamp = timestamp
+
+        raw_velocity = (value - self.value) / dt
+        self.velocity += _smoothing_alpha(self.d_cutoff, dt) * (raw_velocity - self.velocity)
+        cutoff = self.min_cutoff + self.beta * abs(self.velocity)
+        self.value += _smoothing_alpha(cutoff, dt) * (value - self.value)
+        return self.value
+
+
+class FingertipFilter:
+    """
+    Smooths one fingertip coordinate and predicts it forward in time.
+
+        y_filter.update(scaled_y, capture_time)   # once per new inference result
+        y = y_filter.predict(display_time)        # every rendered frame
+
+    Between inference results predict() keeps moving the value along the estimated
+    velocity, so the paddle advances every rendered frame even when tracking runs at 20 Hz.
+    Prediction is capped at max_prediction seconds ahead of the last measurement, and
+    predict() returns None once no measurement has arrived for timeout seconds.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=0.03, d_cutoff=3.0, max_prediction=0.1, timeout=0.5,
+                 predict=True):
+        # Defaults tuned in window pixels at 20-30 Hz tracking: a faster derivative cutoff
+        # than the usual 1 Hz so the velocity used for prediction keeps up with the hand
+        self.filter = OneEuroFilter(min_cutoff, beta, d_cutoff)
+        self.max_prediction = max_prediction
+        self.timeout = timeout
+        self.predict_ahead = predict
+
+    def update(self, value, timestamp):
+        """Add a measurement; repeated results (same or older timestamp) are ignored."""
+        last = self.filter.timestamp
+        if last is not None:
+            if timestamp <= last:
+                return
+            if timestamp - last > self.timeout:
+                # The hand was lost for a while: start over instead of inventing a huge velocity
+                self.filter.reset()
+        self.filter(value, timestamp)
+
+    def predict(self, at_time):
+        """Estimated value at at_time (seconds, same clock as update), or None if tracking is stale."""
+        last = self.filter.timestamp
+        if last is None or at_time - last > self.timeout:
+            return None
+        if not self.predict_ahead:
+            return self.filter.value
+        horizon = min(max(at_time - last, 0.0), self.max_prediction)
+        return self.filter.value + self.filter.velocity * horizon
+
+    def reset(self):
+        self.filter.reset()
+
+
+class LatencyMeter:
+    """Rolling average of a measured delay in seconds, e.g. from drawing a frame to it being shown."""
+
+    def __init__(self, window=60, initial=0.0):
+        self.samples = collections.deque(maxlen=window)
+        self.initial = initial
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    @property
+    def value(self):
+        if not self.samples:
+            return self.initial
+        return sum(self.samples) / len(self.samples)
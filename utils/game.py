@@ -1,9 +1,13 @@
+import argparse
 import pygame
 import sys, os
 import random
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils import clamp
+from opponent import DIFFICULTIES, OpponentAI
+from physics import FixedTimestep, lerp, push_out, sweep_box, wall_boxes
+from tracing import TimingHud, Tracer
 
 # Game Settings
 WINDOW_WIDTH = 800
@@ -15,6 +19,7 @@ PADDLE_SPEED = 10
 BALL_SPEED_X = 4
 BALL_SPEED_Y = 4
 SPEED_INCREMENT = 0.5  # Speed increase after each paddle hit
+WALLS = wall_boxes(WINDOW_WIDTH, WINDOW_HEIGHT)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -31,45 +36,86 @@ class Paddle:
         self.rect.y = clamp(y, 0, WINDOW_HEIGHT - PADDLE_HEIGHT)
 
     def draw(self, surface):
-        pygame.draw.rect(surface, WHITE, self.rect)
+        return pygame.draw.rect(surface, WHITE, self.rect)
 
 
 class Ball:
     def __init__(self):
         self.rect = pygame.Rect(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2, BALL_SIZE, BALL_SIZE)
-        self.dx = BALL_SPEED_X
+        # Sub-pixel position; rect is its rounded copy used for scoring
+        self.x = float(self.rect.x)
+        self.y = float(self.rect.y)
+        self.prev_x = self.x  # Position at the previous tick, for render interpolation
+        self.prev_y = self.y
+        self.dx = BALL_SPEED_X  # Pixels per physics tick
         self.dy = BALL_SPEED_Y
         self.speed_x = BALL_SPEED_X  # Track base speed for resets
         self.speed_y = BALL_SPEED_Y
-
-    def move(self):
-        """Move the ball, updating its position."""
-        self.rect.x += self.dx
-        self.rect.y += self.dy
-
-        # Bounce off top/bottom
-        if self.rect.top <= 0 or self.rect.bottom >= WINDOW_HEIGHT:
-            self.dy *= -1
-            self.rect.y = clamp(self.rect.y, 0, WINDOW_HEIGHT - BALL_SIZE)
-
-    def check_collision(self, paddle1, paddle2):
-        if self.rect.colliderect(paddle1.rect) or self.rect.colliderect(paddle2.rect):
-            self.dx *= -1
-
-    def draw(self, surface, paddle1, paddle2):
-        """Draw the ball, red on collision for debugging."""
-        color = RED if self.rect.colliderect(paddle1.rect) or self.rect.colliderect(paddle2.rect) else WHITE
-        pygame.draw.rect(surface, color, self.rect)
+        self.hit_ticks = 0  # Ticks left to draw the ball red after a paddle hit
+
+    def step(self, paddle1, paddle2):
+        """Advance one physics tick, bouncing off walls and paddles with swept collision."""
+        self.prev_x, self.prev_y = self.x, self.y
+        paddles = [paddle1.rect, paddle2.rect]
+
+        hit = False
+        for rect in paddles:
+            self.x, self.dx, pushed = push_out(self.x, self.y, BALL_SIZE, self.dx, rect)
+            hit = hit or pushed
+        self.x, self.y, self.dx, self.dy, contacts = sweep_box(
+            self.x, self.y, BALL_SIZE, self.dx, self.dy, paddles + WALLS)
+        hit = hit or any(i < len(paddles) for i in contacts)
+        self.hit_ticks = 6 if hit else max(self.hit_ticks - 1, 0)
+
+        self.rect.x = round(self.x)
+        self.rect.y = round(self.y)
+
+    def draw(self, surface, alpha=1.0):
+        """Draw the ball between its last two tick positions, red just after a paddle hit."""
+        color = RED if self.hit_ticks else WHITE
+        x = round(lerp(self.prev_x, self.x, alpha))
+        y = round(lerp(self.prev_y, self.y, alpha))
+        return pygame.draw.rect(surface, color, (x, y, BALL_SIZE, BALL_SIZE))
 
     def reset(self):
         """Reset ball to center with randomized direction."""
         self.rect.center = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+        self.x = self.prev_x = float(self.rect.x)
+        self.y = self.prev_y = float(self.rect.y)
         self.dx = random.choice([self.speed_x, -self.speed_x])
         self.dy = random.choice([self.speed_y, -self.speed_y])
 
 
+class ScoreText:
+    """
+    Score display built from glyph surfaces rendered once up front.
+    The composed score surface is only rebuilt when the score changes.
+    """
+
+    def __init__(self, font, color, background):
+        # Opaque glyphs on the background colour blit faster than per-pixel alpha ones
+        self.glyphs = {char: font.render(char, True, color, background) for char in "0123456789 :"}
+        self.background = background
+        self.surface = None
+        self._score = None
+
+    def render(self, left, right):
+        if (left, right) != self._score:
+            text = f"{left} : {right}"
+            width = sum(self.glyphs[char].get_width() for char in text)
+            height = max(self.glyphs[char].get_height() for char in text)
+            self.surface = pygame.Surface((width, height))
+            self.surface.fill(self.background)
+            x = 0
+            for char in text:
+                self.surface.blit(self.glyphs[char], (x, 0))
+                x += self.glyphs[char].get_width()
+            self._score = (left, right)
+        return self.surface
+
+
 class Game:
-    def __init__(self):
+    def __init__(self, trace_path=None, dirty_rects=False, difficulty="medium"):
         try:
             pygame.init()
         except pygame.error as e:
@@ -82,22 +128,30 @@ class Game:
         self.player = Paddle(20, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
         self.opponent = Paddle(WINDOW_WIDTH - 30 - PADDLE_WIDTH, WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2)
         self.ball = Ball()
+        self.opponent_ai = OpponentAI(difficulty, (WINDOW_WIDTH, WINDOW_HEIGHT), BALL_SIZE)
+        self.timestep = FixedTimestep()  # Physics runs at a fixed tick rate, apart from rendering
 
         self.font = pygame.font.SysFont(None, 36)
+        self.score_text = ScoreText(self.font, WHITE, BLACK)
         self.player_score = 0
         self.opponent_score = 0
 
+        # Dirty-rect mode: erase and redraw only what moved, then update just those regions
+        self.dirty_rects = dirty_rects
+        self._drawn_rects = None  # Regions drawn last frame; None forces a full redraw
+
+        # Per-stage timing: F3 toggles the on-screen HUD, trace_path records a Chrome trace
+        self.trace_path = trace_path
+        self.tracer = Tracer(record=trace_path is not None)
+        self.hud = TimingHud(self.tracer, pygame.font.SysFont("monospace", 18))
+
     def update_paddle(self, new_y):
         """Update the player's paddle position."""
         self.player.move(new_y)
 
-    def update_opponent_paddle(self, ball_y):
-        """Update the opponent's paddle position with smoothing."""
-        target_y = ball_y - PADDLE_HEIGHT // 2
-        current_y = self.opponent.rect.y
-        # Smooth movement (70% towards target per frame)
-        new_y = current_y + 0.7 * (target_y - current_y)
-        self.opponent.move(new_y)
+    def update_opponent_paddle(self):
+        """Move the opponent's paddle toward where the ball will reach it."""
+        self.opponent.move(self.opponent_ai.update(self.ball, self.opponent.rect))
 
     def update_score(self):
         """Update scores and reset ball if it goes out of bounds."""
@@ -110,45 +164,88 @@ class Game:
 
     def draw_score(self):
         """Draw the current score."""
-        score_text = self.font.render(f"{self.player_score} : {self.opponent_score}", True, WHITE)
-        self.screen.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, 20))
+        score_text = self.score_text.render(self.player_score, self.opponent_score)
+        return self.screen.blit(score_text, (WINDOW_WIDTH // 2 - score_text.get_width() // 2, 20))
+
+    def draw(self):
+        """Draw the frame; returns the regions drawn this frame."""
+        if self.dirty_rects and self._drawn_rects is not None:
+            # Erase last frame's objects instead of clearing the whole screen
+            for rect in self._drawn_rects:
+                self.screen.fill(BLACK, rect)
+        else:
+            self.screen.fill(BLACK)
+        rects = [
+            self.player.draw(self.screen),
+            self.opponent.draw(self.screen),
+            self.ball.draw(self.screen, self.timestep.alpha),
+            self.draw_score(),
+        ]
+        hud_rect = self.hud.draw(self.screen)
+        if hud_rect is not None:
+            rects.append(hud_rect)
+        return rects
+
+    def present(self, rects):
+        """Show the frame: the changed regions only in dirty-rect mode, otherwise a full flip."""
+        if self.dirty_rects and self._drawn_rects is not None:
+            pygame.display.update(self._drawn_rects + rects)
+        else:
+            pygame.display.flip()
+        self._drawn_rects = rects if self.dirty_rects else None
 
     def run(self, get_hand_y=None):
         while self.running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.hud.toggle()
 
             # Update paddles
-            if get_hand_y is not None:
-                self.update_paddle(get_hand_y())
-            else:
+            with self.tracer.span("input"):
+                if get_hand_y is not None:
+                    self.update_paddle(get_hand_y())
                 keys = pygame.key.get_pressed()
-                if keys[pygame.K_UP]:
-                    self.update_paddle(self.player.rect.y - PADDLE_SPEED)
-                if keys[pygame.K_DOWN]:
-                    self.update_paddle(self.player.rect.y + PADDLE_SPEED)
-
-            self.update_opponent_paddle(self.ball.rect.centery)
 
-            # Move ball and check collisions
-            self.ball.move()
-            self.ball.check_collision(self.player, self.opponent)
-            self.update_score()
+            # Fixed-timestep physics: keyboard paddle, opponent and ball move per tick, not per frame
+            with self.tracer.span("physics"):
+                for _ in range(self.timestep.advance()):
+                    if get_hand_y is None:
+                        if keys[pygame.K_UP]:
+                            self.update_paddle(self.player.rect.y - PADDLE_SPEED)
+                        if keys[pygame.K_DOWN]:
+                            self.update_paddle(self.player.rect.y + PADDLE_SPEED)
 
-            # Drawing
-            self.screen.fill(BLACK)
-            self.player.draw(self.screen)
-            self.opponent.draw(self.screen)
-            self.ball.draw(self.screen, self.player, self.opponent)
-            self.draw_score()
+                    self.update_opponent_paddle()
 
-            pygame.display.flip()
-            self.clock.tick(60)
+                    # Move ball with continuous collision
+                    self.ball.step(self.player, self.opponent)
+                    self.update_score()
 
+            # Drawing
+            with self.tracer.span("draw"):
+                rects = self.draw()
+            with self.tracer.span("flip"):
+                self.present(rects)
+            with self.tracer.span("tick"):
+                self.clock.tick(60)
+            self.tracer.frame()
+
+        if self.trace_path is not None:
+            self.tracer.export_chrome_trace(self.trace_path)
         pygame.quit()
 
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="CV Pong - keyboard mode")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="record per-stage timings and write them as Chrome trace JSON on exit")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="redraw and update only the screen regions that changed each frame")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES), default="medium",
+                        help="computer opponent strength")
+    args = parser.parse_args()
+
+    game = Game(trace_path=args.trace, dirty_rects=args.dirty_rects, difficulty=args.difficulty)
     game.run()
\ No newline at end of file
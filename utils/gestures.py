@@ -0,0 +1,88 @@
+import numpy as np
+
+# Hand gestures from the landmarks the tracker already returns, so in-game controls cost no
+# extra inference. classify() works on any number of hands at once: it takes landmarks of
+# shape (..., 21, 3), such as the (hands, 21, 3) landmarks of HandResult.arrays and
+# MultiHandResult.arrays, and does the same few array operations for one hand or many.
+
+NONE = 0
+PINCH = 1
+OPEN_PALM = 2
+FIST = 3
+GESTURE_NAMES = {NONE: "none", PINCH: "pinch", OPEN_PALM: "open palm", FIST: "fist"}
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+INDEX_TIP = 8
+MIDDLE_MCP = 9
+PINKY_MCP = 17
+FINGER_PIPS = [6, 10, 14, 18]  # Index, middle, ring, pinky
+FINGER_TIPS = [8, 12, 16, 20]
+
+EXTENDED_RATIO = 1.1    # A finger is extended when its tip is this much farther from the wrist than its PIP joint
+PINCH_DISTANCE = 0.35   # Thumb to index tip distance for a pinch, in palm lengths (wrist to middle knuckle)
+
+
+def _distance(a, b):
+    return np.sqrt(((a - b) ** 2).sum(axis=-1))
+
+
+def extended_fingers(landmarks, aspect=4 / 3):
+    """
+    (..., 5) bool array: thumb, index, middle, ring and pinky extended.
+    aspect is the frame's width / height, as landmarks are normalized to each axis separately.
+    """
+    points = np.asarray(landmarks, dtype=np.float32)[..., :2] * np.array((aspect, 1.0), dtype=np.float32)
+    wrist = points[..., WRIST:WRIST + 1, :]
+    fingers = _distance(points[..., FINGER_TIPS, :], wrist) > _distance(points[..., FINGER_PIPS, :], wrist) * EXTENDED_RATIO
+    # The thumb bends across the palm rather than toward the wrist: compare against the pinky knuckle
+    pinky_mcp = points[..., PINKY_MCP, :]
+    thumb = _distance(points[..., THUMB_TIP, :], pinky_mcp) > _distance(points[..., THUMB_IP, :], pinky_mcp) * EXTENDED_RATIO
+    return np.concatenate([thumb[..., None], fingers], axis=-1)
+
+
+def classify(landmarks, aspect=4 / 3):
+    """
+    Gesture code (NONE, PINCH, OPEN_PALM or FIST) for each hand in landmarks (..., 21, 3),
+    as a uint8 array of shape (...). Distances are measured in palm lengths, so the result
+    does not depend on how far the hand is from the camera.
+
+    PINCH is thumb and index tips together with at least two other fingers out (an "OK" sign),
+    so it is not mistaken for a loose fist.
+    """
+    points = np.asarray(landmarks, dtype=np.float32)[..., :2] * np.array((aspect, 1.0), dtype=np.float32)
+    palm = np.maximum(_distance(points[..., MIDDLE_MCP, :], points[..., WRIST, :]), 1e-6)
+    pinch_distance = _distance(points[..., THUMB_TIP, :], points[..., INDEX_TIP, :]) / palm
+
+    extended = extended_fingers(landmarks, aspect)
+    fingers = extended[..., 1:]
+    gestures = np.full(pinch_distance.shape, NONE, dtype=np.uint8)
+    gestures[~fingers.any(axis=-1)] = FIST
+    gestures[extended.all(axis=-1)] = OPEN_PALM
+    gestures[(pinch_distance < PINCH_DISTANCE) & (fingers[..., 1:].sum(axis=-1) >= 2)] = PINCH
+    return gestures
+
+
+class GestureTrigger:
+    """
+    Turns a per-frame gesture into one-shot events: update() returns the gesture once it has
+    been held for `hold` seconds, then NONE until a different gesture is shown. Holding
+    stops a passing hand shape from firing a control by accident.
+    """
+
+    def __init__(self, hold=0.4):
+        self.hold = hold
+        self.gesture = NONE
+        self.since = None
+        self.fired = False
+
+    def update(self, gesture, now):
+        gesture = int(gesture)
+        if gesture != self.gesture:
+            self.gesture, self.since, self.fired = gesture, now, False
+        if gesture == NONE or self.fired or now - self.since < self.hold:
+            return NONE
+        self.fired = True
+        return gesture
@@ -0,0 +1,132 @@
+import collections
+
+# Adaptive quality for the webcam game loop. Pure Python, like utils/physics.py.
+# The governor watches how long each frame's work takes against the frame budget of the
+# target FPS, steps the quality down when frames keep running over, and back up when there
+# is clear headroom. The game decides how a level is applied (see Game.apply_quality).
+
+
+class QualityLevel:
+    """
+    One step of the quality ladder.
+    capture_size: (width, height) requested from the camera, for the default 640x480 camera
+        size; the game scales it to the size asked for with --camera-size.
+    scan_size: longest side of the image sent to MediaPipe (None for the full frame).
+    model_complexity: MediaPipe landmark model, 1 (full) or 0 (lite).
+    infer_every: run hand inference on one frame in this many.
+    """
+
+    def __init__(self, name, capture_size, scan_size, model_complexity, infer_every):
+        self.name = name
+        self.capture_size = capture_size
+        self.scan_size = scan_size
+        self.model_complexity = model_complexity
+        self.infer_every = infer_every
+
+
+# Highest quality first. Each step cuts roughly a third of the per-frame cost on a laptop CPU.
+QUALITY_LEVELS = [
+    QualityLevel("full", (640, 480), None, 1, 1),
+    QualityLevel("high", (640, 480), 320, 1, 1),
+    QualityLevel("medium", (640, 480), 320, 0, 1),
+    QualityLevel("low", (320, 240), 256, 0, 2),
+    QualityLevel("minimum", (320, 240), 192, 0, 3),
+]
+
+
+class QualityGovernor:
+    """
+    Picks a QualityLevel that holds target_fps.
+
+        governor.add_frame(work_seconds)    # every frame; True when the level changed
+        level = governor.current
+
+    The decision uses the mean cost over the last `window` frames, as a fraction of the
+    frame budget (1 / target_fps). Over high_water for down_after frames in a row steps one
+    level down; under low_water for up_after frames steps one level up. The gap between the
+    two thresholds and the longer wait before stepping up are the hysteresis. If a level has
+    to be left again soon after stepping up to it, the wait before the next step up doubles
+    (up to max_up_after), so the governor does not keep bouncing between two levels.
+
+    target_fps, level and auto can be changed at runtime; with auto=False the level is fixed.
+    """
+
+    def __init__(self, levels=QUALITY_LEVELS, target_fps=60, level=0, auto=True, window=30,
+                 high_water=0.9, low_water=0.6, down_after=30, up_after=120, max_up_after=1920):
+        self.levels = levels
+        self.target_fps = target_fps
+        self.auto = auto
+        self.window = window
+        self.high_water = high_water
+        self.low_water = low_water
+        self.down_after = down_after
+        self.base_up_after = up_after
+        self.up_after = up_after
+        self.max_up_after = max_up_after
+        self.costs = collections.deque(maxlen=window)
+        self._level = max(0, min(level, len(levels) - 1))
+        self._over = 0
+        self._under = 0
+        self._frames_since_up = None  # Frames since the last step up, None if none pending
+
+    @property
+    def budget(self):
+        """Seconds available per frame at the target FPS."""
+        return 1.0 / self.target_fps
+
+    @property
+    def level(self):
+        return self._level
+
+    @level.setter
+    def level(self, value):
+        self._set_level(max(0, min(value, len(self.levels) - 1)))
+
+    @property
+    def current(self):
+        return self.levels[self._level]
+
+    @property
+    def load(self):
+        """Mean recent frame cost as a fraction of the budget."""
+        if not self.costs:
+            return 0.0
+        return sum(self.costs) / len(self.costs) / self.budget
+
+    def _set_level(self, value):
+        self._level = value
+        # Measurements taken at the old level say nothing about the new one
+        self.costs.clear()
+        self._over = self._under = 0
+
+    def add_frame(self, cost):
+        """Record the work time of one frame (seconds, excluding waits); returns True if the level changed."""
+        self.costs.append(cost)
+        if self._frames_since_up is not None:
+            self._frames_since_up += 1
+            if self._frames_since_up > 4 * self.down_after:
+                self._frames_since_up = None  # The step up held
+                self.up_after = self.base_up_after
+        if not self.auto or len(self.costs) < self.window:
+            return False
+
+        load = self.load
+        self._over = self._over + 1 if load > self.high_water else 0
+        self._under = self._under + 1 if load < self.low_water else 0
+
+        if self._over >= self.down_after and self._level < len(self.levels) - 1:
+            if self._frames_since_up is not None:
+                # The last step up did not hold: wait longer before trying again
+                self.up_after = min(self.up_after * 2, self.max_up_after)
+                self._frames_since_up = None
+            self._set_level(self._level + 1)
+            return True
+        if self._under >= self.up_after and self._level > 0:
+            self._set_level(self._level - 1)
+            self._frames_since_up = 0
+            return True
+        return False
+
+    def status(self):
+        mode = "auto" if self.auto else "fixed"
+        return f"quality {self.current.name} ({mode}), target {self.target_fps:g} FPS, load {self.load:.0%}"
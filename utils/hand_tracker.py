@@ -1,53 +1,391 @@
+import time
+
 import cv2
-import mediapipe as mp
+import numpy as np
+
+from utils.tracing import NULL_TRACER
+from utils.utils import clamp
+
+NUM_LANDMARKS = 21
+INDEX_FINGER_TIP = 8
+# Handedness as stored in result arrays and recordings (0: unknown)
+HANDEDNESS_CODES = {None: 0, "Left": 1, "Right": 2}
+HANDEDNESS_LABELS = {code: label for label, code in HANDEDNESS_CODES.items()}
+
+# Landmarks followed by optical flow between keyframes: index finger PIP, DIP and tip (last)
+FLOW_LANDMARKS = [6, 7, 8]
+LK_PARAMS = dict(winSize=(21, 21), maxLevel=3,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03))
+
+
+class HandResult:
+    """Hand tracking output for one frame. Cached by HandTracker so repeated queries don't re-run inference."""
+
+    def __init__(self, frame_id, position=None, landmarks=None, confidence=0.0, handedness=None,
+                 track_id=None):
+        self.frame_id = frame_id        # Sequence number of the frame this result belongs to
+        self.position = position        # Index finger tip (x, y) in frame pixels, or None if no hand
+        self.landmarks = landmarks      # (21, 3) float32 array of (x, y, z) normalized to the frame, or None
+        self.confidence = confidence    # MediaPipe handedness score (0 to 1)
+        self.handedness = handedness    # "Left" or "Right" as reported by MediaPipe
+        self.track_id = track_id        # Persistent ID across frames (multi-hand tracking only)
+
+    @property
+    def arrays(self):
+        """
+        (landmarks, handedness, confidence) over a hands axis, like MultiHandResult.arrays: shapes
+        (hands, 21, 3), (hands,) uint8 codes and (hands,) float32, with hands 1, or 0 without a hand.
+        landmarks is a view of self.landmarks, so code written for either tracker handles both.
+        """
+        if self.landmarks is None:
+            return (np.empty((0, NUM_LANDMARKS, 3), dtype=np.float32), np.empty(0, dtype=np.uint8),
+                    np.empty(0, dtype=np.float32))
+        return (self.landmarks[None], np.array([HANDEDNESS_CODES.get(self.handedness, 0)], dtype=np.uint8),
+                np.array([self.confidence], dtype=np.float32))
+
+
+def fill_landmarks(out, hand_landmarks):
+    """Copy a MediaPipe landmark list into out, a (21, 3) float32 array (e.g. one row of a (hands, 21, 3) array)."""
+    out[:] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+    return out
+
 
 class HandTracker:
-    def __init__(self, max_num_hands=1, detection_confidence=0.7, tracking_confidence=0.7):
+    def __init__(self, max_num_hands=1, detection_confidence=0.7, tracking_confidence=0.7,
+                 roi_mode=False, roi_size=192, roi_margin=0.35, scan_size=None, model_complexity=1,
+                 motion_gate=False, motion_threshold=3.0, idle_after=2.0, idle_interval=0.5, max_reuse=1.0,
+                 flow_mode=False, keyframe_interval=6, max_flow_error=2.0):
         self.max_num_hands = max_num_hands
+        self.detection_confidence = detection_confidence
+        self.tracking_confidence = tracking_confidence
+        self.model_complexity = model_complexity  # 0 is the lighter landmark model, 1 the full one
+
+        # Imported here rather than at module level: mediapipe takes most of the game's startup
+        # time, and the game builds the tracker on a thread while the camera opens
+        import mediapipe as mp
 
         # Initialize MediaPipe hands solution for hand detection and tracking
         self.mp_hands = mp.solutions.hands
         # Configure the hand-tracking model with specified parameters
-        self.hands = self.mp_hands.Hands(
-            max_num_hands=max_num_hands,                    # Max number of hands to detect
-            min_detection_confidence=detection_confidence,  # Confidence threshold for initial detection
-            min_tracking_confidence=tracking_confidence     # Confidence threshold for tracking
-        )
+        self.hands = self._create_hands()
         # Initialize MediaPipe drawing utilities for visualizing landmarks
         self.mp_draw = mp.solutions.drawing_utils
 
-    def get_hand_position(self, frame):
-        # Check if the input frame is valid; return None if not
+        # Per-frame result cache: each new frame gets a sequence number and is inferred once
+        self.frame_id = 0          # Sequence number of the most recent frame
+        self.inference_count = 0   # Number of hands.process() calls; with skipped_count, one per frame
+        self.cache_hits = 0        # Queries answered from the cache
+        self._last_frame = None
+        self._last_result = None
+
+        # ROI mode: once a hand is found, only a crop around it is sent to MediaPipe.
+        # roi_size is the side (px) the crop is resized to, roi_margin the padding around
+        # the hand box as a fraction of its size. scan_size is the longest side a full frame
+        # is downscaled to before inference (None keeps full resolution). Smaller sizes are
+        # faster but less accurate.
+        self.roi_mode = roi_mode
+        self.roi_size = roi_size
+        self.roi_margin = roi_margin
+        self.scan_size = scan_size
+        self.roi = None  # Current crop (x0, y0, x1, y1) in frame pixels, None means full-frame scan
+
+        # Motion gate: a tiny grayscale copy of each frame is compared with the copy taken at
+        # the last inference. If the mean change around the hand (or, with no hand, anywhere)
+        # is below motion_threshold (0-255 grey levels), the last result is reused instead of
+        # running MediaPipe, for at most max_reuse seconds. Once no hand has been seen for
+        # idle_after seconds, a still scene is only rescanned every idle_interval seconds.
+        self.motion_gate = motion_gate
+        self.motion_threshold = motion_threshold
+        self.idle_after = idle_after
+        self.idle_interval = idle_interval
+        self.max_reuse = max_reuse
+        self.skipped_count = 0         # Frames answered by the motion gate without inference
+        self._motion_reference = None  # Small grayscale frame at the last inference
+        self._last_inference_time = 0.0
+        self._last_hand_time = time.perf_counter()
+
+        # Flow mode: MediaPipe runs on keyframes only; in between, the fingertip is followed with
+        # pyramidal Lucas-Kanade optical flow, and the other landmarks move along with it.
+        # A keyframe is forced every keyframe_interval frames, or as soon as a tracked point
+        # is lost or its forward-backward flow error exceeds max_flow_error pixels (drift).
+        self.flow_mode = flow_mode
+        self.keyframe_interval = keyframe_interval
+        self.max_flow_error = max_flow_error
+        self.flow_count = 0          # Frames answered by optical flow
+        self._flow_gray = None       # Grayscale of the last keyframe or flow frame
+        self._flow_points = None     # FLOW_LANDMARKS in that frame, float32 (N, 1, 2) pixels
+        self._frames_since_keyframe = 0
+
+        self.tracer = NULL_TRACER  # Set by the game to time the inference stages
+        self._frame_rgb = None     # RGB image last sent to MediaPipe
+        self._rgb_is_full = False  # True if it is the whole frame at full size
+        self._pending_settings = None  # From configure(), applied before the next inference
+        # MediaPipe's landmarks are read and mapped to the frame in this buffer; each result
+        # gets a copy, since results outlive the next inference (skipped frames, pipelines)
+        self._landmarks = np.empty((NUM_LANDMARKS, 3), dtype=np.float32)
+
+    def _create_hands(self):
+        return self.mp_hands.Hands(
+            max_num_hands=self.max_num_hands,                    # Max number of hands to detect
+            model_complexity=self.model_complexity,              # Landmark model size
+            min_detection_confidence=self.detection_confidence,  # Confidence threshold for initial detection
+            min_tracking_confidence=self.tracking_confidence     # Confidence threshold for tracking
+        )
+
+    def warm_up(self, frame_shape=(480, 640, 3)):
+        """
+        Run one inference on a black frame, so the first real frame does not pay for the
+        model's lazy initialization. Leaves the result cache and counters untouched.
+        """
+        self.hands.process(np.zeros(frame_shape, dtype=np.uint8))
+
+    def configure(self, scan_size=None, model_complexity=None):
+        """
+        Change the inference input size or model at runtime. Safe to call from another thread
+        than the one running process(): the change is applied before the next inference.
+        scan_size=0 goes back to full resolution; None leaves a setting unchanged.
+        """
+        self._pending_settings = (scan_size, model_complexity)
+
+    def _apply_settings(self):
+        scan_size, model_complexity = self._pending_settings
+        self._pending_settings = None
+        if scan_size is not None:
+            self.scan_size = scan_size or None
+        if model_complexity is not None and model_complexity != self.model_complexity:
+            # The model is fixed when Hands is created, so it has to be rebuilt
+            self.model_complexity = model_complexity
+            self.hands.close()
+            self.hands = self._create_hands()
+            self.roi = None
+
+    def process(self, frame, frame_id=None):
+        """
+        Run hand inference on a frame and return a HandResult.
+        A frame is identified by frame_id if given, otherwise by object identity;
+        querying the same frame again returns the cached result.
+        """
         if frame is None:
-            return None, frame
+            return HandResult(self.frame_id)
+
+        cached = self._last_result
+        if cached is not None:
+            if frame_id is not None and frame_id == cached.frame_id:
+                self.cache_hits += 1
+                return cached
+            if frame_id is None and frame is self._last_frame:
+                self.cache_hits += 1
+                return cached
+
+        self.frame_id = frame_id if frame_id is not None else self.frame_id + 1
+        result = None
+        if self.motion_gate:
+            with self.tracer.span("motion"):
+                result = self._gate(frame, self.frame_id)
+        if result is None and self.flow_mode:
+            with self.tracer.span("flow"):
+                result = self._track_flow(frame, self.frame_id)
+        if result is None:
+            result = self._infer(frame, self.frame_id)
+            if self.flow_mode:
+                self._start_flow(frame, result)
+        self._last_frame = frame
+        self._last_result = result
+        return result
+
+    def _start_flow(self, frame, result):
+        """Take a keyframe result as the starting point for optical flow."""
+        self._frames_since_keyframe = 0
+        if result.position is None:
+            self._flow_points = None
+            return
+        height, width, _ = frame.shape
+        self._flow_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self._flow_points = (result.landmarks[FLOW_LANDMARKS, :2] * (width, height)).astype(np.float32).reshape(-1, 1, 2)
+
+    def _track_flow(self, frame, frame_id):
+        """The last result moved along the optical flow to this frame, or None if a keyframe is due."""
+        last = self._last_result
+        if (self._flow_points is None or last is None or last.position is None
+                or self._frames_since_keyframe + 1 >= self.keyframe_interval or self._pending_settings is not None):
+            return None
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if gray.shape != self._flow_gray.shape:
+            return None
+        points, status, _ = cv2.calcOpticalFlowPyrLK(self._flow_gray, gray, self._flow_points, None, **LK_PARAMS)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._flow_gray, points, None, **LK_PARAMS)
+        # Forward-backward check: flowing the points back should land where they started
+        error = np.linalg.norm(back - self._flow_points, axis=2).max()
+        if not status.all() or not back_status.all() or error > self.max_flow_error:
+            return None
+
+        height, width, _ = frame.shape
+        tip_x, tip_y = points[-1, 0]
+        if not (0 <= tip_x < width and 0 <= tip_y < height):
+            return None
+        shift_x = (tip_x - self._flow_points[-1, 0, 0]) / width
+        shift_y = (tip_y - self._flow_points[-1, 0, 1]) / height
+        landmarks = last.landmarks + np.array((shift_x, shift_y, 0.0), dtype=np.float32)
+
+        self._flow_gray = gray
+        self._flow_points = points
+        self._frames_since_keyframe += 1
+        self.flow_count += 1
+        self._rgb_is_full = False
+        if self.roi_mode:
+            self.roi = self._roi_around(landmarks, width, height)
+        return HandResult(frame_id, (int(tip_x), int(tip_y)), landmarks, last.confidence, last.handedness)
+
+    def _gate(self, frame, frame_id):
+        """The last result carried over to this frame if it can skip inference, otherwise None."""
+        now = time.perf_counter()
+        small = cv2.cvtColor(cv2.resize(frame, (80, 60), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        reference = self._motion_reference
+        last = self._last_result
+        if reference is None or last is None or self._pending_settings is not None:
+            self._motion_reference = small
+            return None
+
+        if last.position is not None:
+            if now - self._last_inference_time > self.max_reuse:
+                self._motion_reference = small
+                return None
+            # Only the area around the hand matters: the rest of the scene may move freely
+            (min_x, min_y), (max_x, max_y) = last.landmarks[:, :2].min(axis=0), last.landmarks[:, :2].max(axis=0)
+            margin_x = (max_x - min_x) * self.roi_margin
+            margin_y = (max_y - min_y) * self.roi_margin
+            x0 = int(clamp(min_x - margin_x, 0, 1) * 80)
+            x1 = max(int(clamp(max_x + margin_x, 0, 1) * 80), x0 + 1)
+            y0 = int(clamp(min_y - margin_y, 0, 1) * 60)
+            y1 = max(int(clamp(max_y + margin_y, 0, 1) * 60), y0 + 1)
+            region = (slice(y0, y1), slice(x0, x1))
+        else:
+            if now - self._last_hand_time < self.idle_after or now - self._last_inference_time >= self.idle_interval:
+                # Hand only just lost (keep searching every frame), or time for an idle scan
+                self._motion_reference = small
+                return None
+            region = (slice(None), slice(None))
+
+        if cv2.absdiff(small[region], reference[region]).mean() >= self.motion_threshold:
+            self._motion_reference = small
+            return None
+
+        self.skipped_count += 1
+        self._rgb_is_full = False  # No RGB conversion was made for this frame
+        return HandResult(frame_id, last.position, last.landmarks, last.confidence, last.handedness)
+
+    def _infer(self, frame, frame_id):
+        if self._pending_settings is not None:
+            self._apply_settings()
+        height, width, _ = frame.shape
+        tracer = self.tracer
+        with tracer.span("roi"):
+            region, (x0, y0, region_w, region_h) = self._inference_input(frame)
 
         # Convert the frame from BGR (OpenCV default) to RGB (required by MediaPipe)
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        with tracer.span("cvtColor"):
+            frame_rgb = cv2.cvtColor(region, cv2.COLOR_BGR2RGB)
+        self._frame_rgb = frame_rgb
+        self._rgb_is_full = region is frame
         # Process the frame to detect hand landmarks
-        results = self.hands.process(frame_rgb)
+        with tracer.span("hands.process"):
+            results = self.hands.process(frame_rgb)
+        self.inference_count += 1
+        self._last_inference_time = time.perf_counter()
 
         # Check if any hand landmarks are detected
-        if results.multi_hand_landmarks:
-            # Iterate through detected hands (only one expected due to max_num_hands=1)
-            for hand_landmarks in results.multi_hand_landmarks:
-                # Get the index finger tip landmark (used for paddle control)
-                index_finger_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
+        if not results.multi_hand_landmarks:
+            # Hand lost: next frame falls back to a full-frame scan
+            self.roi = None
+            return HandResult(frame_id)
 
-                # Get frame dimensions to convert normalized coordinates to pixel values
-                height, width, _ = frame.shape
-                # Convert normalized x, y coordinates (0 to 1) to pixel coordinates
-                x = int(index_finger_tip.x * width)
-                y = int(index_finger_tip.y * height)
+        # Only one hand expected due to max_num_hands=1.
+        # Landmarks are normalized to the inference input; map them back to the full frame.
+        landmarks = fill_landmarks(self._landmarks, results.multi_hand_landmarks[0])
+        if (x0, y0, region_w, region_h) != (0, 0, width, height):
+            points = landmarks[:, :2]
+            points *= (region_w, region_h)
+            points += (x0, y0)
+            points /= (width, height)
+        landmarks = landmarks.copy()
+        # Get the index finger tip landmark (used for paddle control)
+        tip_x, tip_y, _ = landmarks[INDEX_FINGER_TIP]
 
-                # Draw a green filled circle at the index finger tip position
-                cv2.circle(frame, (x, y), 10, (0, 255, 0), -1)  # -1 fills the circle
+        # Convert normalized x, y coordinates (0 to 1) to pixel coordinates
+        position = (int(tip_x * width), int(tip_y * height))
+        self._last_hand_time = self._last_inference_time
+        if self.roi_mode:
+            self.roi = self._roi_around(landmarks, width, height)
+
+        confidence, handedness = 0.0, None
+        if results.multi_handedness:
+            classification = results.multi_handedness[0].classification[0]
+            confidence, handedness = classification.score, classification.label
+
+        return HandResult(frame_id, position, landmarks, confidence, handedness)
+
+    def _inference_input(self, frame):
+        """
+        Image to send to MediaPipe: the ROI crop in ROI mode, otherwise the (optionally
+        downscaled) full frame. Also returns the region (x0, y0, w, h) it covers in the frame.
+        """
+        height, width, _ = frame.shape
+        if self.roi_mode and self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            region = frame[y0:y1, x0:x1]
+            if x1 - x0 > self.roi_size:
+                region = cv2.resize(region, (self.roi_size, self.roi_size), interpolation=cv2.INTER_AREA)
+            return region, (x0, y0, x1 - x0, y1 - y0)
+
+        region = frame
+        if self.scan_size is not None and max(width, height) > self.scan_size:
+            scale = self.scan_size / max(width, height)
+            region = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        return region, (0, 0, width, height)
+
+    def _roi_around(self, landmarks, width, height):
+        """Square crop around the hand's landmark bounding box, kept inside the frame."""
+        points = landmarks[:, :2] * (width, height)
+        (min_x, min_y), (max_x, max_y) = points.min(axis=0), points.max(axis=0)
+        box = max(max_x - min_x, max_y - min_y)
+        # Square crops keep the aspect ratio when resized to roi_size
+        side = int(min(max(box * (1 + 2 * self.roi_margin), 64), width, height))
+        center_x = (max_x + min_x) / 2
+        center_y = (max_y + min_y) / 2
+        # Shift rather than clip at the frame edges so the crop stays square
+        x0 = int(clamp(center_x - side / 2, 0, width - side))
+        y0 = int(clamp(center_y - side / 2, 0, height - side))
+        return x0, y0, x0 + side, y0 + side
+
+    def rgb_frame(self, frame):
+        """
+        The RGB conversion of frame made for inference, so display code can reuse it
+        instead of converting again. None unless the last inference ran on the whole of
+        this frame at full resolution (not an ROI crop).
+        """
+        if frame is self._last_frame and self._rgb_is_full:
+            return self._frame_rgb
+        return None
+
+    def draw(self, frame, result):
+        """Optional annotation step: draw the index finger tip of a result onto the frame."""
+        if result.position is not None:
+            # Draw a green filled circle at the index finger tip position
+            cv2.circle(frame, result.position, 10, (0, 255, 0), -1)  # -1 fills the circle
+        return frame
+
+    def get_hand_position(self, frame, frame_id=None, annotate=True):
+        # Check if the input frame is valid; return None if not
+        if frame is None:
+            return None, frame
 
-                # Return the (x, y) position and modified frame with the drawn circle
-                return (x, y), frame
+        result = self.process(frame, frame_id)
+        if annotate:
+            self.draw(frame, result)
 
-        # Return None and the original frame if no hands are detected
-        return None, frame
+        # Return the (x, y) position (None if no hand) and the frame
+        return result.position, frame
 
     def release(self):
         # Close the MediaPipe hands model to free resources
-        self.hands.close()
\ No newline at end of file
+        self.hands.close()
@@ -1,36 +1,325 @@
+import math
+
 import cv2
-import mediapipe as mp
+import numpy as np
+
+from utils.filters import FingertipFilter
+from utils.hand_tracker import (HANDEDNESS_CODES, HANDEDNESS_LABELS, INDEX_FINGER_TIP, NUM_LANDMARKS, HandResult,
+                                fill_landmarks)
+from utils.tracing import NULL_TRACER
+from utils.utils import map_range
+
+
+class MultiHandResult:
+    """
+    Tracking output for every hand in one frame, both as one HandResult per hand and as
+    arrays over the hands (same order) for vectorized use, e.g. utils.gestures:
+        landmarks   (hands, 21, 3) float32, normalized to the frame
+        handedness  (hands,) uint8 codes, see HANDEDNESS_CODES
+        confidence  (hands,) float32
+    The trackers fill the arrays and give each HandResult a view of its row of landmarks.
+    Built from hands alone, the arrays are stacked from them.
+    """
+
+    def __init__(self, frame_id, hands=None, landmarks=None, handedness=None, confidence=None):
+        self.frame_id = frame_id
+        self.hands = hands if hands is not None else []  # One HandResult per detected hand
+        if landmarks is None:
+            landmarks = np.zeros((len(self.hands), NUM_LANDMARKS, 3), dtype=np.float32)
+            for i, hand in enumerate(self.hands):
+                if hand.landmarks is not None:
+                    landmarks[i] = hand.landmarks
+            handedness = np.array([HANDEDNESS_CODES.get(hand.handedness, 0) for hand in self.hands], dtype=np.uint8)
+            confidence = np.array([hand.confidence for hand in self.hands], dtype=np.float32)
+        self.landmarks = landmarks
+        self.handedness = handedness
+        self.confidence = confidence
+
+    @property
+    def positions(self):
+        return [hand.position for hand in self.hands]
+
+    @property
+    def arrays(self):
+        """(landmarks, handedness, confidence), the same as HandResult.arrays for a single hand."""
+        return self.landmarks, self.handedness, self.confidence
+
+
+class _Track:
+    __slots__ = ("track_id", "x", "y", "vx", "vy", "handedness", "missed")
+
+    def __init__(self, track_id, x, y, handedness):
+        self.track_id = track_id
+        self.x, self.y = x, y      # Last position, normalized to the frame
+        self.vx = self.vy = 0.0    # Motion per frame, for predicting where the hand is next
+        self.handedness = handedness
+        self.missed = 0            # Consecutive frames without a matching detection
+
+
+class HandTracks:
+    """
+    Gives each detected hand a persistent track ID (HandResult.track_id) from frame to frame.
+    Detections are matched to tracks greedily, cheapest first, on the distance to the position
+    each track is predicted at plus a penalty when MediaPipe's handedness disagrees.
+    With at most max_num_hands (4) hands and tracks, that is a handful of pairs per frame,
+    and greedy matching gives the same answer as the Hungarian method whenever hands are
+    further apart than they move in a frame. Tracks not seen for max_missed frames are dropped.
+    """
+
+    def __init__(self, max_distance=0.25, handedness_penalty=0.15, max_missed=10):
+        self.max_distance = max_distance              # Gate, as a fraction of the frame size
+        self.handedness_penalty = handedness_penalty
+        self.max_missed = max_missed
+        self.tracks = []
+        self._next_id = 1
+
+    def assign(self, hands, width, height):
+        """Set track_id on each HandResult in hands (in place)."""
+        points = [(hand.position[0] / width, hand.position[1] / height) for hand in hands]
+
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            steps = track.missed + 1
+            predicted_x = track.x + track.vx * steps
+            predicted_y = track.y + track.vy * steps
+            for h, (x, y) in enumerate(points):
+                cost = math.hypot(x - predicted_x, y - predicted_y)
+                if track.handedness and hands[h].handedness and track.handedness != hands[h].handedness:
+                    cost += self.handedness_penalty
+                if cost <= self.max_distance:
+                    pairs.append((cost, t, h))
+        pairs.sort()
+
+        matched_tracks = set()
+        for cost, t, h in pairs:
+            if t in matched_tracks or hands[h].track_id is not None:
+                continue
+            matched_tracks.add(t)
+            track = self.tracks[t]
+            x, y = points[h]
+            steps = track.missed + 1
+            track.vx = 0.5 * track.vx + 0.5 * (x - track.x) / steps
+            track.vy = 0.5 * track.vy + 0.5 * (y - track.y) / steps
+            track.x, track.y = x, y
+            track.handedness = hands[h].handedness or track.handedness
+            track.missed = 0
+            hands[h].track_id = track.track_id
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        for hand, (x, y) in zip(hands, points):
+            if hand.track_id is None:
+                track = _Track(self._next_id, x, y, hand.handedness)
+                self._next_id += 1
+                self.tracks.append(track)
+                hand.track_id = track.track_id
+        return hands
+
+    def reset(self):
+        self.tracks = []
+
+
+class PlayerSlots:
+    """
+    Binds hand tracks to players (paddles) and keeps a fingertip filter per player, so
+    a paddle follows the same hand when it crosses the middle of the frame or drops out
+    for a few frames. A new track takes a free player slot: one whose hand is not in the
+    current result, preferring the slot whose hand was last seen nearest (for a slot that
+    has never been used, the middle of its column of the frame). Positions are mapped to
+    size (the game window) before filtering.
+    """
+
+    def __init__(self, num_players=2, size=(800, 600), **filter_args):
+        self.num_players = num_players
+        self.size = size
+        self.track_ids = [None] * num_players
+        self.last_x = [(i + 0.5) / num_players for i in range(num_players)]  # Normalized, for rebinding
+        self.filters = [(FingertipFilter(**filter_args), FingertipFilter(**filter_args))
+                        for _ in range(num_players)]
+
+    def update(self, result, capture_time, frame_size):
+        """Feed a MultiHandResult whose hands have track IDs; frame_size is (width, height)."""
+        width, height = frame_size
+        hands = {hand.track_id: hand for hand in result.hands if hand.position is not None}
+
+        unbound = [hand for track_id, hand in hands.items() if track_id not in self.track_ids]
+        free = [slot for slot, track_id in enumerate(self.track_ids) if track_id not in hands]
+        for hand in sorted(unbound, key=lambda hand: hand.position[0]):
+            if not free:
+                break
+            x = hand.position[0] / width
+            slot = min(free, key=lambda slot: abs(self.last_x[slot] - x))
+            free.remove(slot)
+            if self.track_ids[slot] is not None:
+                # A different hand: don't let the old one's velocity carry over
+                for axis_filter in self.filters[slot]:
+                    axis_filter.reset()
+            self.track_ids[slot] = hand.track_id
+
+        bound = [(slot, hands[track_id]) for slot, track_id in enumerate(self.track_ids) if track_id in hands]
+        if not bound:
+            return
+        # Map every bound hand to output coordinates at once
+        points = np.array([hand.position for _, hand in bound], dtype=np.float64)
+        out_width, out_height = self.size
+        xs = map_range(points[:, 0], 0, width, 0, out_width)
+        ys = map_range(points[:, 1], 0, height, 0, out_height)
+        for (slot, _), point, x, y in zip(bound, points, xs, ys):
+            self.last_x[slot] = point[0] / width
+            filter_x, filter_y = self.filters[slot]
+            filter_x.update(float(x), capture_time)
+            filter_y.update(float(y), capture_time)
+
+    def predict(self, slot, at_time):
+        """Filtered (x, y) of a player's fingertip at at_time in output coordinates, or None."""
+        filter_x, filter_y = self.filters[slot]
+        y = filter_y.predict(at_time)
+        if y is None:
+            return None
+        return filter_x.predict(at_time), y
+
 
 class HandTracker:
-    def __init__(self, max_num_hands=2, detection_confidence=0.7, tracking_confidence=0.7):
+    def __init__(self, max_num_hands=2, detection_confidence=0.7, tracking_confidence=0.7, scan_size=None,
+                 model_complexity=1):
         self.max_num_hands = max_num_hands
+        self.detection_confidence = detection_confidence
+        self.tracking_confidence = tracking_confidence
+        self.scan_size = scan_size                # Longest side frames are downscaled to, None for full size
+        self.model_complexity = model_complexity  # 0 is the lighter landmark model, 1 the full one
 
+        import mediapipe as mp  # Deferred like in utils.hand_tracker: it dominates startup time
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            max_num_hands=max_num_hands,
-            min_detection_confidence=detection_confidence,
-            min_tracking_confidence=tracking_confidence
-        )
+        self.hands = self._create_hands()
         self.mp_draw = mp.solutions.drawing_utils
 
-    def get_hand_positions(self, frame):
+        # Per-frame result cache, same scheme as utils.hand_tracker.HandTracker
+        self.frame_id = 0
+        self.inference_count = 0
+        self.cache_hits = 0
+        self._last_frame = None
+        self._last_result = None
+
+        self.tracer = NULL_TRACER  # Set by the game to time the inference stages
+        self._frame_rgb = None     # RGB image last sent to MediaPipe
+        self._rgb_is_full = False  # True if it is the whole frame at full size
+        self._pending_settings = None  # From configure(), applied before the next inference
+        self.tracks = HandTracks()  # Persistent hand IDs across frames
+        # Filled from MediaPipe each inference; results get copies of the rows in use
+        self._landmarks = np.empty((max_num_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        self._handedness = np.empty(max_num_hands, dtype=np.uint8)
+        self._confidence = np.empty(max_num_hands, dtype=np.float32)
+
+    def _create_hands(self):
+        return self.mp_hands.Hands(
+            max_num_hands=self.max_num_hands,
+            model_complexity=self.model_complexity,
+            min_detection_confidence=self.detection_confidence,
+            min_tracking_confidence=self.tracking_confidence
+        )
+
+    def configure(self, scan_size=None, model_complexity=None):
+        """Change the inference input size or model at runtime, as utils.hand_tracker.HandTracker.configure()."""
+        self._pending_settings = (scan_size, model_complexity)
+
+    def _apply_settings(self):
+        scan_size, model_complexity = self._pending_settings
+        self._pending_settings = None
+        if scan_size is not None:
+            self.scan_size = scan_size or None
+        if model_complexity is not None and model_complexity != self.model_complexity:
+            self.model_complexity = model_complexity
+            self.hands.close()
+            self.hands = self._create_hands()
+
+    def warm_up(self, frame_shape=(480, 640, 3)):
+        """Run one inference on a black frame to initialize the model; leaves the cache and tracks untouched."""
+        self.hands.process(np.zeros(frame_shape, dtype=np.uint8))
+
+    def process(self, frame, frame_id=None):
+        """Run hand inference once per frame and return a MultiHandResult (cached for repeated queries)."""
         if frame is None:
-            return [], frame
+            return MultiHandResult(self.frame_id)
+
+        cached = self._last_result
+        if cached is not None:
+            if frame_id is not None and frame_id == cached.frame_id:
+                self.cache_hits += 1
+                return cached
+            if frame_id is None and frame is self._last_frame:
+                self.cache_hits += 1
+                return cached
+
+        self.frame_id = frame_id if frame_id is not None else self.frame_id + 1
+        result = self._infer(frame, self.frame_id)
+        self._last_frame = frame
+        self._last_result = result
+        return result
+
+    def _infer(self, frame, frame_id):
+        if self._pending_settings is not None:
+            self._apply_settings()
+        height, width, _ = frame.shape
+        region = frame
+        if self.scan_size is not None and max(width, height) > self.scan_size:
+            # Landmarks are normalized to the image, so they need no mapping back
+            scale = self.scan_size / max(width, height)
+            region = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        with self.tracer.span("cvtColor"):
+            frame_rgb = cv2.cvtColor(region, cv2.COLOR_BGR2RGB)
+        self._frame_rgb = frame_rgb
+        self._rgb_is_full = region is frame
+        with self.tracer.span("hands.process"):
+            results = self.hands.process(frame_rgb)
+        self.inference_count += 1
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(frame_rgb)
+        detected = (results.multi_hand_landmarks or [])[:self.max_num_hands]
+        count = len(detected)
+        # All hands' landmarks go into one array; each HandResult gets a view of its row
+        self._handedness[:count] = 0
+        self._confidence[:count] = 0.0
+        for i, hand_landmarks in enumerate(detected):
+            fill_landmarks(self._landmarks[i], hand_landmarks)
+        for i, hand_handedness in enumerate((results.multi_handedness or [])[:count]):
+            classification = hand_handedness.classification[0]
+            self._handedness[i] = HANDEDNESS_CODES.get(classification.label, 0)
+            self._confidence[i] = classification.score
+        landmarks = self._landmarks[:count].copy()
+        handedness = self._handedness[:count].copy()
+        confidence = self._confidence[:count].copy()
+        # Index fingertips of every hand in pixels, in one operation
+        tips = (landmarks[:, INDEX_FINGER_TIP, :2] * (width, height)).astype(int)
 
-        hand_positions = []
+        hands = [HandResult(frame_id, (int(tips[i, 0]), int(tips[i, 1])), landmarks[i], float(confidence[i]),
+                            HANDEDNESS_LABELS.get(int(handedness[i])))
+                 for i in range(len(detected))]
+        self.tracks.assign(hands, width, height)  # Also ages tracks when no hand is found
+        return MultiHandResult(frame_id, hands, landmarks, handedness, confidence)
+
+    def rgb_frame(self, frame):
+        """The RGB conversion of frame made for inference, or None if frame was not the last one
+        processed or was downscaled for inference."""
+        if frame is self._last_frame and self._rgb_is_full:
+            return self._frame_rgb
+        return None
+
+    def draw(self, frame, result):
+        """Optional annotation step: mark every detected index finger tip."""
+        for hand in result.hands:
+            cv2.circle(frame, hand.position, 10, (0, 255, 0), -1)
+        return frame
+
+    def get_hand_positions(self, frame, frame_id=None, annotate=True):
+        if frame is None:
+            return [], frame
 
-        if results.multi_hand_landmarks:
-            for hand_landmarks in results.multi_hand_landmarks:
-                index_finger_tip = hand_landmarks.landmark[self.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-                height, width, _ = frame.shape
-                x = int(index_finger_tip.x * width)
-                y = int(index_finger_tip.y * height)
-                cv2.circle(frame, (x, y), 10, (0, 255, 0), -1)
-                hand_positions.append((x, y))
-        return hand_positions, frame
+        result = self.process(frame, frame_id)
+        if annotate:
+            self.draw(frame, result)
+        return result.positions, frame
 
     def release(self):
-        self.hands.close()
\ No newline at end of file
+        self.hands.close()
@@ -0,0 +1,263 @@
+import numpy as np
+import pygame
+
+# Multi-ball "chaos" mode: hundreds to thousands of balls bouncing off the walls, the paddles
+# and each other. Balls live in packed NumPy arrays (the first `count` rows are the live
+# balls, removals move the rest down), and every stage of a tick works on all balls at once:
+# move, walls, paddles, then ball-ball collisions. Testing every pair of balls would cost
+# O(n^2); instead a uniform grid with cells one ball wide buckets the balls by centre, so only
+# balls in the same or a neighbouring cell are tested, which keeps a tick roughly O(n).
+
+# Cells checked besides a ball's own: half the 8 neighbours, so each pair is found once
+NEIGHBOUR_OFFSETS = [(1, 0), (-1, 1), (0, 1), (1, 1)]
+HIT_TICKS = 6  # Ticks a ball is drawn red after a paddle hit, as in game.py
+
+
+class BallView:
+    """One ball's position and velocity, shaped like game.Ball for OpponentAI.update()."""
+
+    def __init__(self, x, y, dx, dy):
+        self.x = x
+        self.y = y
+        self.dx = dx
+        self.dy = dy
+
+
+class MultiBall:
+    """
+    Any number of balls in one court, stepped together once per physics tick:
+
+        balls = MultiBall(1000, (800, 600), ball_size=8)
+        left_out, right_out = balls.step([player.rect, opponent.rect])
+        balls.draw(screen, timestep.alpha)
+
+    Balls are boxes against the walls and paddles (like game.Ball) and circles against each
+    other, with equal-mass elastic bounces. A ball that leaves the court on the left or right
+    counts as a point and is served again from the middle, so the count stays the same.
+    """
+
+    def __init__(self, count, court_size=(800, 600), ball_size=8, speed=6.0, speed_increment=0.5,
+                 max_speed=12.0, seed=None):
+        self.width, self.height = court_size
+        self.ball_size = ball_size
+        self.speed = speed
+        self.speed_increment = speed_increment
+        self.max_speed = max_speed
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.pos = np.zeros((0, 2))        # Top-left corners, px
+        self.prev = np.zeros((0, 2))       # Positions at the previous tick, for render interpolation
+        self.vel = np.zeros((0, 2))        # px per tick
+        self.hit_ticks = np.zeros(0, dtype=np.int8)
+        self.collisions = 0                # Ball-ball bounces in the last tick
+        self.candidates = 0                # Pairs the grid passed to the exact test in the last tick
+
+        # Grid cells are one ball wide, so touching balls have centres in neighbouring cells.
+        # One spare cell on each side holds balls that stray outside the court.
+        self.cell = float(ball_size)
+        self.grid_width = int(np.ceil(self.width / self.cell)) + 2
+        self.grid_height = int(np.ceil(self.height / self.cell)) + 2
+        self._cells = np.arange(self.grid_width * self.grid_height)
+        self._sprites = {}
+        self.spawn(count)
+
+    def _reserve(self, capacity):
+        if capacity <= len(self.pos):
+            return
+        capacity = max(capacity, 2 * len(self.pos))
+        for name in ("pos", "prev", "vel", "hit_ticks"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _serve(self, index):
+        """Put the given balls in the middle, moving diagonally at the serve speed in random directions."""
+        n = len(index)
+        if not n:
+            return
+        centre = (self.width / 2 - self.ball_size / 2, self.height / 2 - self.ball_size / 2)
+        self.pos[index] = centre + self.rng.uniform(-self.height / 4, self.height / 4, (n, 2)) * (0.2, 1.0)
+        self.prev[index] = self.pos[index]
+        angle = self.rng.uniform(-np.pi / 4, np.pi / 4, n) + np.pi * self.rng.integers(0, 2, n)
+        self.vel[index, 0] = np.cos(angle) * self.speed * np.sqrt(2)
+        self.vel[index, 1] = np.sin(angle) * self.speed * np.sqrt(2)
+        self.hit_ticks[index] = 0
+
+    def spawn(self, n):
+        """Add n balls, served from the middle."""
+        self._reserve(self.count + n)
+        self.count += n
+        self._serve(np.arange(self.count - n, self.count))
+
+    def remove(self, mask):
+        """Remove the balls selected by a boolean mask over the live balls, keeping the arrays packed."""
+        keep = ~np.asarray(mask, dtype=bool)
+        kept = int(keep.sum())
+        for array in (self.pos, self.prev, self.vel, self.hit_ticks):
+            array[:kept] = array[:self.count][keep]
+        self.count = kept
+
+    def reset(self):
+        self._serve(np.arange(self.count))
+
+    def step(self, paddles):
+        """
+        One physics tick for every ball. paddles: (x, y, w, h) rects such as pygame.Rect.
+        Returns (balls out on the left, balls out on the right).
+        """
+        n = self.count
+        pos, vel, prev = self.pos[:n], self.vel[:n], self.prev[:n]
+        prev[:] = pos
+        pos += vel
+        hit_ticks = self.hit_ticks[:n]
+        np.maximum(hit_ticks - 1, 0, out=hit_ticks)
+
+        # Top and bottom walls: reflect the overshoot
+        x, y, dx, dy = pos[:, 0], pos[:, 1], vel[:, 0], vel[:, 1]
+        floor = self.height - self.ball_size
+        top = y < 0
+        y[top] = -y[top]
+        dy[top] = np.abs(dy[top])
+        bottom = y > floor
+        y[bottom] = 2 * floor - y[bottom]
+        dy[bottom] = -np.abs(dy[bottom])
+
+        for rect in paddles:
+            self._bounce_off_paddle(tuple(rect))
+        self._collide_balls()
+
+        # Balls out on either side score and are served again
+        left = x <= 0
+        right = x + self.ball_size >= self.width
+        out = np.flatnonzero(left | right)
+        self._serve(out)
+        return int(left.sum()), int(right.sum())
+
+    def _bounce_off_paddle(self, rect):
+        px, py, pw, ph = rect
+        n, size = self.count, self.ball_size
+        pos, prev, vel = self.pos[:n], self.prev[:n], self.vel[:n]
+        x, y, dx = pos[:, 0], pos[:, 1], vel[:, 0]
+        hit = np.zeros(n, dtype=bool)
+        # Swept test of the leading edge against each face the ball moves toward
+        for face, moving in ((px + pw, dx < 0), (px - size, dx > 0)):
+            crossed = moving & ((prev[:, 0] - face) * (x - face) <= 0)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = (face - prev[:, 0]) / (x - prev[:, 0])
+            contact_y = prev[:, 1] + (y - prev[:, 1]) * np.nan_to_num(t)
+            face_hit = crossed & (contact_y + size > py) & (contact_y < py + ph)
+            x[face_hit] = 2 * face - x[face_hit]
+            dx[face_hit] = -dx[face_hit]
+            hit |= face_hit
+        # A paddle that moved onto a ball pushes it out of the nearer side
+        inside = (x + size > px) & (x < px + pw) & (y + size > py) & (y < py + ph)
+        if inside.any():
+            to_left = inside & (x + size / 2 < px + pw / 2)
+            to_right = inside & ~to_left
+            x[to_left] = px - size
+            dx[to_left] = -np.abs(dx[to_left])
+            x[to_right] = px + pw
+            dx[to_right] = np.abs(dx[to_right])
+            hit |= inside
+        if hit.any():
+            # Speed up like the single ball does, up to max_speed per axis
+            velocity = vel[hit]
+            velocity += np.sign(velocity) * self.speed_increment
+            np.clip(velocity, -self.max_speed, self.max_speed, out=velocity)
+            vel[hit] = velocity
+            self.hit_ticks[:n][hit] = HIT_TICKS
+
+    def candidate_pairs(self):
+        """
+        (i, j) index arrays of the ball pairs that share a grid cell or are in neighbouring
+        cells, each pair once: the broad phase. Balls are sorted by cell, so every cell's balls
+        are one contiguous run, found for all cells at once with searchsorted.
+        """
+        n = self.count
+        centres = self.pos[:n] + self.ball_size / 2
+        cx = np.clip((centres[:, 0] // self.cell).astype(np.int64) + 1, 0, self.grid_width - 1)
+        cy = np.clip((centres[:, 1] // self.cell).astype(np.int64) + 1, 0, self.grid_height - 1)
+        keys = cy * self.grid_width + cx
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        cell_start = np.searchsorted(sorted_keys, self._cells, "left")
+        cell_end = np.searchsorted(sorted_keys, self._cells, "right")
+        sx, sy = cx[order], cy[order]
+        slots = np.arange(n)
+
+        # Own cell: the balls after this one in the run; neighbours: the whole run
+        starts = [slots + 1]
+        ends = [cell_end[sorted_keys]]
+        for ox, oy in NEIGHBOUR_OFFSETS:
+            nx, ny = sx + ox, sy + oy
+            valid = (nx >= 0) & (nx < self.grid_width) & (ny < self.grid_height)
+            neighbour = np.where(valid, ny * self.grid_width + nx, 0)
+            starts.append(np.where(valid, cell_start[neighbour], 0))
+            ends.append(np.where(valid, cell_end[neighbour], 0))
+        starts = np.concatenate(starts)
+        counts = np.maximum(np.concatenate(ends) - starts, 0)
+        total = int(counts.sum())
+        owners = np.repeat(np.tile(slots, len(NEIGHBOUR_OFFSETS) + 1), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        partners = np.repeat(starts, counts) + offsets
+        return order[owners], order[partners]
+
+    def _collide_balls(self):
+        n = self.count
+        if n < 2:
+            self.collisions = self.candidates = 0
+            return
+        i, j = self.candidate_pairs()
+        self.candidates = len(i)
+        pos, vel = self.pos[:n], self.vel[:n]
+        delta = pos[j] - pos[i]
+        dist2 = (delta ** 2).sum(axis=1)
+        touching = (dist2 < self.ball_size ** 2) & (dist2 > 0)
+        i, j, delta, dist2 = i[touching], j[touching], delta[touching], dist2[touching]
+        self.collisions = len(i)
+        if not len(i):
+            return
+        dist = np.sqrt(dist2)
+        normal = delta / dist[:, None]
+        # Equal masses: swap the velocity components along the normal, if the balls are closing
+        closing = np.minimum(((vel[j] - vel[i]) * normal).sum(axis=1), 0.0)
+        impulse = normal * closing[:, None]
+        # Separate the overlap, half each way
+        push = normal * ((self.ball_size - dist) / 2)[:, None]
+        for axis in (0, 1):
+            vel[:, axis] += np.bincount(i, impulse[:, axis], n) - np.bincount(j, impulse[:, axis], n)
+            pos[:, axis] += np.bincount(j, push[:, axis], n) - np.bincount(i, push[:, axis], n)
+
+    def threat(self, face_x):
+        """
+        View of the ball that will reach x = face_x first (for OpponentAI), or of the nearest
+        ball if none is moving toward it; None without balls.
+        """
+        n = self.count
+        if not n:
+            return None
+        x, dx = self.pos[:n, 0], self.vel[:n, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ticks = (face_x - x) / dx
+        ticks[~(ticks >= 0)] = np.inf
+        index = int(np.argmin(ticks)) if np.isfinite(ticks).any() else int(np.argmin(np.abs(face_x - x)))
+        (x, y), (dx, dy) = self.pos[index], self.vel[index]
+        return BallView(float(x), float(y), float(dx), float(dy))
+
+    def _sprite(self, color):
+        sprite = self._sprites.get(color)
+        if sprite is None:
+            radius = self.ball_size // 2
+            sprite = pygame.Surface((self.ball_size, self.ball_size), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+            sprite = self._sprites[color] = sprite.convert_alpha() if pygame.display.get_surface() else sprite
+        return sprite
+
+    def draw(self, surface, alpha=1.0, color=(255, 255, 255), hit_color=(255, 0, 0)):
+        """Draw every ball interpolated alpha of the way between the last two ticks, in one blits() call."""
+        n = self.count
+        points = np.rint(self.prev[:n] + (self.pos[:n] - self.prev[:n]) * alpha).astype(np.int64).tolist()
+        sprites = (self._sprite(color), self._sprite(hit_color))
+        hit = (self.hit_ticks[:n] > 0).tolist()
+        surface.blits([(sprites[h], point) for h, point in zip(hit, points)], doreturn=False)
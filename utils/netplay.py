@@ -0,0 +1,322 @@
+import collections
+import heapq
+import random
+import socket
+import struct
+import time
+
+# Two-machine play over UDP (see game-Network.py). The host runs the only real simulation;
+# the client sends nothing but its paddle position, once per physics tick, and the host
+# sends back the match state every few ticks as a delta against the last state the client
+# confirmed. The client predicts from the newest state it has (see ClientSide there).
+#
+# Packets (little-endian, no padding):
+#   input: type, input sequence, newest state tick received, paddle top y
+#   state: type, tick, base tick (0 = full state), newest input sequence received,
+#          bit mask of the fields that differ from the base, then those fields only
+
+DEFAULT_PORT = 50507
+MSG_INPUT = 1
+MSG_STATE = 2
+INPUT = struct.Struct("<BIIh")
+STATE_HEADER = struct.Struct("<BIIIH")
+UDP_OVERHEAD = 28  # IPv4 + UDP header bytes per datagram, counted in the bandwidth figures
+
+# Match state fields: name, struct code, fixed-point scale. Positions are sent in 1/16 px and
+# velocities in 1/256 px per tick, so a whole field fits in 16 bits.
+STATE_FIELDS = (
+    ("ball_x", "h", 16),
+    ("ball_y", "h", 16),
+    ("ball_dx", "h", 256),
+    ("ball_dy", "h", 256),
+    ("host_y", "h", 1),
+    ("client_y", "h", 1),
+    ("host_score", "H", 1),
+    ("client_score", "H", 1),
+    ("hit_ticks", "B", 1),
+)
+MatchState = collections.namedtuple("MatchState", [name for name, _, _ in STATE_FIELDS])
+FULL_MASK = (1 << len(STATE_FIELDS)) - 1
+
+
+def quantize(state):
+    return tuple(int(round(value * scale)) for value, (_, _, scale) in zip(state, STATE_FIELDS))
+
+
+def dequantize(values):
+    return MatchState(*(value / scale if scale != 1 else value for value, (_, _, scale) in zip(values, STATE_FIELDS)))
+
+
+_field_structs = {}
+
+
+def _fields_struct(mask):
+    """Struct for the fields selected by mask, cached per mask."""
+    packer = _field_structs.get(mask)
+    if packer is None:
+        codes = "".join(code for i, (_, code, _) in enumerate(STATE_FIELDS) if mask >> i & 1)
+        packer = _field_structs[mask] = struct.Struct("<" + codes)
+    return packer
+
+
+def encode_state(tick, values, base_tick, base_values, input_ack):
+    """State packet for quantized values, as a delta against base_values (None: full state)."""
+    if base_values is None:
+        base_tick, mask = 0, FULL_MASK
+    else:
+        mask = 0
+        for i, (value, base) in enumerate(zip(values, base_values)):
+            if value != base:
+                mask |= 1 << i
+    changed = [value for i, value in enumerate(values) if mask >> i & 1]
+    return STATE_HEADER.pack(MSG_STATE, tick, base_tick, input_ack, mask) + _fields_struct(mask).pack(*changed)
+
+
+def decode_state(packet, bases):
+    """
+    (tick, quantized values, input_ack) from a state packet, or None if it is a delta against a
+    state missing from bases ({tick: quantized values}).
+    """
+    _, tick, base_tick, input_ack, mask = STATE_HEADER.unpack_from(packet)
+    if base_tick:
+        base = bases.get(base_tick)
+        if base is None:
+            return None
+        values = list(base)
+    else:
+        values = [0] * len(STATE_FIELDS)
+    changed = iter(_fields_struct(mask).unpack_from(packet, STATE_HEADER.size))
+    for i in range(len(STATE_FIELDS)):
+        if mask >> i & 1:
+            values[i] = next(changed)
+    return tick, tuple(values), input_ack
+
+
+class NetworkConditions:
+    """Artificial latency (seconds, one way), jitter (+/- seconds) and packet loss (0 to 1) for outgoing packets."""
+
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.seed = seed
+
+    @property
+    def perfect(self):
+        return self.latency == 0 and self.jitter == 0 and self.loss == 0
+
+
+class ImpairedSocket:
+    """
+    UDP socket whose outgoing datagrams are dropped or held back according to a
+    NetworkConditions, to play and test on a bad network from a good one. Held datagrams
+    go out on flush(), which the endpoints call on every poll. With jitter, packets can
+    arrive out of order, as on a real network.
+    """
+
+    def __init__(self, sock, conditions, clock=time.perf_counter):
+        self.sock = sock
+        self.conditions = conditions
+        self.clock = clock
+        self.random = random.Random(conditions.seed)
+        self._queue = []  # Heap of (due time, order, data, address)
+        self._order = 0
+
+    def sendto(self, data, address):
+        conditions = self.conditions
+        if self.random.random() < conditions.loss:
+            return len(data)
+        delay = conditions.latency + self.random.uniform(-conditions.jitter, conditions.jitter)
+        if delay <= 0 and not self._queue:
+            return self.sock.sendto(data, address)
+        heapq.heappush(self._queue, (self.clock() + max(delay, 0.0), self._order, data, address))
+        self._order += 1
+        self.flush()
+        return len(data)
+
+    def flush(self):
+        now = self.clock()
+        while self._queue and self._queue[0][0] <= now:
+            _, _, data, address = heapq.heappop(self._queue)
+            self.sock.sendto(data, address)
+
+    def recvfrom(self, size):
+        return self.sock.recvfrom(size)
+
+    def close(self):
+        self.sock.close()
+
+
+class BandwidthMeter:
+    """Bytes per second sent and received over the last `window` seconds, UDP/IP headers included."""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.sent = collections.deque()      # (time, bytes)
+        self.received = collections.deque()
+        self.total_sent = 0
+        self.total_received = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+
+    def add_sent(self, size, now):
+        self.sent.append((now, size + UDP_OVERHEAD))
+        self.total_sent += size + UDP_OVERHEAD
+        self.packets_sent += 1
+
+    def add_received(self, size, now):
+        self.received.append((now, size + UDP_OVERHEAD))
+        self.total_received += size + UDP_OVERHEAD
+        self.packets_received += 1
+
+    def _rate(self, samples, now):
+        while samples and samples[0][0] < now - self.window:
+            samples.popleft()
+        return sum(size for _, size in samples) / self.window
+
+    def rates(self, now):
+        """(sent, received) in bytes per second."""
+        return self._rate(self.sent, now), self._rate(self.received, now)
+
+
+class _Endpoint:
+    def __init__(self, bind_address, conditions=None, timeout=3.0, clock=time.perf_counter):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(bind_address)
+        sock.setblocking(False)
+        self.port = sock.getsockname()[1]
+        self.clock = clock
+        self.sock = sock if conditions is None or conditions.perfect else ImpairedSocket(sock, conditions, clock)
+        self.timeout = timeout  # Seconds without a packet before the other side counts as gone
+        self.meter = BandwidthMeter()
+        self.last_heard = None
+
+    @property
+    def connected(self):
+        return self.last_heard is not None and self.clock() - self.last_heard < self.timeout
+
+    def _send(self, data, address):
+        self.sock.sendto(data, address)
+        self.meter.add_sent(len(data), self.clock())
+
+    def _receive(self):
+        """Yield (packet, address) for every datagram waiting on the socket."""
+        if isinstance(self.sock, ImpairedSocket):
+            self.sock.flush()
+        while True:
+            try:
+                packet, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, ConnectionResetError):
+                return
+            now = self.clock()
+            self.meter.add_received(len(packet), now)
+            self.last_heard = now
+            yield packet, address
+
+    def close(self):
+        self.sock.close()
+
+
+class NetHost(_Endpoint):
+    """
+    Host end: runs the authoritative match. Call poll() every frame for the client's paddle
+    (remote_y), and send_state() every few ticks. One client at a time; another address
+    can take over once the current client has been silent for `timeout` seconds.
+    """
+
+    def __init__(self, port=DEFAULT_PORT, conditions=None, history=128, timeout=3.0, clock=time.perf_counter):
+        super().__init__(("", port), conditions, timeout, clock)
+        self.client = None
+        self.remote_y = None     # Client paddle top y from its newest input
+        self.input_seq = 0       # Newest input sequence received
+        self.acked_tick = 0      # Newest state tick the client has confirmed
+        self.history = collections.OrderedDict()  # tick -> quantized state, for deltas
+        self.history_size = history
+
+    def poll(self):
+        for packet, address in self._receive():
+            if len(packet) != INPUT.size or packet[0] != MSG_INPUT:
+                continue
+            if address != self.client:
+                if self.client is not None and self.clock() - self.last_heard < self.timeout:
+                    continue
+                # New client: it has no states yet, so start over with full ones
+                self.client = address
+                self.input_seq = 0
+                self.acked_tick = 0
+            _, seq, ack, paddle_y = INPUT.unpack(packet)
+            if seq > self.input_seq:  # Inputs are absolute positions: older ones are stale
+                self.input_seq = seq
+                self.remote_y = paddle_y
+            self.acked_tick = max(self.acked_tick, ack)
+
+    def send_state(self, tick, state):
+        """Send a MatchState to the client as a delta against the newest state it confirmed."""
+        values = quantize(state)
+        self.history[tick] = values
+        while len(self.history) > self.history_size:
+            self.history.popitem(last=False)
+        if self.client is None:
+            return
+        base = self.history.get(self.acked_tick)
+        self._send(encode_state(tick, values, self.acked_tick, base, self.input_seq), self.client)
+
+
+class NetClient(_Endpoint):
+    """
+    Client end: send_input() the local paddle once per tick, poll() for new states.
+    state is the newest MatchState received, received_at when it arrived and rtt the
+    smoothed round trip time (from the input sequence the host echoes back).
+    """
+
+    def __init__(self, address, conditions=None, history=128, timeout=3.0, clock=time.perf_counter):
+        super().__init__(("", 0), conditions, timeout, clock)
+        self.address = address
+        self.input_seq = 0
+        self.sent_times = collections.OrderedDict()  # Input sequence -> send time
+        self.rtt = None
+        self.tick = 0            # Tick of the newest state
+        self.state = None
+        self.received_at = None
+        self.states = collections.OrderedDict()  # tick -> quantized state, bases for deltas
+        self.history_size = history
+
+    def send_input(self, paddle_y):
+        self.input_seq += 1
+        now = self.clock()
+        self.sent_times[self.input_seq] = now
+        while len(self.sent_times) > self.history_size:
+            self.sent_times.popitem(last=False)
+        self._send(INPUT.pack(MSG_INPUT, self.input_seq, self.tick, int(paddle_y)), self.address)
+
+    def poll(self):
+        """Read waiting packets; returns True if a newer state arrived."""
+        updated = False
+        for packet, _ in self._receive():
+            if len(packet) < STATE_HEADER.size or packet[0] != MSG_STATE:
+                continue
+            decoded = decode_state(packet, self.states)
+            if decoded is None:
+                continue  # Delta against a state we never got; the host falls back to our last ack
+            tick, values, input_ack = decoded
+            self.states[tick] = values
+            while len(self.states) > self.history_size:
+                self.states.popitem(last=False)
+            if tick <= self.tick:
+                continue  # Late or reordered: still kept as a delta base
+            self.tick = tick
+            self.state = dequantize(values)
+            self.received_at = self.clock()
+            updated = True
+            sent = self.sent_times.get(input_ack)
+            if sent is not None:
+                sample = self.received_at - sent
+                self.rtt = sample if self.rtt is None else self.rtt + 0.1 * (sample - self.rtt)
+        return updated
+
+    def ticks_behind(self, tick_rate):
+        """Estimated ticks between the newest state and the host's simulation right now."""
+        if self.received_at is None:
+            return 0.0
+        one_way = self.rtt / 2 if self.rtt is not None else 0.0
+        return (self.clock() - self.received_at + one_way) * tick_rate
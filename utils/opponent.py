@@ -0,0 +1,124 @@
+import random
+
+# Computer opponent for the Pong games. Pure Python with no imports from the utils package,
+# so the keyboard-only utils/game.py (run from inside utils/) can use it too.
+#
+# Between paddles the ball flies in a straight line and bounces off the top and bottom
+# walls exactly (see physics.sweep_box), so where it crosses a paddle follows in closed form:
+# extend the straight line to the paddle and fold it back into the court at the walls.
+# The answer only changes when the ball's velocity does, so it is computed once per change
+# and each tick just moves the paddle toward it.
+
+
+class Difficulty:
+    """
+    reaction: seconds before the AI acts on a new ball direction.
+    error: largest aiming error, in pixels (drawn at random for each new direction).
+    max_speed: fastest the paddle moves, in pixels per physics tick (None for no limit).
+    """
+
+    def __init__(self, name, reaction, error, max_speed):
+        self.name = name
+        self.reaction = reaction
+        self.error = error
+        self.max_speed = max_speed
+
+
+DIFFICULTIES = {difficulty.name: difficulty for difficulty in [
+    Difficulty("easy", 0.3, 50, 5),
+    Difficulty("medium", 0.18, 25, 8),
+    Difficulty("hard", 0.08, 8, 12),
+    Difficulty("perfect", 0.0, 0, None),
+]}
+
+
+def fold(value, low, high):
+    """value reflected back into [low, high] as often as it takes, like a ball between two walls."""
+    span = high - low
+    if span <= 0:
+        return low
+    offset = (value - low) % (2 * span)
+    return low + (offset if offset <= span else 2 * span - offset)
+
+
+def intercept_y(x, y, dx, dy, target_x, court_height, ball_size):
+    """
+    Ball top y when its left edge reaches target_x, moving (dx, dy) per tick from (x, y)
+    and bouncing off the walls; None if it is not moving toward target_x.
+    """
+    if dx == 0 or (target_x - x) * dx < 0:
+        return None
+    ticks = (target_x - x) / dx
+    return fold(y + dy * ticks, 0, court_height - ball_size)
+
+
+class OpponentAI:
+    """
+    Paddle AI that moves to where the ball will reach it. Call once per physics tick:
+
+        paddle.move(ai.update(ball, paddle.rect))
+
+    ball needs x, y, dx, dy (top-left position and velocity per tick); paddle is its rect.
+    While the ball moves away, the paddle returns to the middle. computations counts how
+    often the intercept was actually worked out (once per paddle hit, wall bounce or serve).
+    """
+
+    def __init__(self, difficulty="medium", court_size=(800, 600), ball_size=20, tick_rate=60, seed=None):
+        self.difficulty = DIFFICULTIES[difficulty] if isinstance(difficulty, str) else difficulty
+        self.court_width, self.court_height = court_size
+        self.ball_size = ball_size
+        self.tick_rate = tick_rate
+        self.random = random.Random(seed)
+        self.computations = 0
+        self._velocity = None     # Ball (dx, dy) the cached intercept is for
+        self._last_x = None
+        self._intercept = None    # Paddle centre y the ball will reach, before aiming error
+        self._target = None       # Paddle centre y being moved to
+        self._pending = None      # [ticks left, target] for a change not reacted to yet
+
+    def reset(self):
+        """Forget the cached intercept, e.g. after changing the difficulty."""
+        self._velocity = None
+        self._pending = None
+
+    def _compute(self, ball, paddle):
+        self.computations += 1
+        if paddle.centerx > self.court_width / 2:
+            face_x = paddle.left - self.ball_size  # Ball left edge when its right edge touches the paddle
+        else:
+            face_x = paddle.right
+        y = intercept_y(ball.x, ball.y, ball.dx, ball.dy, face_x, self.court_height, self.ball_size)
+        if y is None:
+            return self.court_height / 2
+        return y + self.ball_size / 2
+
+    def update(self, ball, paddle):
+        """New top y for the paddle after one tick."""
+        # A serve can keep the velocity, but the ball jumps back against its direction
+        served = self._last_x is not None and (ball.x - self._last_x) * ball.dx < 0
+        self._last_x = ball.x
+        velocity = (ball.dx, ball.dy)
+        if velocity != self._velocity or served:
+            self._velocity = velocity
+            intercept = self._compute(ball, paddle)
+            # A wall bounce changes the velocity but not where the ball ends up
+            if self._intercept is None or abs(intercept - self._intercept) > 1:
+                self._intercept = intercept
+                difficulty = self.difficulty
+                target = intercept + self.random.uniform(-difficulty.error, difficulty.error)
+                self._pending = [round(difficulty.reaction * self.tick_rate), target]
+
+        if self._pending is not None:
+            if self._pending[0] <= 0:
+                self._target = self._pending[1]
+                self._pending = None
+            else:
+                self._pending[0] -= 1
+
+        if self._target is None:
+            return paddle.y
+        step = self._target - paddle.centery
+        max_speed = self.difficulty.max_speed
+        if max_speed is not None:
+            step = max(-max_speed, min(step, max_speed))
+        return round(paddle.y + step)
@@ -0,0 +1,158 @@
+# Fixed-timestep physics helpers shared by the game loops.
+# Physics runs at TICK_RATE ticks per second however fast frames are rendered; velocities
+# are in pixels per tick and the ball moves with swept AABB collision so it can't tunnel
+# through a paddle. Pure Python so the keyboard-only game can use it without cv2/mediapipe.
+import time
+
+TICK_RATE = 60               # Physics ticks per second (the speeds in the games are tuned for 60)
+MAX_TICKS_PER_FRAME = 5      # Drop time rather than spiral when a frame takes far too long
+MAX_CONTACTS_PER_TICK = 4    # Bounces resolved within one tick (e.g. paddle then wall in a corner)
+WALL_THICKNESS = 1e6         # Walls are huge boxes just outside the playfield
+
+# Court shared by game.py and the batch simulator (utils/batch_sim.py); velocities per tick
+WINDOW_WIDTH = 800
+WINDOW_HEIGHT = 600
+PADDLE_WIDTH = 15
+PADDLE_HEIGHT = 120
+BALL_SIZE = 20
+BALL_SPEED_X = 6
+BALL_SPEED_Y = 6
+SPEED_INCREMENT = 0.5
+PLAYER_X = 20                                   # Left edge of each paddle
+OPPONENT_X = WINDOW_WIDTH - 30 - PADDLE_WIDTH
+PADDLE_START_Y = WINDOW_HEIGHT // 2 - PADDLE_HEIGHT // 2
+
+
+class FixedTimestep:
+    """Turns variable frame times into a whole number of fixed physics ticks."""
+
+    def __init__(self, tick_rate=TICK_RATE, max_ticks=MAX_TICKS_PER_FRAME):
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def advance(self, now=None):
+        """Return the number of ticks to simulate for the time elapsed since the last call."""
+        if now is None:
+            now = time.perf_counter()
+        if self.last_time is None:
+            self.last_time = now
+            return 0
+        self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.max_ticks:
+            ticks = self.max_ticks
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= ticks * self.dt
+        return ticks
+
+    @property
+    def alpha(self):
+        """Fraction of a tick elapsed since the last one, for interpolating what is drawn."""
+        return min(self.accumulator / self.dt, 1.0)
+
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+
+def wall_boxes(width, height):
+    """Top and bottom walls as (x, y, w, h) boxes; left and right stay open for scoring."""
+    return [
+        (-WALL_THICKNESS, -WALL_THICKNESS, 2 * WALL_THICKNESS + width, WALL_THICKNESS),
+        (-WALL_THICKNESS, height, 2 * WALL_THICKNESS + width, WALL_THICKNESS),
+    ]
+
+
+WALLS = wall_boxes(WINDOW_WIDTH, WINDOW_HEIGHT)
+
+
+def swept_aabb(x, y, w, h, dx, dy, box):
+    """
+    Time of impact of a w x h box at (x, y) moving by (dx, dy) against a static box.
+    Returns (t, normal_x, normal_y) with t in [0, 1], or None if they don't touch
+    during the move. Boxes that already overlap are not reported.
+    """
+    bx, by, bw, bh = box
+
+    if dx > 0:
+        tx_entry, tx_exit = (bx - (x + w)) / dx, (bx + bw - x) / dx
+    elif dx < 0:
+        tx_entry, tx_exit = (bx + bw - x) / dx, (bx - (x + w)) / dx
+    elif x + w <= bx or x >= bx + bw:
+        return None
+    else:
+        tx_entry, tx_exit = float("-inf"), float("inf")
+
+    if dy > 0:
+        ty_entry, ty_exit = (by - (y + h)) / dy, (by + bh - y) / dy
+    elif dy < 0:
+        ty_entry, ty_exit = (by + bh - y) / dy, (by - (y + h)) / dy
+    elif y + h <= by or y >= by + bh:
+        return None
+    else:
+        ty_entry, ty_exit = float("-inf"), float("inf")
+
+    entry = max(tx_entry, ty_entry)
+    exit_ = min(tx_exit, ty_exit)
+    if entry >= exit_ or entry < 0.0 or entry > 1.0:
+        return None
+
+    if tx_entry > ty_entry:
+        return entry, (-1.0 if dx > 0 else 1.0), 0.0
+    return entry, 0.0, (-1.0 if dy > 0 else 1.0)
+
+
+def sweep_box(x, y, size, dx, dy, boxes, max_contacts=MAX_CONTACTS_PER_TICK):
+    """
+    Move a size x size box by one tick of velocity (dx, dy), reflecting off the first
+    box hit and continuing with the rest of the move.
+    Returns (x, y, dx, dy, hits) where hits lists the indexes of the boxes struck, in order.
+    """
+    hits = []
+    remaining = 1.0
+    for _ in range(max_contacts):
+        move_x, move_y = dx * remaining, dy * remaining
+        first = None
+        for i, box in enumerate(boxes):
+            contact = swept_aabb(x, y, size, size, move_x, move_y, box)
+            if contact is not None and (first is None or contact[0] < first[1][0]):
+                first = (i, contact)
+        if first is None:
+            break
+
+        i, (t, normal_x, normal_y) = first
+        x += move_x * t
+        y += move_y * t
+        if normal_x:
+            dx = -dx
+        if normal_y:
+            dy = -dy
+        hits.append(i)
+        remaining *= 1.0 - t
+    else:
+        # Out of contacts for this tick; stop here rather than risk moving into a box
+        return x, y, dx, dy, hits
+
+    return x + dx * remaining, y + dy * remaining, dx, dy, hits
+
+
+def push_out(x, y, size, dx, box):
+    """
+    Handle a paddle that moved onto the ball: if they overlap and the ball is heading
+    into the paddle, put it back on the face it came from and reflect it once.
+    Returns (x, dx, hit).
+    """
+    bx, by, bw, bh = box
+    if x + size <= bx or x >= bx + bw or y + size <= by or y >= by + bh:
+        return x, dx, False
+    center = x + size / 2
+    if center < bx + bw / 2 and dx > 0:
+        return bx - size, -dx, True
+    if center >= bx + bw / 2 and dx < 0:
+        return bx + bw, -dx, True
+    return x, dx, False
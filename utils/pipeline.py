@@ -0,0 +1,160 @@
+import threading
+import time
+
+import cv2
+
+from utils.capture import frame_capture_time
+from utils.tracing import NULL_TRACER
+
+
+class LatestFrameBuffer:
+    """
+    Single-slot buffer shared between threads. A new item always replaces the
+    one that has not been read yet ("latest frame wins"), so a slow consumer
+    never builds up a backlog of stale frames.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._read_seq = 0
+        self.dropped = 0  # Items overwritten before anyone read them
+
+    def put(self, item):
+        with self._cond:
+            if self._seq != self._read_seq:
+                self.dropped += 1
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, last_seq=0, timeout=None):
+        """
+        Wait for an item newer than last_seq.
+        Returns (seq, item), or (last_seq, None) if the timeout expires first.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > last_seq, timeout):
+                return last_seq, None
+            self._read_seq = self._seq
+            return self._seq, self._item
+
+    def peek(self):
+        """
+        Return the current (seq, item) without waiting or marking it as read.
+        item is None if nothing arrived yet.
+        """
+        with self._cond:
+            return self._seq, self._item
+
+
+class CaptureThread(threading.Thread):
+    """
+    Reads camera frames as fast as the camera delivers them. Frames are stamped with the
+    driver's capture time when the capture provides one (utils.capture.CameraCapture).
+    """
+
+    def __init__(self, cap, frames, flip=False, tracer=NULL_TRACER):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.frames = frames
+        self.flip = flip
+        self.tracer = tracer
+        self.failed = False
+        self._resolution = None  # Requested (width, height), applied between reads
+        self._stop_event = threading.Event()
+
+    def request_resolution(self, width, height):
+        """Change the capture size from another thread; applied by this thread before its next read."""
+        self._resolution = (width, height)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if self._resolution is not None:
+                width, height = self._resolution
+                self._resolution = None
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            with self.tracer.span("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                self.failed = True
+                break
+            timestamp = frame_capture_time(self.cap, time.perf_counter())
+            if self.flip:
+                frame = cv2.flip(frame, 1)
+            self.frames.put((timestamp, frame))
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class InferenceWorker(threading.Thread):
+    """Runs hand inference on the newest captured frame, skipping any it could not keep up with."""
+
+    def __init__(self, frames, results, infer, tracer=NULL_TRACER):
+        super().__init__(name="inference", daemon=True)
+        self.frames = frames
+        self.results = results
+        self.infer = infer
+        self.tracer = tracer
+        self.inference_time = 0.0  # Duration of the last inference call, in seconds
+        self.min_interval = 0.0    # Least time between inference starts, to cap the inference rate
+        self._stop_event = threading.Event()
+
+    def run(self):
+        seq = 0
+        while not self._stop_event.is_set():
+            seq, item = self.frames.get(seq, timeout=0.1)
+            if item is None:
+                continue
+            timestamp, frame = item
+            start = time.perf_counter()
+            with self.tracer.span("inference"):
+                result = self.infer(frame)
+            self.inference_time = time.perf_counter() - start
+            # Keep the capture timestamp so consumers can tell how old the result is
+            self.results.put((timestamp, result))
+            idle = self.min_interval - self.inference_time
+            if idle > 0:
+                self._stop_event.wait(idle)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class FramePipeline:
+    """
+    Capture thread + inference worker feeding the render loop.
+    The render loop polls latest_frame() and latest_result() and never waits
+    on the camera or on the hand model.
+    """
+
+    def __init__(self, cap, infer, flip=False, tracer=NULL_TRACER):
+        self.frames = LatestFrameBuffer()
+        self.results = LatestFrameBuffer()
+        self.capture = CaptureThread(cap, self.frames, flip=flip, tracer=tracer)
+        self.worker = InferenceWorker(self.frames, self.results, infer, tracer=tracer)
+
+    def start(self):
+        self.capture.start()
+        self.worker.start()
+
+    def stop(self):
+        self.capture.stop()
+        self.worker.stop()
+        self.capture.join(timeout=1.0)
+        self.worker.join(timeout=1.0)
+
+    @property
+    def failed(self):
+        return self.capture.failed
+
+    def latest_frame(self):
+        """Newest (capture_time, frame), or None before the first frame arrives."""
+        return self.frames.peek()[1]
+
+    def latest_result(self):
+        """Newest (capture_time, result), or None before the first inference finishes."""
+        return self.results.peek()[1]
@@ -0,0 +1,429 @@
+import atexit
+import collections
+import os
+import struct
+import time
+
+import cv2
+import numpy as np
+
+from utils.hand_tracker import HANDEDNESS_CODES, HANDEDNESS_LABELS, NUM_LANDMARKS, HandResult
+from utils.multi_hand_tracker import HandTracks, MultiHandResult
+
+# File layout: a fixed-size header, then the frames in one of two layouts (the header's codec).
+# raw: fixed-size records, one per frame, each holding the frame itself. The body is one NumPy
+#   structured array that np.memmap maps directly: seeking is an index and frames are views
+#   into the file. Large: about 55 MB/s at 640x480 and 60 FPS.
+# jpeg / png: chunks, each a CHUNK header, an index of fixed-size records (timestamp, tracker
+#   output, and the file offset and size of the frame) and the encoded frames back to back.
+#   Several times smaller. Seeking is still an index; each frame is decoded from a view of
+#   the mapped file.
+# Chunks are written whole, so a recording cut off mid-write loses at most its last chunk.
+MAGIC = b"CVPREC01"
+HEADER = struct.Struct("<8sIIIIII")  # magic, version, height, width, channels, max_hands, codec
+HEADER_SIZE = 64                     # Header is padded so records start 64-byte aligned
+VERSION = 2                          # Version 1 had no codec field (zero padding there, so raw)
+CODECS = ("raw", "jpeg", "png")      # Codec names by header code
+CHUNK = struct.Struct("<4sIQ")       # b"CHNK", frames in the chunk, bytes of encoded frames after its index
+CHUNK_MAGIC = b"CHNK"
+ENCODE_PARAMS = {"jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY), "png": (".png", cv2.IMWRITE_PNG_COMPRESSION)}
+DEFAULT_QUALITY = {"jpeg": 90, "png": 1}  # JPEG quality 0-100; PNG compression level 0-9 (1 is fast)
+
+
+def result_fields(max_hands):
+    """Fixed-layout tracker output for up to max_hands hands (also used by utils.remote_tracker)."""
+    return [
+        ("frame_id", "<i8"),          # Tracker sequence number
+        ("num_hands", "u1"),
+        ("handedness", "u1", (max_hands,)),
+        ("confidence", "<f4", (max_hands,)),
+        ("position", "<i4", (max_hands, 2)),
+        ("landmarks", "<f4", (max_hands, NUM_LANDMARKS, 3)),
+    ]
+
+
+def record_dtype(height, width, channels, max_hands):
+    """Structured dtype of one record: timestamp, tracker output for up to max_hands hands, raw frame."""
+    return np.dtype(
+        [("timestamp", "<f8")]        # Seconds since the first recorded frame
+        + result_fields(max_hands)
+        + [("frame", "u1", (height, width, channels))],
+        align=True)
+
+
+def index_dtype(max_hands):
+    """Structured dtype of one index record of a compressed recording: where its frame is, instead of the frame."""
+    return np.dtype(
+        [("timestamp", "<f8")]
+        + result_fields(max_hands)
+        + [("offset", "<u8"),         # File offset of the encoded frame
+           ("size", "<u4")],          # Its length in bytes
+        align=True)
+
+
+def store_result(record, result, max_hands):
+    """Write a HandResult, MultiHandResult or None into the tracker fields of a record."""
+    hands = []
+    if result is not None:
+        record["frame_id"] = result.frame_id
+        hands = result.hands if isinstance(result, MultiHandResult) else [result]
+        hands = [hand for hand in hands if hand.position is not None][:max_hands]
+    record["num_hands"] = len(hands)
+    for i, hand in enumerate(hands):
+        record["handedness"][i] = HANDEDNESS_CODES.get(hand.handedness, 0)
+        record["confidence"][i] = hand.confidence
+        record["position"][i] = hand.position
+        if hand.landmarks is not None:
+            record["landmarks"][i] = hand.landmarks
+
+
+def load_result(record, multi=False):
+    """Tracker output stored in a record, as a HandResult or (multi=True) MultiHandResult."""
+    frame_id = int(record["frame_id"])
+    count = int(record["num_hands"])
+    # Copies: the record may be a view into a memory-mapped file or shared memory
+    landmarks = np.array(record["landmarks"][:count])
+    handedness = np.array(record["handedness"][:count])
+    confidence = np.array(record["confidence"][:count])
+    hands = [HandResult(frame_id, tuple(int(v) for v in record["position"][i]), landmarks[i],
+                        float(confidence[i]), HANDEDNESS_LABELS.get(int(handedness[i])))
+             for i in range(count)]
+    if multi:
+        return MultiHandResult(frame_id, hands, landmarks, handedness, confidence)
+    return hands[0] if hands else HandResult(frame_id)
+
+
+class Recorder:
+    """
+    Streams frames, timestamps and HandTracker results to a recording file.
+    Records are buffered and written one chunk at a time: when chunk_size frames are
+    buffered, when flush_interval seconds have passed since the last write to disk, and on
+    close(), which also runs at interpreter exit. A crash loses at most flush_interval seconds.
+
+    codec "jpeg" (default) or "png" (lossless) stores each frame encoded, at quality (JPEG
+    quality, or PNG compression level); "raw" stores frames as they are, which is far larger
+    but lets a replay map frames straight from the file without decoding. scale < 1 stores
+    frames downscaled by that factor, hand positions scaled to match; stride N keeps one frame
+    in N, with its real timestamp, so a replay still runs at the recorded speed.
+    """
+
+    def __init__(self, path, frame_shape, max_hands=2, chunk_size=32, scale=1.0, stride=1, codec="jpeg",
+                 quality=None, flush_interval=1.0):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}; expected one of {', '.join(CODECS)}")
+        height, width, channels = frame_shape
+        self.path = path
+        self.frame_shape = tuple(frame_shape)  # Shape of the frames passed to write()
+        self.scale = scale
+        self.stride = max(int(stride), 1)
+        height, width = max(round(height * scale), 1), max(round(width * scale), 1)
+        self.stored_shape = (height, width, channels)
+        self.max_hands = max_hands
+        self.codec = codec
+        if codec == "raw":
+            self.dtype = record_dtype(height, width, channels, max_hands)
+        else:
+            self.dtype = index_dtype(max_hands)
+            extension, param = ENCODE_PARAMS[codec]
+            self._extension = extension
+            self._encode_params = [param, DEFAULT_QUALITY[codec] if quality is None else int(quality)]
+        self.flush_interval = flush_interval
+        self.count = 0
+        self.offered = 0        # Frames passed to write(), stored or skipped by the stride
+        self.bytes_written = HEADER_SIZE
+        self._chunk = np.zeros(chunk_size, dtype=self.dtype)
+        self._encoded = []      # Encoded frames of the buffered records (compressed codecs)
+        self._pending = 0
+        self._start_time = None
+        self._last_flush = time.perf_counter()
+
+        self._file = open(path, "wb")
+        header = HEADER.pack(MAGIC, VERSION, height, width, channels, max_hands, CODECS.index(codec))
+        self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+        atexit.register(self.close)
+
+    def frame_bytes(self):
+        """
+        Bytes stored per recorded frame: exact for raw, the average so far for compressed
+        codecs (None before the first frame).
+        """
+        if self.codec == "raw":
+            return self.dtype.itemsize
+        if not self.count:
+            return None
+        return (self.bytes_written - HEADER_SIZE + sum(len(data) for data in self._encoded)
+                + self._pending * self.dtype.itemsize) / self.count
+
+    def data_rate(self, fps):
+        """Bytes written per second for a camera delivering fps frames per second (see frame_bytes())."""
+        frame_bytes = self.frame_bytes()
+        return None if frame_bytes is None else frame_bytes * fps / self.stride
+
+    def write(self, frame, result=None, timestamp=None):
+        """Append one frame and the tracker result for it (HandResult, MultiHandResult or None)."""
+        if frame.shape != self.frame_shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match recording shape {self.frame_shape}")
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        if self._start_time is None:
+            self._start_time = timestamp
+        self.offered += 1
+        if (self.offered - 1) % self.stride:
+            return
+
+        record = self._chunk[self._pending]
+        record["timestamp"] = timestamp - self._start_time
+        if self.stored_shape != self.frame_shape:
+            size = (self.stored_shape[1], self.stored_shape[0])
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if self.codec == "raw":
+            record["frame"] = frame
+        else:
+            ok, data = cv2.imencode(self._extension, frame, self._encode_params)
+            if not ok:
+                raise RuntimeError(f"Could not encode a {self.stored_shape} frame as {self.codec}")
+            record["size"] = len(data)
+            self._encoded.append(data)
+
+        store_result(record, result, self.max_hands)
+        if self.stored_shape != self.frame_shape:
+            # Positions are in frame pixels; landmarks are normalized and need nothing
+            count = int(record["num_hands"])
+            record["position"][:count] = np.rint(record["position"][:count] * self.scale)
+
+        self._pending += 1
+        self.count += 1
+        if self._pending == len(self._chunk) or time.perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records to disk, as one chunk for compressed codecs."""
+        if self._pending:
+            records = self._chunk[:self._pending]
+            if self.codec == "raw":
+                self._file.write(records.tobytes())
+                self.bytes_written += records.nbytes
+            else:
+                sizes = records["size"].astype(np.uint64)
+                data_start = self.bytes_written + CHUNK.size + records.nbytes
+                records["offset"] = data_start + np.cumsum(sizes) - sizes
+                self._file.write(CHUNK.pack(CHUNK_MAGIC, self._pending, int(sizes.sum())))
+                self._file.write(records.tobytes())
+                for data in self._encoded:
+                    self._file.write(data)
+                self.bytes_written = data_start + int(sizes.sum())
+                self._encoded.clear()
+            self._chunk[:self._pending] = 0
+            self._pending = 0
+        self._file.flush()
+        self._last_flush = time.perf_counter()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+        atexit.unregister(self.close)
+
+
+class Recording:
+    """
+    Read-only, memory-mapped view of a recording file. For raw recordings, records and frames
+    are the mapped structured arrays; for compressed ones frame() decodes one frame.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, height, width, channels, max_hands, codec = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version not in (1, VERSION) or codec >= len(CODECS):
+            raise ValueError(f"{path} is not a CV Pong recording (version {VERSION})")
+        self.frame_shape = (height, width, channels)
+        self.max_hands = max_hands
+        self.codec = CODECS[codec]
+        size = os.path.getsize(path)
+
+        if self.codec == "raw":
+            self.dtype = record_dtype(height, width, channels, max_hands)
+            # Ignore a trailing partial record left by a recording that was cut off mid-write
+            length = (size - HEADER_SIZE) // self.dtype.itemsize
+            # Copy-on-write mapping: reads are zero-copy; writes (e.g. annotations) stay private
+            self.records = np.memmap(path, dtype=self.dtype, mode="c", offset=HEADER_SIZE, shape=(length,))
+            self.frames = self.records["frame"]
+            self._chunks = [self.records]
+            self._starts = np.zeros(1, dtype=np.int64)
+        else:
+            self.dtype = index_dtype(max_hands)
+            self.records = self.frames = None
+            self._data = np.memmap(path, dtype=np.uint8, mode="r") if size > HEADER_SIZE else np.zeros(0, np.uint8)
+            self._chunks = []  # Each chunk's index, a view into the mapped file
+            position = HEADER_SIZE
+            while position + CHUNK.size <= size:
+                chunk_magic, count, data_size = CHUNK.unpack(self._data[position:position + CHUNK.size].tobytes())
+                end = position + CHUNK.size + count * self.dtype.itemsize + data_size
+                if chunk_magic != CHUNK_MAGIC or end > size:
+                    break  # Cut off mid-write
+                start = position + CHUNK.size
+                self._chunks.append(self._data[start:start + count * self.dtype.itemsize].view(self.dtype))
+                position = end
+            counts = [len(chunk) for chunk in self._chunks]
+            self._starts = np.cumsum([0] + counts[:-1]).astype(np.int64)
+        self._length = sum(len(chunk) for chunk in self._chunks)
+        self.timestamps = (np.concatenate([chunk["timestamp"] for chunk in self._chunks]) if self._chunks
+                           else np.zeros(0))
+
+    def __len__(self):
+        return self._length
+
+    def _record(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(f"Frame {index} is outside the recording (0 to {self._length - 1})")
+        chunk = int(np.searchsorted(self._starts, index, "right")) - 1
+        return self._chunks[chunk][index - self._starts[chunk]]
+
+    def frame(self, index):
+        """Frame at index: a view into the file (no copy) for raw recordings, otherwise decoded."""
+        if self.codec == "raw":
+            return self.frames[index]
+        record = self._record(index)
+        offset = int(record["offset"])
+        return cv2.imdecode(self._data[offset:offset + int(record["size"])], cv2.IMREAD_COLOR)
+
+    def index_at(self, seconds):
+        """Index of the first frame recorded at or after the given time since the start."""
+        return int(np.searchsorted(self.timestamps, seconds))
+
+    def result(self, index, multi=False):
+        """Recorded tracker output for a frame, as a HandResult or (multi=True) MultiHandResult."""
+        return load_result(self._record(index), multi)
+
+
+class ReplaySource:
+    """
+    Plays a recording back through the cv2.VideoCapture interface (read/isOpened/release/get/set),
+    so it can replace the webcam in Game. With realtime=True frames are paced by their
+    recorded timestamps, which reproduces the timing of the original session.
+    """
+
+    def __init__(self, recording, realtime=True, loop=False):
+        self.recording = recording if isinstance(recording, Recording) else Recording(recording)
+        self.realtime = realtime
+        self.loop = loop
+        self.index = -1  # Index of the frame returned by the last read()
+        self._start = None
+        self._recent = collections.OrderedDict()  # id(frame) -> index, for ReplayTracker lookups
+
+    def isOpened(self):
+        return len(self.recording) > 0
+
+    def read(self):
+        next_index = self.index + 1
+        if next_index >= len(self.recording):
+            if not self.loop:
+                return False, None
+            next_index = 0
+            self._start = None
+        self.index = next_index
+
+        if self.realtime:
+            recorded = float(self.recording.timestamps[self.index])
+            if self._start is None:
+                self._start = time.perf_counter() - recorded
+            delay = self._start + recorded - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        frame = self.recording.frame(self.index)
+        self._recent[id(frame)] = (frame, self.index)
+        if len(self._recent) > 16:
+            self._recent.popitem(last=False)
+        return True, frame
+
+    def seek(self, index):
+        """Jump so that the next read() returns the frame at index."""
+        self.index = index - 1
+        self._start = None
+
+    def index_of(self, frame):
+        """Recording index of a frame returned by a recent read(), or the last index if unknown."""
+        entry = self._recent.get(id(frame))
+        if entry is not None and entry[0] is frame:
+            return entry[1]
+        return self.index
+
+    def get(self, prop):
+        height, width, _ = self.recording.frame_shape
+        return {
+            cv2.CAP_PROP_FRAME_WIDTH: width,
+            cv2.CAP_PROP_FRAME_HEIGHT: height,
+            cv2.CAP_PROP_FRAME_COUNT: len(self.recording),
+            cv2.CAP_PROP_POS_FRAMES: self.index + 1,
+        }.get(prop, 0)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.seek(int(value))
+            return True
+        return False
+
+    def release(self):
+        pass
+
+
+class ReplayTracker:
+    """
+    Stands in for HandTracker during replay and returns the landmarks stored in the
+    recording instead of running MediaPipe.
+    """
+
+    def __init__(self, source, multi=False):
+        self.source = source
+        self.multi = multi
+        self.frame_id = 0
+        self.inference_count = 0  # Always 0: nothing is inferred
+        self.cache_hits = 0
+        self.tracks = HandTracks() if multi else None  # Track IDs are not stored, so reassign them
+        self._last_result = None
+
+    def process(self, frame, frame_id=None):
+        index = self.source.index_of(frame)
+        if self._last_result is not None and index == self.frame_id:
+            self.cache_hits += 1
+            return self._last_result
+        self.frame_id = index
+        result = self.source.recording.result(index, multi=self.multi)
+        if self.multi:
+            height, width, _ = self.source.recording.frame_shape
+            self.tracks.assign(result.hands, width, height)
+        self._last_result = result
+        return result
+
+    def rgb_frame(self, frame):
+        return None  # No inference, so no RGB copy to reuse
+
+    def draw(self, frame, result):
+        hands = result.hands if self.multi else [result]
+        for hand in hands:
+            if hand.position is not None:
+                cv2.circle(frame, hand.position, 10, (0, 255, 0), -1)
+        return frame
+
+    def get_hand_position(self, frame, frame_id=None, annotate=True):
+        if frame is None:
+            return None, frame
+        result = self.process(frame, frame_id)
+        if annotate:
+            self.draw(frame, result)
+        return result.position, frame
+
+    def get_hand_positions(self, frame, frame_id=None, annotate=True):
+        if frame is None:
+            return [], frame
+        result = self.process(frame, frame_id)
+        if annotate:
+            self.draw(frame, result)
+        return result.positions, frame
+
+    def release(self):
+        pass
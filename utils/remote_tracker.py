@@ -0,0 +1,275 @@
+import atexit
+import multiprocessing
+import struct
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from utils.hand_tracker import HandResult
+from utils.multi_hand_tracker import HandTracks, MultiHandResult
+from utils.recording import load_result, result_fields, store_result
+from utils.tracing import NULL_TRACER
+
+# Frames and results never go through pickle: the parent copies each frame into a slot of a
+# shared-memory ring, the worker writes its output into the matching slot of a shared array
+# of fixed-layout result records (same fields as a recording), and the pipe between them
+# only carries 12-byte (slot, frame_id) messages.
+MESSAGE = struct.Struct("<iq")  # Ring slot, frame_id
+READY = -1                      # Slot value of the worker's "model loaded" message
+STOP = -2                       # Slot value asking the worker to exit
+CONFIGURE = -3                  # Slot value announcing a SETTINGS message for tracker.configure()
+SETTINGS = struct.Struct("<ii") # scan_size, model_complexity; -1 leaves a setting unchanged
+
+
+def _worker_main(conn, frames_name, results_name, frame_shape, slots, max_hands, multi, tracker_args):
+    """Inference process: runs MediaPipe on each frame slot it is sent and writes back the result."""
+    if multi:
+        from utils.multi_hand_tracker import HandTracker
+    else:
+        from utils.hand_tracker import HandTracker
+    tracker = HandTracker(max_num_hands=max_hands, **tracker_args)
+    tracker.warm_up(frame_shape)
+
+    frames_shm = shared_memory.SharedMemory(name=frames_name)
+    results_shm = shared_memory.SharedMemory(name=results_name)
+    frames = np.ndarray((slots,) + frame_shape, dtype=np.uint8, buffer=frames_shm.buf)
+    results = np.ndarray(slots, dtype=np.dtype(result_fields(max_hands), align=True), buffer=results_shm.buf)
+    conn.send_bytes(MESSAGE.pack(READY, 0))
+    try:
+        while True:
+            slot, frame_id = MESSAGE.unpack(conn.recv_bytes())
+            if slot == STOP:
+                break
+            if slot == CONFIGURE:
+                scan_size, model_complexity = SETTINGS.unpack(conn.recv_bytes())
+                tracker.configure(scan_size=None if scan_size < 0 else scan_size,
+                                  model_complexity=None if model_complexity < 0 else model_complexity)
+                continue
+            result = tracker.process(frames[slot], frame_id)
+            store_result(results[slot], result, max_hands)
+            conn.send_bytes(MESSAGE.pack(slot, frame_id))
+    except (EOFError, OSError, KeyboardInterrupt):
+        pass  # Parent went away
+    finally:
+        tracker.release()
+        del frames, results
+        frames_shm.close()
+        results_shm.close()
+
+
+class RemoteHandTracker:
+    """
+    Drop-in HandTracker that runs MediaPipe in a worker process, so hands.process() and the
+    conversion of its protobuf results don't hold this process's GIL (pygame keeps handling
+    events and rendering while a frame is inferred).
+
+    multi=False behaves like utils.hand_tracker.HandTracker (get_hand_position, HandResult);
+    multi=True like utils.multi_hand_tracker.HandTracker (get_hand_positions, MultiHandResult,
+    with track IDs). Other keyword arguments go to the tracker in the worker.
+
+    The worker starts on the first frame (or in warm_up) and is restarted when the frame size
+    changes. If it crashes or does not answer within timeout seconds, it is killed, that frame
+    reports no hand, and a new worker is started after restart_delay seconds. A worker that
+    fails to start is retried the same way; frames report no hand until one is running.
+    """
+
+    def __init__(self, max_num_hands=1, multi=False, slots=2, timeout=1.0, startup_timeout=60.0,
+                 restart_delay=1.0, **tracker_args):
+        self.max_num_hands = max_num_hands
+        self.multi = multi
+        self.slots = slots
+        self.timeout = timeout
+        self.startup_timeout = startup_timeout
+        self.restart_delay = restart_delay
+        self.tracker_args = tracker_args
+        self.result_dtype = np.dtype(result_fields(max_num_hands), align=True)
+
+        # Same per-frame cache as the in-process trackers
+        self.frame_id = 0
+        self.inference_count = 0
+        self.cache_hits = 0
+        self.restarts = 0       # Workers replaced after a crash or timeout
+        self._last_frame = None
+        self._last_result = None
+
+        self.tracer = NULL_TRACER
+        self.tracks = HandTracks() if multi else None
+        self.frame_shape = None
+        self._context = multiprocessing.get_context("spawn")  # No fork: the parent has threads and an SDL window
+        self._process = None
+        self._conn = None
+        self._frames_shm = None
+        self._results_shm = None
+        self._next_slot = 0
+        self._retry_at = 0.0
+        self._pending_settings = None  # From configure(), sent to the worker before the next frame
+        self._atexit_registered = False
+
+    def _start(self, frame_shape):
+        self._stop()
+        self.frame_shape = tuple(frame_shape)
+        frame_bytes = int(np.prod(self.frame_shape))
+        self._frames_shm = shared_memory.SharedMemory(create=True, size=self.slots * frame_bytes)
+        self._results_shm = shared_memory.SharedMemory(create=True, size=self.slots * self.result_dtype.itemsize)
+        self._frames = np.ndarray((self.slots,) + self.frame_shape, dtype=np.uint8, buffer=self._frames_shm.buf)
+        self._results = np.ndarray(self.slots, dtype=self.result_dtype, buffer=self._results_shm.buf)
+
+        self._conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker_main, name="hand-inference", daemon=True,
+            args=(child_conn, self._frames_shm.name, self._results_shm.name, self.frame_shape,
+                  self.slots, self.max_num_hands, self.multi, self.tracker_args))
+        self._process.start()
+        child_conn.close()
+        if not self._atexit_registered:
+            atexit.register(self.release)
+            self._atexit_registered = True
+
+        if not self._conn.poll(self.startup_timeout) or MESSAGE.unpack(self._conn.recv_bytes())[0] != READY:
+            self._stop()
+            raise RuntimeError("Hand inference worker did not start")
+
+    def _stop(self):
+        if self._process is not None:
+            try:
+                self._conn.send_bytes(MESSAGE.pack(STOP, 0))
+            except OSError:
+                pass
+            self._process.join(timeout=1.0)
+            if self._process.is_alive():
+                self._process.kill()
+                self._process.join()
+            self._conn.close()
+            self._process = None
+            self._conn = None
+        if self._frames_shm is not None:
+            del self._frames, self._results  # Views must go before the buffers can close
+            for shm in (self._frames_shm, self._results_shm):
+                shm.close()
+                shm.unlink()
+            self._frames_shm = None
+            self._results_shm = None
+
+    def warm_up(self, frame_shape=(480, 640, 3)):
+        """
+        Start the worker for frames of frame_shape and wait until its model is loaded and warmed
+        up, instead of doing so on the first frame. A camera delivering another size restarts it.
+        """
+        if self._process is None or tuple(frame_shape) != self.frame_shape:
+            self._start(frame_shape)
+
+    def configure(self, scan_size=None, model_complexity=None):
+        """
+        Change the inference input size or model at runtime, as HandTracker.configure() does
+        (single- or multi-hand). Safe to call from another thread than the one running
+        process(): the settings go to the worker with the next frame, and to any restarted worker.
+        """
+        self._pending_settings = (scan_size, model_complexity)
+
+    def _send_settings(self):
+        scan_size, model_complexity = self._pending_settings
+        self._pending_settings = None
+        if scan_size is not None:
+            self.tracker_args["scan_size"] = scan_size or None
+        if model_complexity is not None:
+            self.tracker_args["model_complexity"] = model_complexity
+        self._conn.send_bytes(MESSAGE.pack(CONFIGURE, 0))
+        self._conn.send_bytes(SETTINGS.pack(-1 if scan_size is None else scan_size,
+                                            -1 if model_complexity is None else model_complexity))
+
+    def _empty_result(self, frame_id):
+        return MultiHandResult(frame_id) if self.multi else HandResult(frame_id)
+
+    def process(self, frame, frame_id=None):
+        """Run hand inference once per frame in the worker and return its result (cached for repeated queries)."""
+        if frame is None:
+            return self._empty_result(self.frame_id)
+
+        cached = self._last_result
+        if cached is not None:
+            if frame_id is not None and frame_id == cached.frame_id:
+                self.cache_hits += 1
+                return cached
+            if frame_id is None and frame is self._last_frame:
+                self.cache_hits += 1
+                return cached
+
+        self.frame_id = frame_id if frame_id is not None else self.frame_id + 1
+        result = self._infer(frame, self.frame_id)
+        self._last_frame = frame
+        self._last_result = result
+        return result
+
+    def _infer(self, frame, frame_id):
+        if self._process is None or frame.shape != self.frame_shape:
+            if time.perf_counter() < self._retry_at:
+                return self._empty_result(frame_id)
+            try:
+                self._start(frame.shape)
+            except (RuntimeError, OSError) as e:
+                print(f"{e or type(e).__name__}; retrying in {self.restart_delay:g} s")
+                self.restarts += 1
+                self._retry_at = time.perf_counter() + self.restart_delay
+                return self._empty_result(frame_id)
+
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        try:
+            with self.tracer.span("hands.remote"):
+                if self._pending_settings is not None:
+                    self._send_settings()
+                self._frames[slot] = frame  # The only copy of the frame
+                self._conn.send_bytes(MESSAGE.pack(slot, frame_id))
+                deadline = time.perf_counter() + self.timeout
+                while True:
+                    # Waiting on the pipe releases the GIL
+                    if not self._conn.poll(max(deadline - time.perf_counter(), 0.0)):
+                        raise TimeoutError("Hand inference worker timed out")
+                    done_slot, done_id = MESSAGE.unpack(self._conn.recv_bytes())
+                    if done_slot == slot and done_id == frame_id:
+                        break
+        except (EOFError, OSError, TimeoutError) as e:
+            print(f"Hand inference worker failed ({e or type(e).__name__}); restarting")
+            self.restarts += 1
+            self._stop()
+            self._retry_at = time.perf_counter() + self.restart_delay
+            return self._empty_result(frame_id)
+
+        self.inference_count += 1
+        result = load_result(self._results[slot], self.multi)
+        if self.multi:
+            height, width = self.frame_shape[:2]
+            self.tracks.assign(result.hands, width, height)
+        return result
+
+    def rgb_frame(self, frame):
+        return None  # The RGB conversion happens in the worker
+
+    def draw(self, frame, result):
+        """Optional annotation step: mark every detected index finger tip."""
+        hands = result.hands if self.multi else [result]
+        for hand in hands:
+            if hand.position is not None:
+                cv2.circle(frame, hand.position, 10, (0, 255, 0), -1)
+        return frame
+
+    def get_hand_position(self, frame, frame_id=None, annotate=True):
+        if frame is None:
+            return None, frame
+        result = self.process(frame, frame_id)
+        if annotate:
+            self.draw(frame, result)
+        return result.position, frame
+
+    def get_hand_positions(self, frame, frame_id=None, annotate=True):
+        if frame is None:
+            return [], frame
+        result = self.process(frame, frame_id)
+        if annotate:
+            self.draw(frame, result)
+        return result.positions, frame
+
+    def release(self):
+        self._stop()
@@ -0,0 +1,229 @@
+import collections
+import threading
+import time
+
+from utils.pipeline import LatestFrameBuffer
+from utils.tracing import NULL_TRACER
+
+# Shared hand inference for several game sessions in one process (see game-Host.py).
+# Each session has its own camera and latest-frame buffer; a fixed pool of workers serves all
+# sessions, and the pool size caps the CPU spent on inference. A worker keeps one tracker (one
+# MediaPipe model) for each session it serves, created the first time it serves it.
+
+
+class SessionStats:
+    """Rolling per-session counters: camera, inference and render rates, and result latency."""
+
+    def __init__(self, window=120):
+        self.captures = collections.deque(maxlen=window)     # Capture timestamps
+        self.inferences = collections.deque(maxlen=window)   # Times results became available
+        self.renders = collections.deque(maxlen=window)      # Times the session was drawn
+        self.latencies = collections.deque(maxlen=window)    # Capture -> result, seconds
+        self.inference_times = collections.deque(maxlen=window)
+        self.inference_count = 0
+
+    def add_inference(self, capture_time, start, end):
+        self.inferences.append(end)
+        self.latencies.append(end - capture_time)
+        self.inference_times.append(end - start)
+        self.inference_count += 1
+
+    @staticmethod
+    def _rate(timestamps):
+        timestamps = list(timestamps)
+        if len(timestamps) < 2 or timestamps[-1] == timestamps[0]:
+            return 0.0
+        return (len(timestamps) - 1) / (timestamps[-1] - timestamps[0])
+
+    @staticmethod
+    def _percentile(values, p):
+        values = sorted(values)
+        if not values:
+            return 0.0
+        return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+    def summary(self):
+        """Current figures; rates in frames per second, times in milliseconds."""
+        return {
+            "capture_fps": self._rate(self.captures),
+            "inference_fps": self._rate(self.inferences),
+            "render_fps": self._rate(self.renders),
+            "latency_p50_ms": self._percentile(self.latencies, 50) * 1000,
+            "latency_p95_ms": self._percentile(self.latencies, 95) * 1000,
+            "inference_ms": self._percentile(self.inference_times, 50) * 1000,
+            "inferences": self.inference_count,
+        }
+
+
+class _SessionFrames(LatestFrameBuffer):
+    """Latest-frame buffer that wakes the pool whenever the session's camera delivers a frame."""
+
+    def __init__(self, pool, stats):
+        super().__init__()
+        self._pool = pool
+        self._stats = stats
+
+    def put(self, item):
+        super().put(item)
+        self._stats.captures.append(item[0])
+        self._pool._wake()
+
+
+class PoolSession:
+    """A session registered with an InferencePool. Capture puts (capture_time, frame) into frames;
+    results holds the newest (capture_time, result)."""
+
+    def __init__(self, pool, name, budget_fps):
+        self.name = name
+        self.budget_fps = budget_fps  # Most inferences per second this session may use
+        self.stats = SessionStats()
+        self.frames = _SessionFrames(pool, self.stats)
+        self.results = LatestFrameBuffer()
+        self.seq = 0              # Sequence number of the last frame handed to a worker
+        self.busy = False         # A worker is inferring one of this session's frames
+        self.next_due = 0.0       # Earliest time the frame budget allows the next inference
+        self.last_served = 0.0
+        self.last_worker = None
+
+    def latest_frame(self):
+        """Newest (capture_time, frame), or None before the first frame arrives."""
+        return self.frames.peek()[1]
+
+    def latest_result(self):
+        """Newest (capture_time, result), or None before the first inference finishes."""
+        return self.results.peek()[1]
+
+
+class InferencePool:
+    """
+    Bounded pool of inference workers shared by several sessions.
+
+    Scheduling: a free worker takes the newest frame of the session that has waited longest
+    since it was last served, among sessions with a new frame, no inference in flight and
+    budget left (at most budget_fps inferences per second each). Frames that are replaced
+    before a worker gets to them are dropped, so a busy pool lowers every session's inference
+    rate evenly instead of building queues. A worker gets a small preference for the session
+    it served last, so MediaPipe can keep tracking the same hand instead of re-detecting it.
+
+    tracker_factory() is called once per worker for each session and frame shape the worker
+    serves, and must return an object with process(frame) and release(). Trackers are not
+    shared between sessions: MediaPipe in video mode looks for the hand where it was in the
+    previous frame, so a tracker switched to another camera would search the wrong place, and
+    one fed another size starts over (RemoteHandTracker restarts its process and reloads the
+    model). A frame that fails is logged and dropped; the worker carries on. Each worker
+    releases its trackers when it exits.
+    """
+
+    def __init__(self, tracker_factory, size=2, budget_fps=30, tracer=NULL_TRACER):
+        self.tracker_factory = tracker_factory
+        self.size = size
+        self.budget_fps = budget_fps
+        self.tracer = tracer
+        self.sessions = []
+        self.trackers = []
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+
+    def register(self, name, budget_fps=None):
+        """Add a session; returns its PoolSession."""
+        session = PoolSession(self, name, budget_fps or self.budget_fps)
+        with self._cond:
+            self.sessions.append(session)
+        return session
+
+    def start(self):
+        # One tracker per worker up front, so a model loads during startup; it is claimed by
+        # the first session the worker serves
+        self.trackers = [{None: self.tracker_factory()} for _ in range(self.size)]
+        for index, trackers in enumerate(self.trackers):
+            thread = threading.Thread(target=self._work, args=(index, trackers),
+                                      name=f"inference-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for index, thread in enumerate(self._threads):
+            thread.join(timeout=2.0)
+            if thread.is_alive():
+                # Still inside process(); the worker releases its trackers once it returns
+                print(f"Inference worker {index} did not stop within 2 s")
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify()
+
+    def _pick(self, worker, now):
+        """Session the worker should serve next, or (None, seconds to wait or None)."""
+        best = None
+        best_key = None
+        next_due = None
+        for session in self.sessions:
+            if session.busy or session.frames.peek()[0] <= session.seq:
+                continue
+            if session.next_due > now:
+                next_due = session.next_due if next_due is None else min(next_due, session.next_due)
+                continue
+            key = session.last_served
+            if session.last_worker == worker:
+                key -= 0.5 / session.budget_fps  # Affinity, bounded to half a frame budget
+            if best is None or key < best_key:
+                best, best_key = session, key
+        if best is not None:
+            return best, None
+        return None, None if next_due is None else next_due - now
+
+    def _tracker_for(self, trackers, session, shape):
+        """The worker's tracker for this session's frames of this shape, created on first use."""
+        key = (session, shape)
+        tracker = trackers.get(key)
+        if tracker is None:
+            tracker = trackers.pop(None) if None in trackers else self.tracker_factory()
+            trackers[key] = tracker
+        return tracker
+
+    def _work(self, worker, trackers):
+        try:
+            self._serve(worker, trackers)
+        finally:
+            for tracker in trackers.values():
+                tracker.release()
+
+    def _serve(self, worker, trackers):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    now = time.perf_counter()
+                    session, wait = self._pick(worker, now)
+                    if session is not None:
+                        break
+                    self._cond.wait(wait)
+                seq, item = session.frames.get(session.seq, timeout=0)
+                session.seq = seq
+                session.busy = True
+                session.last_served = now
+                session.last_worker = worker
+                session.next_due = now + 1.0 / session.budget_fps
+
+            capture_time, frame = item
+            start = time.perf_counter()
+            result = None
+            try:
+                with self.tracer.span("inference"):
+                    result = self._tracker_for(trackers, session, frame.shape).process(frame)
+            except Exception as e:
+                print(f"Inference worker {worker} failed on {session.name} ({e or type(e).__name__}); frame dropped")
+            finally:
+                end = time.perf_counter()
+                with self._cond:
+                    session.busy = False
+                    self._cond.notify()  # A frame may have arrived for this session meanwhile
+            if result is None:
+                continue
+            session.results.put((capture_time, result))
+            session.stats.add_inference(capture_time, start, end)
@@ -0,0 +1,363 @@
+import collections
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# Soak testing: run the game unattended for hours and check that it is as fast and as small
+# at the end as it was at the start. SoakMonitor is told about every presented frame; every
+# `interval` seconds it samples the frame rate since the last sample, the process RSS, the
+# memory traced by tracemalloc and the number of live Python objects. After a warm-up it
+# takes a baseline (tracemalloc snapshot and object counts per type), and the report
+# compares the end of the run with the start and names what grew. Sampling and the snapshots
+# stop the game for a moment (seconds, for the snapshots); that time is left out of the run.
+
+
+def parse_duration(text):
+    """Seconds from "90", "90s", "45m" or "8h"."""
+    text = text.strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600}
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes. Where /proc is missing this falls back to the
+    peak RSS, which still shows growth but never shrinks; None if neither can be read.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, KiB elsewhere
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def _slope_per_hour(times, values):
+    """Least-squares slope of values over times (seconds), per hour."""
+    if len(times) < 3:
+        return 0.0
+    mean_t = sum(times) / len(times)
+    mean_v = sum(values) / len(values)
+    variance = sum((t - mean_t) ** 2 for t in times)
+    if variance == 0:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in zip(times, values)) / variance * 3600
+
+
+class DriftThresholds:
+    """
+    Limits beyond which the soak report flags drift. Early and late are the first and last
+    quarter of the samples taken after the warm-up.
+        fps_drop: fraction the FPS (frames over time) may fall from early to late
+        frame_p95_rise: fraction the 95th percentile frame interval may rise
+        rss_growth_mb / rss_slope_mb_per_hour: RSS growth over the run, and its trend
+        traced_growth_mb: growth of the memory Python allocated (tracemalloc)
+        object_growth: fraction the number of live Python objects may grow
+        trend_span: shortest run (seconds after the warm-up) whose RSS trend is judged; over
+            minutes, allocator and cache warm-up would read as hundreds of MB per hour
+    """
+
+    def __init__(self, fps_drop=0.1, frame_p95_rise=0.25, rss_growth_mb=50.0, rss_slope_mb_per_hour=25.0,
+                 traced_growth_mb=20.0, object_growth=0.2, trend_span=1800.0):
+        self.fps_drop = fps_drop
+        self.frame_p95_rise = frame_p95_rise
+        self.rss_growth_mb = rss_growth_mb
+        self.rss_slope_mb_per_hour = rss_slope_mb_per_hour
+        self.traced_growth_mb = traced_growth_mb
+        self.object_growth = object_growth
+        self.trend_span = trend_span
+
+
+class SoakMonitor:
+    """
+    Samples performance and memory during a soak run. Call frame() once per presented frame
+    and stop when done is True; then report() or save(). The run is timed from the first frame,
+    leaving out the time the monitor itself spends sampling.
+
+    tracemalloc slows allocations down, which lowers the FPS a little, but equally at the start
+    and the end of the run, so drift still shows. Pass trace_allocations=False to leave it off.
+    """
+
+    def __init__(self, duration, interval=30.0, warmup=60.0, thresholds=None, top=10,
+                 trace_allocations=True, log=print, clock=time.perf_counter):
+        self.duration = duration
+        self.interval = interval
+        self.warmup = min(warmup, duration / 4)  # Short runs still keep most samples
+        self.thresholds = thresholds or DriftThresholds()
+        self.top = top
+        self.trace_allocations = trace_allocations
+        self.log = log
+        self.clock = clock
+        self.samples = []          # One dict per interval
+        self.frame_count = 0
+        self._intervals = []       # Seconds between presented frames since the last sample
+        self._last_frame = None
+        self._baseline = None      # (tracemalloc snapshot or None, object counts per type)
+        self._final = None
+        self._baseline_time = None
+        self.start = None
+        self.last_frame_time = None
+        self.paused = 0.0          # Seconds spent sampling, left out of the run time
+        self._next_sample = None
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def elapsed(self):
+        return self.clock() - self.start - self.paused if self.start is not None else 0.0
+
+    @property
+    def done(self):
+        return self.elapsed >= self.duration
+
+    def frame(self):
+        now = self.clock()
+        if self.start is None:
+            self.start = now
+            self._next_sample = now + self.interval
+        if self._last_frame is not None:
+            self._intervals.append(now - self._last_frame)
+        self._last_frame = self.last_frame_time = now
+        self.frame_count += 1
+        if now >= self._next_sample:
+            self.sample(now)
+            run_time = now - self.start - self.paused
+            if self._baseline is None and run_time >= self.warmup:
+                self._baseline = self._snapshot()
+                self._baseline_time = run_time
+            # The sampling itself is not a frame interval, and not part of the run
+            resumed = self.clock()
+            self.paused += resumed - now
+            self._next_sample = resumed + self.interval
+            self._last_frame = None
+
+    def _snapshot(self):
+        """
+        Allocated bytes and blocks per source line, and live objects per type. Only the totals
+        are kept: a whole tracemalloc snapshot held until the end would itself show up as growth.
+        """
+        gc.collect()  # Count live objects only, not garbage waiting for the collector
+        counts = collections.Counter(type(obj).__name__ for obj in gc.get_objects())
+        allocations = None
+        if tracemalloc.is_tracing():
+            allocations = {}
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+            for stat in snapshot.statistics("lineno"):
+                frame = stat.traceback[0]
+                allocations[f"{frame.filename}:{frame.lineno}"] = (stat.size, stat.count)
+        return allocations, counts
+
+    def sample(self, now=None):
+        """Record one sample; None if no frame was presented since the last one."""
+        now = self.clock() if now is None else now
+        intervals, self._intervals = self._intervals, []
+        if not intervals:
+            return None
+        gc.collect()
+        rss = current_rss()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        median = _percentile(intervals, 50)
+        sample = {
+            "time": now - self.start - self.paused,
+            "frames": len(intervals),
+            "fps": len(intervals) / sum(intervals),  # The real rate; the median misleads when frame times are bimodal
+            "fps_p50": 1 / median if median else 0.0,
+            "frame_ms_p50": median * 1000,
+            "frame_ms_p95": _percentile(intervals, 95) * 1000,
+            "frame_ms_p99": _percentile(intervals, 99) * 1000,
+            "rss_mb": rss / 2 ** 20 if rss is not None else None,
+            "traced_mb": traced / 2 ** 20 if traced is not None else None,
+            "objects": len(gc.get_objects()),
+        }
+        self.samples.append(sample)
+        if self.log is not None:
+            rss_text = f"{sample['rss_mb']:.1f} MB" if rss is not None else "n/a"
+            self.log(f"soak {sample['time']:7.0f} s | {sample['fps']:5.1f} FPS (p50 {sample['fps_p50']:5.1f})"
+                     f" | p95 {sample['frame_ms_p95']:5.1f} ms"
+                     f" | rss {rss_text} | objects {sample['objects']}")
+        return sample
+
+    def _phases(self):
+        """Early and late samples, both taken after the warm-up and the baseline snapshot."""
+        warmup = self._baseline_time if self._baseline_time is not None else self.warmup
+        steady = [s for s in self.samples if s["time"] > warmup and s["frames"]] or self.samples
+        quarter = max(len(steady) // 4, 1)
+        return steady, steady[:quarter], steady[-quarter:]
+
+    def summary(self):
+        """Early/late figures, trends, top growth and the list of flagged drifts."""
+        if self._final is None and self._baseline is not None:
+            self._final = self._snapshot()
+        steady, early, late = self._phases()
+        thresholds = self.thresholds
+
+        def mean(samples, key):
+            values = [s[key] for s in samples if s[key] is not None]
+            return sum(values) / len(values) if values else None
+
+        figures = {}
+        for key in ("fps", "fps_p50", "frame_ms_p95", "rss_mb", "traced_mb", "objects"):
+            figures[key] = (mean(early, key), mean(late, key))
+        rss_samples = [s for s in steady if s["rss_mb"] is not None]
+        rss_slope = _slope_per_hour([s["time"] for s in rss_samples], [s["rss_mb"] for s in rss_samples])
+
+        flags = []
+        if len(steady) < 2:
+            flags.append("too few samples to measure drift: run longer or lower the interval")
+        else:
+            early_fps, late_fps = figures["fps"]
+            if early_fps and 1 - late_fps / early_fps > thresholds.fps_drop:
+                flags.append(f"FPS fell {100 * (1 - late_fps / early_fps):.0f}%"
+                             f" ({early_fps:.1f} -> {late_fps:.1f}, limit {100 * thresholds.fps_drop:.0f}%)")
+            early_p95, late_p95 = figures["frame_ms_p95"]
+            if early_p95 and late_p95 / early_p95 - 1 > thresholds.frame_p95_rise:
+                flags.append(f"p95 frame interval rose {100 * (late_p95 / early_p95 - 1):.0f}%"
+                             f" ({early_p95:.1f} -> {late_p95:.1f} ms, limit {100 * thresholds.frame_p95_rise:.0f}%)")
+            if len(rss_samples) >= 2:
+                growth = rss_samples[-1]["rss_mb"] - rss_samples[0]["rss_mb"]
+                if growth > thresholds.rss_growth_mb:
+                    flags.append(f"RSS grew {growth:.1f} MB (limit {thresholds.rss_growth_mb:.0f} MB)")
+                span = rss_samples[-1]["time"] - rss_samples[0]["time"]
+                if span >= thresholds.trend_span and rss_slope > thresholds.rss_slope_mb_per_hour:
+                    flags.append(f"RSS trend {rss_slope:.1f} MB/hour (limit {thresholds.rss_slope_mb_per_hour:.0f})")
+            early_traced, late_traced = figures["traced_mb"]
+            if early_traced is not None and late_traced - early_traced > thresholds.traced_growth_mb:
+                flags.append(f"Python allocations grew {late_traced - early_traced:.1f} MB"
+                             f" (limit {thresholds.traced_growth_mb:.0f} MB)")
+            early_objects, late_objects = figures["objects"]
+            if early_objects and late_objects / early_objects - 1 > thresholds.object_growth:
+                flags.append(f"live objects grew {100 * (late_objects / early_objects - 1):.0f}%"
+                             f" ({early_objects:.0f} -> {late_objects:.0f}, limit {100 * thresholds.object_growth:.0f}%)")
+
+        allocators, object_types = [], []
+        if self._baseline is not None:
+            (base_allocations, base_counts), (final_allocations, final_counts) = self._baseline, self._final
+            if base_allocations is not None and final_allocations is not None:
+                for location in set(base_allocations) | set(final_allocations):
+                    size, count = final_allocations.get(location, (0, 0))
+                    base_size, base_count = base_allocations.get(location, (0, 0))
+                    allocators.append({"location": location, "size_diff": size - base_size,
+                                       "count_diff": count - base_count, "size": size})
+                allocators.sort(key=lambda stat: abs(stat["size_diff"]), reverse=True)
+                allocators = allocators[:self.top]
+            growth = final_counts.copy()
+            growth.subtract(base_counts)
+            object_types = [{"type": name, "count_diff": diff, "count": final_counts[name]}
+                            for name, diff in growth.most_common(self.top) if diff > 0]
+
+        return {
+            "duration": self.last_frame_time - self.start - self.paused if self.start is not None else 0.0,
+            "frames": self.frame_count,
+            "paused": self.paused,
+            "samples": len(self.samples),
+            "early": {key: value[0] for key, value in figures.items()},
+            "late": {key: value[1] for key, value in figures.items()},
+            "rss_slope_mb_per_hour": rss_slope,
+            "top_allocation_growth": allocators,
+            "top_object_growth": object_types,
+            "flags": flags,
+            "passed": not flags,
+        }
+
+    def report(self, summary=None):
+        summary = summary or self.summary()
+        lines = [f"Soak run: {summary['duration']:.0f} s (plus {summary['paused']:.1f} s sampling),"
+                 f" {summary['frames']} frames, {summary['samples']} samples",
+                 f"{'':<18}{'early':>10}{'late':>10}"]
+        for key, label in (("fps", "FPS"), ("fps_p50", "FPS p50"), ("frame_ms_p95", "frame p95 (ms)"), ("rss_mb", "RSS (MB)"),
+                           ("traced_mb", "traced (MB)"), ("objects", "objects")):
+            early, late = summary["early"][key], summary["late"][key]
+            if early is not None:
+                lines.append(f"{label:<18}{early:10.1f}{late:10.1f}")
+        lines.append(f"RSS trend: {summary['rss_slope_mb_per_hour']:+.1f} MB/hour")
+        if summary["top_allocation_growth"]:
+            lines.append("Allocation growth since warm-up (tracemalloc):")
+            for stat in summary["top_allocation_growth"]:
+                lines.append(f"  {stat['size_diff'] / 1024:+10.1f} KiB {stat['count_diff']:+8d} blocks  {stat['location']}")
+        if summary["top_object_growth"]:
+            lines.append("Object types with the most growth:")
+            for entry in summary["top_object_growth"]:
+                lines.append(f"  {entry['count_diff']:+8d}  {entry['type']} ({entry['count']})")
+        if summary["passed"]:
+            lines.append("No drift beyond the thresholds")
+        else:
+            lines.append("DRIFT:")
+            lines.extend(f"  - {flag}" for flag in summary["flags"])
+        return "\n".join(lines)
+
+    def save(self, path, summary=None):
+        """Write the summary and every sample as JSON."""
+        summary = summary or self.summary()
+        with open(path, "w") as f:
+            json.dump({"summary": summary, "samples": self.samples}, f, indent=2)
+
+    def stop(self):
+        if self.trace_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class SyntheticSource:
+    """
+    Generated camera frames through the cv2.VideoCapture interface, for soak runs and
+    benchmarks without a camera or a recording: a textured background with a bright disc
+    moving over it, so the motion gate and optical flow have something to follow. Paced to
+    fps; with fps=None every read returns at once (tests/pipeline_benchmark.py).
+    """
+
+    def __init__(self, size=(640, 480), fps=30):
+        self.width, self.height = size
+        self.fps = fps
+        self.index = 0
+        self._next = None
+        ys, xs = np.mgrid[0:self.height, 0:self.width]
+        background = np.stack([(xs * 255 // self.width), (ys * 255 // self.height), ((xs ^ ys) & 63) + 64], axis=-1)
+        self.background = background.astype(np.uint8)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.fps is not None:
+            now = time.perf_counter()
+            if self._next is None:
+                self._next = now
+            elif self._next > now:
+                time.sleep(self._next - now)
+            self._next = max(self._next + 1 / self.fps, now)  # After a stall, drop frames rather than burst
+        self.index += 1
+        frame = self.background.copy()  # A new frame each read, as a camera delivers
+        phase = self.index / (self.fps or 30)
+        center = (int(self.width * (0.5 + 0.3 * np.sin(phase))), int(self.height * (0.5 + 0.3 * np.sin(phase * 1.3))))
+        cv2.circle(frame, center, 40, (230, 230, 230), -1)
+        return True, frame
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.width, cv2.CAP_PROP_FRAME_HEIGHT: self.height,
+                cv2.CAP_PROP_FPS: self.fps or 0}.get(prop, 0)
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        pass
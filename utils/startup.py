@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+
+import pygame
+
+# Startup helpers for the webcam games: a timing profile of the startup phases, and a
+# loading screen shown while the slow steps (opening the camera, loading and warming up the
+# hand model) run in parallel threads.
+
+
+class _Phase:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.add(self.name, self.start, time.perf_counter())
+        return False
+
+
+class StartupProfile:
+    """
+    Wall-clock breakdown of startup, relative to origin (a time.perf_counter() value taken
+    as early as possible, e.g. at the top of the entry script):
+
+        with profile.phase("camera"):
+            cap = cv2.VideoCapture(0)
+        profile.mark("first frame")
+
+    Phases may run in parallel threads; each row records the thread it ran on.
+    """
+
+    def __init__(self, origin=None):
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases = []  # (name, thread name, start, end) in seconds since origin
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, start, end):
+        with self._lock:
+            self.phases.append((name, threading.current_thread().name, start - self.origin, end - self.origin))
+
+    def mark(self, name):
+        """Record a milestone (a zero-length phase) at the current time."""
+        now = time.perf_counter()
+        self.add(name, now, now)
+
+    def elapsed(self, name):
+        """End time of the named phase or milestone in seconds since origin, or None."""
+        for phase_name, _, _, end in self.phases:
+            if phase_name == name:
+                return end
+        return None
+
+    def report(self):
+        lines = [f"{'startup phase':<20}{'start s':>9}{'end s':>9}{'took s':>9}  thread"]
+        for name, thread, start, end in sorted(self.phases, key=lambda phase: phase[2]):
+            lines.append(f"{name:<20}{start:9.3f}{end:9.3f}{end - start:9.3f}  {thread}")
+        return "\n".join(lines)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"phases": [{"name": name, "thread": thread, "start": start, "end": end}
+                                  for name, thread, start, end in self.phases]}, f, indent=2)
+
+
+class LoadingScreen:
+    """
+    Title and a status line per startup task, drawn while the game is still loading.
+    present shows the finished screen (e.g. ScaledDisplay.present when screen is a logical surface).
+    """
+
+    def __init__(self, screen, title="CV Pong", present=pygame.display.flip):
+        self.screen = screen
+        self.present = present
+        self.title = title
+        self.title_font = pygame.font.SysFont(None, 72)
+        self.font = pygame.font.SysFont(None, 32)
+
+    def draw(self, statuses):
+        """statuses: list of (task name, "loading" / "ready" / "failed")."""
+        width, height = self.screen.get_size()
+        self.screen.fill((0, 0, 0))
+        title = self.title_font.render(self.title, True, (255, 255, 255))
+        self.screen.blit(title, (width // 2 - title.get_width() // 2, height // 3))
+        dots = "." * (1 + int(time.perf_counter() * 3) % 3)
+        for i, (name, status) in enumerate(statuses):
+            text = f"{name}: {status}{dots if status == 'loading' else ''}"
+            color = (255, 80, 80) if status == "failed" else (200, 200, 200)
+            line = self.font.render(text, True, color)
+            self.screen.blit(line, (width // 2 - 150, height // 2 + i * 40))
+        self.present()
+
+
+def load_in_parallel(screen, tasks, profile, present=pygame.display.flip):
+    """
+    Run tasks (a list of (name, callable)) on their own threads, each timed as a phase of
+    profile, while a loading screen keeps the window responsive. Returns {name: result};
+    the first exception raised by a task is re-raised here once all of them have finished.
+    """
+    results = {}
+    errors = {}
+
+    def run(name, task):
+        try:
+            with profile.phase(name):
+                results[name] = task()
+        except BaseException as e:  # Re-raised on the main thread
+            errors[name] = e
+
+    # The screen goes up before the tasks start, since they import the heavy modules (cv2, mediapipe)
+    loading = LoadingScreen(screen, present=present)
+    loading.draw([(name, "loading") for name, _ in tasks])
+    profile.mark("loading screen")
+
+    threads = [threading.Thread(target=run, args=(name, task), name=name, daemon=True) for name, task in tasks]
+    for thread in threads:
+        thread.start()
+
+    while any(thread.is_alive() for thread in threads):
+        pygame.event.pump()  # Keep the window responsive (and the OS from flagging it as hung)
+        loading.draw([(name, "failed" if name in errors else "ready" if name in results else "loading")
+                      for name, _ in tasks])
+        for thread in threads:
+            thread.join(timeout=1 / 30)
+
+    for name, _ in tasks:
+        if name in errors:
+            raise errors[name]
+    return results
@@ -0,0 +1,156 @@
+import collections
+import json
+import os
+import threading
+import time
+
+# Lightweight per-stage timing for the game loops. Only depends on the standard
+# library (pygame is imported when the HUD draws), so the keyboard-only game can use it too.
+
+MAX_EVENTS = 500_000  # Cap on buffered trace events (~1-2 hours at 60 FPS with ~10 spans per frame)
+
+
+class _NullSpan:
+    """Shared no-op span returned while tracing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracer.add(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class Tracer:
+    """
+    Collects timing spans around the stages of a frame:
+
+        with tracer.span("hands.process"):
+            results = hands.process(frame_rgb)
+
+    While disabled, span() returns a shared no-op object, so instrumented code costs
+    about one attribute check per span. When enabled it keeps rolling per-stage timings
+    for the HUD; with record=True it also buffers Chrome trace events for export.
+    """
+
+    def __init__(self, enabled=False, record=False, window=120):
+        self.enabled = enabled or record
+        self.record = record
+        self.window = window
+        self.stats = {}  # Stage name -> deque of recent durations in ms
+        self.frame_times = collections.deque(maxlen=window)  # Recent frame durations in ms
+        self.events = []
+        self._thread_names = {}
+        self._last_frame = None
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def add(self, name, start_ns, end_ns):
+        """Record one finished span (start/end from time.perf_counter_ns)."""
+        durations = self.stats.get(name)
+        if durations is None:
+            durations = self.stats.setdefault(name, collections.deque(maxlen=self.window))
+        durations.append((end_ns - start_ns) / 1e6)
+
+        if self.record and len(self.events) < MAX_EVENTS:
+            thread = threading.current_thread()
+            self._thread_names.setdefault(thread.ident, thread.name)
+            self.events.append({
+                "name": name, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                "ts": (start_ns - self._origin) / 1000, "dur": (end_ns - start_ns) / 1000,
+            })
+
+    def frame(self):
+        """Mark the end of a frame; feeds the FPS figure."""
+        if not self.enabled:
+            self._last_frame = None
+            return
+        now = time.perf_counter_ns()
+        if self._last_frame is not None:
+            self.frame_times.append((now - self._last_frame) / 1e6)
+        self._last_frame = now
+
+    def fps(self):
+        if not self.frame_times:
+            return 0.0
+        return 1000.0 * len(self.frame_times) / sum(self.frame_times)
+
+    def summary(self):
+        """(stage, mean ms, max ms) over the rolling window, slowest stage first."""
+        rows = []
+        for name, durations in list(self.stats.items()):
+            if durations:
+                values = list(durations)
+                rows.append((name, sum(values) / len(values), max(values)))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def export_chrome_trace(self, path):
+        """Write recorded spans as trace-event JSON (chrome://tracing, Perfetto)."""
+        metadata = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+                    for tid, name in self._thread_names.items()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f)
+
+
+NULL_TRACER = Tracer(enabled=False)
+
+
+class TimingHud:
+    """On-screen overlay with FPS and rolling per-stage timings. Toggle with toggle()."""
+
+    def __init__(self, tracer, font, position=(10, 10)):
+        self.tracer = tracer
+        self.font = font
+        self.position = position
+        self.visible = False
+        self.status = None  # Optional extra line from the game, e.g. the quality level
+        self._tracer_was_enabled = tracer.enabled
+
+    def toggle(self):
+        self.visible = not self.visible
+        # Timing is only collected while someone is looking at it (or a trace is being recorded)
+        self.tracer.enabled = self.visible or self.tracer.record or self._tracer_was_enabled
+
+    def draw(self, surface):
+        """Draw the overlay if visible; returns the rect it covers, or None."""
+        if not self.visible:
+            return None
+        import pygame
+
+        lines = [f"{self.tracer.fps():5.1f} FPS"]
+        if self.status:
+            lines.append(self.status)
+        lines.append("stage          avg    max ms")
+        lines += [f"{name:<13}{mean:6.2f}{peak:7.2f}" for name, mean, peak in self.tracer.summary()]
+        line_height = self.font.get_linesize()
+        width = max(self.font.size(line)[0] for line in lines) + 12
+        x, y = self.position
+        panel = pygame.Surface((width, line_height * len(lines) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        rect = surface.blit(panel, (x, y))
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, True, (255, 255, 0)), (x + 6, y + 4 + i * line_height))
+        return rect
@@ -2,12 +2,16 @@ def map_range(value, in_min, in_max, out_min, out_max):
     """
     Maps a value from one range to another. mapping hand coordinates to game window coordinates
     Equivalent to Processing's map() function.
+    Also takes a NumPy array, which is mapped as a whole in one operation.
     """
     # Clamp the input value within the expected range
-    value = max(min(value, in_max), in_min)
+    if hasattr(value, "clip"):
+        value = value.clip(in_min, in_max)
+    else:
+        value = max(min(value, in_max), in_min)
     in_range = in_max - in_min
     out_range = out_max - out_min
-    scaled_value = float(value - in_min) / float(in_range)
+    scaled_value = (value - in_min) / float(in_range)
     return out_min + (scaled_value * out_range)
 
 